@@ -3,8 +3,9 @@ from django.utils.html import format_html
 from django.urls import reverse
 from .models import (
     UserProfile, Conversation, Message, TeacherData, 
-    AggregatedData, SchoolData, FilterOptions, DataSyncLog, UserSchoolProfile
+    AggregatedData, SchoolData, SchoolActivity, SchoolDirectory, TeacherObservation, SchoolObservationSummary, FilterOptions, DataSyncLog, UserSchoolProfile
 )
+from .services import UnreadCounterService
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -69,6 +70,38 @@ class SchoolDataAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
     ordering = ('school_name',)
 
+@admin.register(SchoolActivity)
+class SchoolActivityAdmin(admin.ModelAdmin):
+    list_display = ('school_name', 'sector', 'emis', 'teacher_count', 'active_teachers', 'avg_lp_ratio', 'wifi_status', 'teachers_with_mobile_access')
+    list_filter = ('sector', 'wifi_status')
+    search_fields = ('school_name', 'emis')
+    readonly_fields = ('created_at', 'updated_at')
+    ordering = ('school_name',)
+
+@admin.register(SchoolDirectory)
+class SchoolDirectoryAdmin(admin.ModelAdmin):
+    list_display = ('emis', 'school_name', 'sector', 'principal_username')
+    list_filter = ('sector',)
+    search_fields = ('emis', 'school_name', 'principal_username')
+    readonly_fields = ('created_at', 'updated_at')
+    ordering = ('school_name',)
+
+@admin.register(TeacherObservation)
+class TeacherObservationAdmin(admin.ModelAdmin):
+    list_display = ('user_id', 'school', 'sector', 'date', 'supp_learn_envi_score', 'overall_average_score')
+    list_filter = ('sector',)
+    search_fields = ('school', 'emis')
+    readonly_fields = ('created_at', 'updated_at')
+    ordering = ('school', '-date')
+
+@admin.register(SchoolObservationSummary)
+class SchoolObservationSummaryAdmin(admin.ModelAdmin):
+    list_display = ('school', 'sector', 'emis', 'observations', 'total_teachers', 'avg_infrastructure_score', 'wifi_status')
+    list_filter = ('sector', 'wifi_status')
+    search_fields = ('school', 'emis')
+    readonly_fields = ('updated_at',)
+    ordering = ('school',)
+
 @admin.register(FilterOptions)
 class FilterOptionsAdmin(admin.ModelAdmin):
     list_display = ('option_type', 'option_value', 'created_at')
@@ -79,7 +112,7 @@ class FilterOptionsAdmin(admin.ModelAdmin):
 
 @admin.register(DataSyncLog)
 class DataSyncLogAdmin(admin.ModelAdmin):
-    list_display = ('sync_type', 'status', 'records_processed', 'started_at', 'completed_at', 'duration')
+    list_display = ('sync_type', 'status', 'records_processed', 'records_inserted', 'records_updated', 'records_deleted', 'started_at', 'completed_at', 'duration')
     list_filter = ('sync_type', 'status', 'started_at')
     search_fields = ('sync_type', 'error_message')
     readonly_fields = ('started_at', 'completed_at')
@@ -107,12 +140,16 @@ admin.site.index_title = "Welcome to Dashboard Administration"
 # Add custom admin actions
 @admin.action(description="Mark selected messages as read")
 def mark_messages_as_read(modeladmin, request, queryset):
+    receiver_ids = list(queryset.values_list('receiver_id', flat=True).distinct())
     queryset.update(is_read=True)
+    UnreadCounterService.rebuild(user_ids=receiver_ids)
     modeladmin.message_user(request, f"{queryset.count()} messages marked as read.")
 
 @admin.action(description="Mark selected messages as unread")
 def mark_messages_as_unread(modeladmin, request, queryset):
+    receiver_ids = list(queryset.values_list('receiver_id', flat=True).distinct())
     queryset.update(is_read=False)
+    UnreadCounterService.rebuild(user_ids=receiver_ids)
     modeladmin.message_user(request, f"{queryset.count()} messages marked as unread.")
 
 # Add actions to MessageAdmin
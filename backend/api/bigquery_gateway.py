@@ -0,0 +1,163 @@
+from contextlib import contextmanager
+from django.conf import settings
+from types import SimpleNamespace
+from .cache import get_or_compute, make_key
+import datetime
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Python type -> BigQuery scalar parameter type
+PARAMETER_TYPES = [
+    (bool, 'BOOL'),
+    (int, 'INT64'),
+    (float, 'FLOAT64'),
+    (datetime.datetime, 'TIMESTAMP'),
+    (datetime.date, 'DATE'),
+    (str, 'STRING'),
+]
+
+
+def parameter_type(value):
+    for python_type, bigquery_type in PARAMETER_TYPES:
+        if isinstance(value, python_type):
+            return bigquery_type
+    raise TypeError(f"Unsupported BigQuery parameter type: {type(value).__name__}")
+
+
+def as_namespace(row):
+    """Plain, picklable copy of a BigQuery row that keeps attribute access"""
+    if isinstance(row, SimpleNamespace):
+        return row
+    return SimpleNamespace(**(dict(row.items()) if hasattr(row, 'items') else vars(row)))
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.rows = None
+        self.error = None
+
+
+class FakeBigQueryClient:
+    """In-memory stand-in for bigquery.Client.
+
+    Answers each query with the canned rows of the first marker found in
+    the SQL (an empty result otherwise) and records the SQL and parameters
+    of every query it runs.
+    """
+
+    def __init__(self, responses=None):
+        self.responses = dict(responses or {})
+        self.queries = []
+
+    def query(self, sql, job_config=None):
+        parameters = {p.name: p.value for p in getattr(job_config, 'query_parameters', None) or []}
+        self.queries.append((sql, parameters))
+        rows = next((rows for marker, rows in self.responses.items() if marker in sql), [])
+        return SimpleNamespace(result=lambda **kwargs: iter(rows))
+
+
+class BigQueryGateway:
+    """Process-wide entry point for live BigQuery queries made while serving requests.
+
+    The client is created on first use and shared, so credentials are
+    discovered and the HTTP session is set up once per process. Results are
+    cached for BIGQUERY_RESULT_CACHE_TTL seconds under (SQL, parameters) in
+    the ``bigquery`` cache namespace, and concurrent identical queries in a
+    process share one job. With BIGQUERY_BACKEND = 'fake' the gateway uses
+    FakeBigQueryClient instead of Google's client.
+    """
+
+    NAMESPACE = 'bigquery'
+
+    def __init__(self, client_factory=None):
+        self._client_factory = client_factory
+        self._client = None
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def _create_client(self):
+        if self._client_factory:
+            return self._client_factory()
+        if getattr(settings, 'BIGQUERY_BACKEND', 'google') == 'fake':
+            return FakeBigQueryClient()
+        from google.cloud import bigquery
+        return bigquery.Client()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+
+    @contextmanager
+    def override(self, client):
+        """Route queries to ``client`` (e.g. a FakeBigQueryClient) inside the block"""
+        with self._lock:
+            previous, self._client = self._client, client
+        try:
+            yield client
+        finally:
+            with self._lock:
+                self._client = previous
+
+    def reset(self):
+        """Drop the shared client; the next query creates a new one"""
+        with self._lock:
+            self._client = None
+
+    def _job_config(self, params):
+        if not params:
+            return None
+        from google.cloud import bigquery
+        return bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter(name, parameter_type(value), value)
+            for name, value in params.items()
+        ])
+
+    def _run(self, sql, params):
+        job = self.client.query(sql, job_config=self._job_config(params))
+        return [as_namespace(row) for row in job.result()]
+
+    def query(self, sql, params=None, ttl=None):
+        """Rows of ``sql`` run with named ``params``, as attribute-access namespaces.
+
+        ``ttl`` overrides BIGQUERY_RESULT_CACHE_TTL; 0 skips the result
+        cache but still shares the job with identical queries in flight.
+        """
+        params = params or {}
+        ttl = getattr(settings, 'BIGQUERY_RESULT_CACHE_TTL', 300) if ttl is None else ttl
+        key = make_key(self.NAMESPACE, sql, **{name: f'{parameter_type(v)}:{v}' for name, v in params.items()})
+
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _InFlight()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.rows
+
+        try:
+            if ttl:
+                call.rows = get_or_compute(self.NAMESPACE, key, lambda: self._run(sql, params), ttl)
+            else:
+                call.rows = self._run(sql, params)
+            return call.rows
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
+
+
+bigquery_gateway = BigQueryGateway()
@@ -1,12 +1,18 @@
 from django.core.cache import cache
 from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
 from functools import wraps
 import hashlib
-import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+_MISSING = object()
+
 def cache_key_generator(*args, **kwargs):
     """Generate a cache key from function arguments"""
     key_parts = [str(arg) for arg in args]
@@ -14,148 +20,210 @@ def cache_key_generator(*args, **kwargs):
     key_string = "|".join(key_parts)
     return hashlib.md5(key_string.encode()).hexdigest()
 
-def cache_result(timeout=300, key_prefix=""):
+def _version_key(namespace, partition=None):
+    return f"ns:{namespace}:{partition}:version" if partition is not None else f"ns:{namespace}:version"
+
+def namespace_version(namespace, partition=None):
+    """
+    Current version of a namespace (or of one partition of it, e.g. one user)
+
+    Versions start from the current time rather than 1, so a version key that
+    was evicted can never come back at a number older entries were stored under.
+    """
+    key = _version_key(namespace, partition)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time()), None)
+        version = cache.get(key, int(time.time()))
+    return version
+
+def invalidate_namespace(namespace, partition=None):
+    """Invalidate every entry of a namespace (or partition) by moving its version on"""
+    key = _version_key(namespace, partition)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Never versioned, or evicted: any fresh version orphans the old entries
+        version = int(time.time()) + 1
+        cache.set(key, version, None)
+        return version
+
+def make_key(namespace, *parts, partition=None, **kwargs):
+    """Versioned cache key for ``parts`` within a namespace"""
+    version = namespace_version(namespace)
+    if partition is not None:
+        version = f"{version}.{namespace_version(namespace, partition)}"
+    return f"{namespace}:{version}:{cache_key_generator(*parts, **kwargs)}"
+
+def _incr(key):
+    """Increment a counter that never expires, creating it at 1; returns the new value"""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, None):
+            return 1
+        return cache.incr(key)
+
+def _register_namespace(namespace):
+    """
+    Add a namespace to the registry kept in the shared cache, so every worker's
+    get_cache_stats() sees the same namespaces
+
+    Each namespace takes one append-only slot; the marker key makes the
+    registration happen once across processes.
+    """
+    if cache.add(f"stats:namespace:{namespace}", 1, None):
+        cache.set(f"stats:namespaces:{_incr('stats:namespaces:count')}", namespace, None)
+
+def _registered_namespaces():
+    count = cache.get('stats:namespaces:count', 0)
+    slots = cache.get_many([f"stats:namespaces:{slot}" for slot in range(1, count + 1)])
+    return sorted(set(slots.values()))
+
+def _record(namespace, outcome):
+    key = f"stats:{namespace}:{outcome}"
+    if _incr(key) == 1:
+        # First count for this namespace (or since the cache was cleared)
+        _register_namespace(namespace)
+
+def get_or_compute(namespace, key, compute, timeout=300):
+    """
+    Return the cached value for ``key``, computing and storing it on a miss
+
+    Only one caller per key computes at a time (stampede protection): others
+    wait up to CACHE_LOCK_WAIT seconds for that result to appear and compute
+    it themselves only if it doesn't. Hits and misses are counted per namespace.
+    """
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        _record(namespace, 'hits')
+        logger.debug(f"Cache hit for key: {key}")
+        return value
+    _record(namespace, 'misses')
+
+    lock_key = f"{key}:lock"
+    if not cache.add(lock_key, 1, getattr(settings, 'CACHE_LOCK_TIMEOUT', 30)):
+        deadline = time.monotonic() + getattr(settings, 'CACHE_LOCK_WAIT', 5)
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+        return compute()
+
+    try:
+        value = compute()
+        cache.set(key, value, timeout)
+        logger.debug(f"Cached result for key: {key}")
+        return value
+    finally:
+        cache.delete(lock_key)
+
+def cache_result(timeout=300, namespace="default", partition=None):
     """
     Decorator to cache function results
-    
+
     Args:
         timeout (int): Cache timeout in seconds (default: 5 minutes)
-        key_prefix (str): Prefix for cache key
+        namespace (str): Namespace for keys, versioning and stats
+        partition (callable): Maps the call arguments to a sub-namespace
+            that can be invalidated on its own (e.g. one user's entries)
     """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Generate cache key
-            cache_key = f"{key_prefix}:{func.__name__}:{cache_key_generator(*args, **kwargs)}"
-            
-            # Try to get from cache
-            cached_result = cache.get(cache_key)
-            if cached_result is not None:
-                logger.debug(f"Cache hit for key: {cache_key}")
-                return cached_result
-            
-            # Execute function and cache result
-            result = func(*args, **kwargs)
-            cache.set(cache_key, result, timeout)
-            logger.debug(f"Cached result for key: {cache_key}")
-            
-            return result
+            part = partition(*args, **kwargs) if partition else None
+            cache_key = make_key(namespace, func.__name__, *args, partition=part, **kwargs)
+            return get_or_compute(namespace, cache_key, lambda: func(*args, **kwargs), timeout)
         return wrapper
     return decorator
 
-def invalidate_cache_pattern(pattern):
-    """Invalidate all cache keys matching a pattern"""
-    if hasattr(cache, 'delete_pattern'):
-        cache.delete_pattern(pattern)
-    else:
-        # Fallback for cache backends that don't support pattern deletion
-        logger.warning("Cache backend doesn't support pattern deletion")
+class _Uncacheable(Exception):
+    def __init__(self, response):
+        self.response = response
+
+def cache_scoped_response(endpoint, timeout=None):
+    """
+    Decorator for APIView GET handlers whose payload depends only on the
+    user's role scope, the query parameters and the synced data.
+
+    Responses are cached in the ``scoped_response`` namespace under
+    (endpoint, scope, normalized params, data snapshot version), so a sync or
+    LP ratio recalculation that bumps the version invalidates them without
+    any explicit deletes. The key is also sent as an ETag; a matching
+    If-None-Match is answered with 304 before the view or cache data is read.
+
+    Args:
+        endpoint (str): Name of the endpoint in cache keys
+        timeout (int): Cache timeout in seconds (default: SCOPED_RESPONSE_CACHE_TTL)
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(view, request, *args, **kwargs):
+            from .scoping import get_scope
+            from .services import SnapshotService
+
+            try:
+                scope = get_scope(request)
+            except Exception:
+                return func(view, request, *args, **kwargs)  # no profile: let the view report it
+            params = sorted(
+                (key, value) for key in request.query_params
+                for value in request.query_params.getlist(key) if value
+            )
+            cache_key = make_key('scoped_response', endpoint, SnapshotService.get_version(), scope.key, *params)
+            etag = f'"{cache_key_generator(cache_key)}"'
+
+            if etag in parse_etags(request.headers.get('If-None-Match', '')):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                def compute():
+                    response = func(view, request, *args, **kwargs)
+                    if response.status_code != status.HTTP_200_OK:
+                        raise _Uncacheable(response)
+                    return response.data
+
+                try:
+                    data = get_or_compute(
+                        'scoped_response', cache_key, compute,
+                        timeout or getattr(settings, 'SCOPED_RESPONSE_CACHE_TTL', 3600)
+                    )
+                except _Uncacheable as e:
+                    return e.response
+                response = Response(data)
+
+            response['ETag'] = etag
+            # Clients may keep the copy but must revalidate it on every use
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
 
 class BigQueryCache:
-    """Cache manager for BigQuery operations"""
-    
-    @staticmethod
-    @cache_result(timeout=1800, key_prefix="bq")  # 30 minutes
-    def get_teacher_data(filters=None):
-        """Cache teacher data queries"""
-        from .views import BigQueryTeacherDataView
-        view = BigQueryTeacherDataView()
-        return view._get_teacher_data(filters or {})
-    
-    @staticmethod
-    @cache_result(timeout=3600, key_prefix="bq")  # 1 hour
-    def get_filter_options():
-        """Cache filter options"""
-        from .views import BigQueryFilterOptionsView
-        view = BigQueryFilterOptionsView()
-        return view._get_filter_options()
-    
-    @staticmethod
-    @cache_result(timeout=1800, key_prefix="bq")  # 30 minutes
-    def get_summary_stats(filters=None):
-        """Cache summary statistics"""
-        from .views import BigQuerySummaryStatsView
-        view = BigQuerySummaryStatsView()
-        return view._get_summary_stats(filters or {})
-    
-    @staticmethod
-    def invalidate_teacher_data():
-        """Invalidate teacher data cache"""
-        invalidate_cache_pattern("bq:get_teacher_data:*")
-    
-    @staticmethod
-    def invalidate_filter_options():
-        """Invalidate filter options cache"""
-        invalidate_cache_pattern("bq:get_filter_options:*")
-    
-    @staticmethod
-    def invalidate_summary_stats():
-        """Invalidate summary stats cache"""
-        invalidate_cache_pattern("bq:get_summary_stats:*")
+    """Cache manager for values computed from the synced BigQuery datasets"""
 
-class ConversationCache:
-    """Cache manager for conversation operations"""
-    
-    @staticmethod
-    @cache_result(timeout=300, key_prefix="conv")  # 5 minutes
-    def get_user_conversations(user_id):
-        """Cache user conversations"""
-        from .models import Conversation
-        return list(Conversation.objects.filter(
-            aeo_id=user_id
-        ) | Conversation.objects.filter(
-            principal_id=user_id
-        ).values())
-    
     @staticmethod
-    @cache_result(timeout=60, key_prefix="conv")  # 1 minute
-    def get_conversation_messages(conversation_id):
-        """Cache conversation messages"""
-        from .models import Message
-        return list(Message.objects.filter(
-            conversation_id=conversation_id
-        ).order_by('timestamp').values())
-    
-    @staticmethod
-    def invalidate_user_conversations(user_id):
-        """Invalidate user conversations cache"""
-        invalidate_cache_pattern(f"conv:get_user_conversations:*{user_id}*")
-    
-    @staticmethod
-    def invalidate_conversation_messages(conversation_id):
-        """Invalidate conversation messages cache"""
-        invalidate_cache_pattern(f"conv:get_conversation_messages:*{conversation_id}*")
+    @cache_result(timeout=3600, namespace="bq:usage_distribution")  # 1 hour
+    def get_usage_distribution(version, group_by='sector', period_type='weekly'):
+        """Cache lesson plan usage distribution per data snapshot ``version``"""
+        from .services import SummaryStatsService
+        return SummaryStatsService.usage_distribution(group_by, period_type)
 
-class UserCache:
-    """Cache manager for user operations"""
-    
-    @staticmethod
-    @cache_result(timeout=600, key_prefix="user")  # 10 minutes
-    def get_principals():
-        """Cache principals list"""
-        from .models import UserProfile
-        return list(UserProfile.objects.filter(role='Principal').select_related('user').values(
-            'user__id', 'user__username', 'user__email', 'school_name'
-        ))
-    
     @staticmethod
-    @cache_result(timeout=600, key_prefix="user")  # 10 minutes
-    def get_aeos():
-        """Cache AEOs list"""
-        from .models import UserProfile
-        return list(UserProfile.objects.filter(role='AEO').select_related('user').values(
-            'user__id', 'user__username', 'user__email'
-        ))
-    
-    @staticmethod
-    def invalidate_principals():
-        """Invalidate principals cache"""
-        invalidate_cache_pattern("user:get_principals:*")
-    
+    def invalidate_usage_distribution():
+        """Invalidate usage distribution cache"""
+        invalidate_namespace("bq:usage_distribution")
+
     @staticmethod
-    def invalidate_aeos():
-        """Invalidate AEOs cache"""
-        invalidate_cache_pattern("user:get_aeos:*")
+    def invalidate_all():
+        """Invalidate every synced dataset cache (after a sync or LP ratio run)
+
+        Usage distribution keys also carry the snapshot version, which syncs
+        and LP ratio runs bump, so those entries would roll over anyway; the
+        namespace is invalidated here too so every BigQueryCache entry is
+        covered in one place.
+        """
+        BigQueryCache.invalidate_usage_distribution()
 
 def clear_all_caches():
     """Clear all application caches"""
@@ -163,7 +231,20 @@ def clear_all_caches():
     logger.info("All caches cleared")
 
 def get_cache_stats():
-    """Get cache statistics (if supported by backend)"""
-    if hasattr(cache, 'get_stats'):
-        return cache.get_stats()
-    return {"message": "Cache statistics not available for this backend"} 
\ No newline at end of file
+    """Hit/miss counters and current version of every namespace used by any process"""
+    namespaces = _registered_namespaces()
+    counters = cache.get_many([f"stats:{ns}:{outcome}" for ns in namespaces for outcome in ('hits', 'misses')])
+    stats = {}
+    for namespace in namespaces:
+        hits = counters.get(f"stats:{namespace}:hits", 0)
+        misses = counters.get(f"stats:{namespace}:misses", 0)
+        stats[namespace] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+            'version': namespace_version(namespace),
+        }
+    return {
+        'backend': settings.CACHES['default']['BACKEND'],
+        'namespaces': stats,
+    }
@@ -2,6 +2,7 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.utils import timezone
+from uuid import uuid4
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
@@ -80,7 +81,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
         try:
             # Import here to avoid Django configuration issues
             from .models import Conversation, Message
+            from .services import UnreadCounterService, NotificationService, AdminSnapshotService
             from django.contrib.auth.models import User
+            from django.db import transaction
             
             conversation = Conversation.objects.get(id=conversation_id)
             
@@ -113,14 +116,19 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     'timestamp': timezone.now().isoformat()
                 }
             
-            message = Message.objects.create(
-                conversation=conversation,
-                sender=sender,
-                receiver=receiver,
-                school_name=conversation.school_name,
-                message_text=message_text,
-                timestamp=timezone.now()
-            )
+            with transaction.atomic():
+                message = Message.objects.create(
+                    id=str(uuid4()),
+                    conversation=conversation,
+                    sender=sender,
+                    receiver=receiver,
+                    school_name=conversation.school_name,
+                    message_text=message_text,
+                    timestamp=timezone.now()
+                )
+                UnreadCounterService.record_new_message(message)
+                NotificationService.message_created(message)
+                transaction.on_commit(AdminSnapshotService.messages_changed)
             
             return {
                 'id': message.id,
@@ -168,7 +176,54 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 
     async def receive(self, text_data):
         # Handle any incoming messages from the client
-        pass
+        try:
+            text_data_json = json.loads(text_data)
+        except ValueError:
+            return
+
+        if text_data_json.get('type') == 'resume':
+            # Client reconnected: replay events after its last seen sequence number
+            try:
+                last_seq = int(text_data_json.get('last_seq') or 0)
+            except (TypeError, ValueError):
+                last_seq = 0
+            await self.resume(last_seq)
+
+    async def resume(self, last_seq):
+        events, latest_seq = await self.get_missed_events(last_seq)
+
+        if events is None:
+            # Gap can't be replayed, client must refetch and continue from latest_seq
+            await self.send(text_data=json.dumps({
+                'type': 'resync_required',
+                'seq': latest_seq
+            }))
+            return
+
+        for event in events:
+            await self.send(text_data=json.dumps({
+                'type': event['event_type'],
+                'seq': event['seq'],
+                'data': event['data']
+            }))
+
+        await self.send(text_data=json.dumps({
+            'type': 'resume_complete',
+            'seq': latest_seq
+        }))
+
+    @database_sync_to_async
+    def get_missed_events(self, last_seq):
+        from .services import NotificationService
+        return NotificationService.get_events_since(self.user, last_seq)
+
+    async def notification_event(self, event):
+        # Send an unread_count_changed / conversation_updated delta to WebSocket
+        await self.send(text_data=json.dumps({
+            'type': event['event_type'],
+            'seq': event['seq'],
+            'data': event['data']
+        }))
 
     async def notification_message(self, event):
         # Send notification to WebSocket
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+import csv
+import json
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+class _Echo:
+    """File-like object whose write() hands the formatted line back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(names, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(names)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(names, rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(names, row))) + '\n'
+
+
+def stream_export(queryset, columns, export_format='csv', filename='export', headers=None, chunk_size=None):
+    """Stream ``queryset`` as a CSV or NDJSON download in constant memory.
+
+    ``columns`` is a list of ``(name, lookup)`` pairs, where the lookup is a
+    field path or an expression; rows are read with ``values_list()`` and
+    ``iterator()``, so no model instances are built and only one chunk of
+    rows is held at a time. ``headers`` overrides the CSV header row.
+    Raises ValueError for an unknown format.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    content_type, extension = EXPORT_FORMATS[export_format]
+    chunk_size = chunk_size or getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+    names = [name for name, _ in columns]
+    rows = queryset.values_list(*[lookup for _, lookup in columns]).iterator(chunk_size=chunk_size)
+    if export_format == 'csv':
+        content = iter_csv(headers or names, rows)
+    else:
+        content = iter_ndjson(names, rows)
+
+    response = StreamingHttpResponse(content, content_type=content_type)
+    stamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+    response['Content-Disposition'] = f'attachment; filename="{filename}_{stamp}.{extension}"'
+    return response
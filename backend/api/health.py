@@ -0,0 +1,172 @@
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsSampler:
+    """Samples CPU, memory, disk and DB latency on a background thread.
+
+    Health requests read the last sample instead of measuring inline, so a
+    probe never blocks a worker (psutil.cpu_percent(interval=1) used to hold
+    it for a full second). The thread starts lazily on first use in each
+    process, which keeps it alive across gunicorn's fork of the workers.
+    CPU usage is only reported once a full interval has passed since the
+    counter was primed; until then it is None.
+    """
+
+    def __init__(self, interval=None):
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = None
+        self._pid = None
+        self._sample = None
+        self._cpu_primed_pid = None
+        self._cpu_primed_at = None
+
+    @property
+    def interval(self):
+        return self._interval or getattr(settings, 'HEALTH_SAMPLE_INTERVAL', 15)
+
+    def prime_cpu(self):
+        """Start psutil's CPU counter for this process; returns False if it was already running.
+
+        The first non-blocking cpu_percent() call has nothing to compare
+        against and always reads 0.0, so it is thrown away.
+        """
+        import psutil
+
+        if self._cpu_primed_pid == os.getpid():
+            return False
+        psutil.cpu_percent(interval=None)
+        self._cpu_primed_pid = os.getpid()
+        self._cpu_primed_at = time.monotonic()
+        return True
+
+    def _read_cpu(self):
+        """CPU usage since the previous call, or None if the counter was primed less than an interval ago"""
+        import psutil
+
+        if self.prime_cpu() or time.monotonic() - self._cpu_primed_at < self.interval:
+            return None
+        return psutil.cpu_percent(interval=None)
+
+    def _measure(self, cpu=True):
+        import psutil
+
+        sample = {'sampled_at': timezone.now().isoformat()}
+        try:
+            sample['system'] = {
+                # Non-blocking: CPU usage since the previous call
+                'cpu_percent': self._read_cpu() if cpu else None,
+                'memory_percent': psutil.virtual_memory().percent,
+                'disk_percent': psutil.disk_usage('/').percent,
+            }
+        except Exception as e:
+            sample['system'] = {'error': str(e)}
+
+        sample['database'] = check_database()
+        return sample
+
+    def sample_once(self):
+        """Take one reading and store it as the latest sample"""
+        self._sample = self._measure()
+        return self._sample
+
+    def _run(self, stop):
+        # Wait a full interval before the first sample so the CPU reading covers it
+        while not stop.wait(self.interval):
+            try:
+                self.sample_once()
+            except Exception as e:
+                logger.error(f"Health metrics sampling error: {e}")
+            finally:
+                # The thread owns its own DB connection; don't hold it between samples
+                connection.close()
+
+    def ensure_started(self):
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            try:
+                self.prime_cpu()
+            except Exception as e:
+                logger.error(f"Health metrics CPU priming error: {e}")
+            self._stop = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, args=(self._stop,), name='health-metrics-sampler', daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Stop the sampling thread and wait for it to exit"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def latest(self):
+        """Return the most recent sample.
+
+        Until the thread has taken its first one, a placeholder is measured
+        inline without CPU usage and is not stored, so it never races with
+        the thread's sample.
+        """
+        self.ensure_started()
+        return self._sample or self._measure(cpu=False)
+
+
+def check_database():
+    """Run SELECT 1 and report latency"""
+    started = time.perf_counter()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        return {
+            'status': 'ok',
+            'connection': 'active',
+            'latency_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+    except Exception as e:
+        return {'status': 'error', 'error': str(e)}
+
+
+def check_channel_layer():
+    """Ping the Redis servers behind the channel layer (in-memory layers are always ok)"""
+    from channels.layers import get_channel_layer
+
+    try:
+        layer = get_channel_layer()
+        if layer is None:
+            return {'status': 'error', 'error': 'No channel layer configured'}
+        hosts = getattr(layer, 'hosts', None)
+        if not hosts:
+            return {'status': 'ok', 'backend': type(layer).__name__}
+
+        import redis
+
+        timeout = getattr(settings, 'HEALTH_CHECK_TIMEOUT', 2)
+        for host in hosts:
+            if 'address' in host:
+                client = redis.Redis.from_url(host['address'], socket_timeout=timeout, socket_connect_timeout=timeout)
+            else:
+                client = redis.Redis(**host, socket_timeout=timeout, socket_connect_timeout=timeout)
+            try:
+                client.ping()
+            finally:
+                client.close()
+        return {'status': 'ok', 'backend': type(layer).__name__}
+    except Exception as e:
+        return {'status': 'error', 'error': str(e)}
+
+
+metrics_sampler = MetricsSampler()
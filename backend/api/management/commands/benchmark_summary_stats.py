@@ -0,0 +1,110 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Avg
+from django.test.utils import CaptureQueriesContext
+from api.models import TeacherData, SchoolData, UserSchoolProfile
+from api.scoping import DataScope
+from api.services import SummaryStatsService
+from datetime import date
+import statistics
+import time
+
+
+def legacy_summary_stats(scope):
+    """Summary stats as LocalSummaryStatsView computed them before the single-pass engine"""
+    queryset = scope.school_data()
+    total_schools = queryset.count()
+    total_teachers = scope.teacher_profiles().values('user_id').distinct().count()
+    avg_lp_ratio = queryset.aggregate(avg=Avg('avg_lp_ratio'))['avg'] or 0
+    teacher_queryset = scope.teacher_data()
+    active_teachers = teacher_queryset.order_by('-week_start')[:100].count()
+    return {
+        'total_schools': total_schools,
+        'total_teachers': total_teachers,
+        'active_teachers': active_teachers,
+        'overall_avg_lp_ratio': round(avg_lp_ratio, 2),
+        'performance_breakdown': {
+            'excellent': teacher_queryset.filter(lp_ratio__gte=80).count(),
+            'good': teacher_queryset.filter(lp_ratio__gte=60, lp_ratio__lt=80).count(),
+            'needs_improvement': teacher_queryset.filter(lp_ratio__lt=60).count(),
+        }
+    }
+
+
+def single_pass_summary_stats(scope):
+    """The same numbers from SummaryStatsService (one query per source table)"""
+    schools = SummaryStatsService.school_stats(scope.school_data())
+    teachers = SummaryStatsService.teacher_stats(scope.teacher_data(), distinct=False)
+    return {
+        'total_schools': schools['schools'],
+        'total_teachers': SummaryStatsService.profile_stats(scope.teacher_profiles())['teachers'],
+        'active_teachers': min(teachers['rows'], 100),
+        'overall_avg_lp_ratio': round(schools['avg_lp_ratio'], 2),
+        'performance_breakdown': teachers['bands'],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare query counts and latency of the legacy and single-pass summary statistics'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--role', default='FDE', choices=['FDE', 'AEO', 'Principal'], help='Role scope to benchmark')
+        parser.add_argument('--sector', help='Sector for the AEO scope')
+        parser.add_argument('--school', help='School for the Principal scope')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed runs per implementation')
+        parser.add_argument(
+            '--seed-rows',
+            type=int,
+            default=0,
+            help='Insert this many synthetic teacher rows for the run (rolled back afterwards)'
+        )
+
+    def handle(self, *args, **options):
+        scope = DataScope(role=options['role'], sector=options['sector'], school=options['school'])
+        iterations = max(1, options['iterations'])
+
+        with transaction.atomic():
+            if options['seed_rows']:
+                self.seed(options['seed_rows'])
+
+            results = {}
+            for name, implementation in [('legacy', legacy_summary_stats), ('single-pass', single_pass_summary_stats)]:
+                with CaptureQueriesContext(connection) as queries:
+                    output = implementation(scope)
+                timings = []
+                for _ in range(iterations):
+                    started = time.perf_counter()
+                    implementation(scope)
+                    timings.append((time.perf_counter() - started) * 1000)
+                results[name] = output
+                self.stdout.write(
+                    f"{name:>12}: {len(queries)} queries, "
+                    f"median {statistics.median(timings):.2f} ms, mean {statistics.mean(timings):.2f} ms "
+                    f"over {iterations} runs"
+                )
+
+            transaction.set_rollback(True)
+
+        if results['legacy'] != results['single-pass']:
+            raise CommandError(f"Results differ: {results['legacy']} != {results['single-pass']}")
+        self.stdout.write(self.style.SUCCESS('Results identical'))
+
+    def seed(self, rows):
+        sectors = ['Sector A', 'Sector B', 'Sector C']
+        schools = [f'Benchmark School {i}' for i in range(max(1, rows // 20))]
+        SchoolData.objects.bulk_create([
+            SchoolData(school_name=school, sector=sectors[i % 3], emis=f'BM{i}', teacher_count=20, avg_lp_ratio=i % 100)
+            for i, school in enumerate(schools)
+        ])
+        UserSchoolProfile.objects.bulk_create([
+            UserSchoolProfile(user_id=900000 + i, teacher=f'Teacher {i}', sector=sectors[i % len(schools) % 3],
+                              emis=f'BM{i % len(schools)}', school=schools[i % len(schools)])
+            for i in range(rows)
+        ], batch_size=1000)
+        TeacherData.objects.bulk_create([
+            TeacherData(user_id=900000 + i, teacher=f'Teacher {i}', grade='5', subject='Math',
+                        sector=sectors[i % len(schools) % 3], emis=f'BM{i % len(schools)}',
+                        school=schools[i % len(schools)], week_start=date(2025, 1, 6), week_end=date(2025, 1, 12),
+                        week_number=2, lp_ratio=(i * 7) % 100)
+            for i in range(rows)
+        ], batch_size=1000)
@@ -2,6 +2,8 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.db.models import Avg, Count
 from api.models import TeacherData, SchoolData, SectorData
+from api.services import SnapshotService, AdminSnapshotService
+from api.cache import BigQueryCache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -45,6 +47,8 @@ class Command(BaseCommand):
             if update_sectors:
                 self.update_sector_lp_ratios(force)
 
+            BigQueryCache.invalidate_all()
+            self.rebuild_admin_snapshot(update_schools, update_sectors)
             self.stdout.write(self.style.SUCCESS('LP ratio calculations completed successfully'))
 
         except Exception as e:
@@ -128,6 +132,18 @@ class Command(BaseCommand):
 
             self.stdout.write(f"Sector LP ratios: {created_count} created, {updated_count} updated")
 
+    def rebuild_admin_snapshot(self, update_schools, update_sectors):
+        """Publish new data versions and materialize the default admin dashboard"""
+        if update_schools:
+            SnapshotService.bump('school_data', SchoolData.objects.count())
+        if update_sectors:
+            SnapshotService.bump('sector_data', SectorData.objects.count())
+        try:
+            entry = AdminSnapshotService.build()
+            self.stdout.write(f"Admin snapshot rebuilt (version {entry['version']})")
+        except Exception as e:
+            logger.warning(f'Admin snapshot rebuild failed: {str(e)}')
+
     def display_summary(self):
         """Display summary of calculated data"""
         self.stdout.write("\n" + "="*60)
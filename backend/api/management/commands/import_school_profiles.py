@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from api.school_profiles import school_profiles
+from api.services import SchoolProfileService
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Import internet availability and student-teacher ratio from school_profile_data.json into SchoolData'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Importing school profiles from {school_profiles.path}...")
+
+        try:
+            school_profiles.clear()
+            self.stdout.write(f"Loaded {len(school_profiles.profiles())} school profiles")
+            updated = SchoolProfileService.import_into_school_data()
+            self.stdout.write(f"Updated {updated} SchoolData records")
+            self.stdout.write(self.style.SUCCESS('School profile import completed successfully'))
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Error importing school profiles: {str(e)}'))
+            logger.error(f'School profile import error: {str(e)}')
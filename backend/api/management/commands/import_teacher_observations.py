@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.models import TeacherObservation
+from api.services import ObservationService, SnapshotService
+from api.sync import SYNC_DATASETS, replace_rows, upsert_rows
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Import TEACH tool observation scores from teach_tool_scores.csv (for environments without BigQuery)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            type=str,
+            default=None,
+            help='CSV export to import (default: TEACH_TOOL_SCORES_PATH)'
+        )
+        parser.add_argument(
+            '--mode',
+            type=str,
+            choices=['replace', 'incremental'],
+            default='incremental',
+            help='replace: reload every row; incremental: write only rows whose content hash changed'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path'] or settings.TEACH_TOOL_SCORES_PATH
+        self.stdout.write(f"Importing teacher observations from {path}...")
+
+        try:
+            observations = ObservationService.number_observations(ObservationService.iter_csv(path))
+            if options['mode'] == 'replace':
+                counts = replace_rows(TeacherObservation, observations)
+            else:
+                counts = upsert_rows(TeacherObservation, observations)
+            self.stdout.write(f"{counts['inserted']} inserted, {counts['updated']} updated, "
+                              f"{counts['deleted']} deleted, {counts['unchanged']} unchanged")
+
+            if counts['inserted'] or counts['updated'] or counts['deleted']:
+                SnapshotService.bump(SYNC_DATASETS[TeacherObservation]['name'], row_count=TeacherObservation.objects.count())
+
+            summary_counts = ObservationService.rebuild_school_summaries()
+            self.stdout.write(f"Rebuilt school observation summaries ({summary_counts['inserted']} inserted, "
+                              f"{summary_counts['updated']} updated, {summary_counts['deleted']} deleted)")
+            self.stdout.write(self.style.SUCCESS('Teacher observation import completed successfully'))
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Error importing teacher observations: {str(e)}'))
+            logger.error(f'Teacher observation import error: {str(e)}')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from api.models import SchoolDirectory
+from api.services import PrincipalDirectoryService
+
+
+class Command(BaseCommand):
+    help = 'Create missing principal users and profiles for every school in the synced school directory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows written per bulk insert')
+
+    def handle(self, *args, **options):
+        if not SchoolDirectory.objects.exists():
+            self.stdout.write(self.style.ERROR('School directory is empty; run sync_bigquery_data --data-type=school_directory first'))
+            return
+
+        counts = PrincipalDirectoryService.provision_principals(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(
+            f"Provisioned principal accounts ({counts['users']} users, {counts['profiles']} profiles created)"
+        ))
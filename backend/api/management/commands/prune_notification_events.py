@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api.services import NotificationService
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Delete pushed notification events older than the resume window'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=int(NotificationService.RETENTION.total_seconds() // 3600),
+            help='Keep events from the last N hours'
+        )
+
+    def handle(self, *args, **options):
+        hours = options['hours']
+
+        try:
+            deleted = NotificationService.prune(older_than=timezone.timedelta(hours=hours))
+            self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} notification events older than {hours} hours'))
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Error pruning notification events: {str(e)}'))
+            logger.error(f'Notification event prune error: {str(e)}')
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from api.models import UserUnreadCounter
+from api.services import UnreadCounterService
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Rebuild denormalized unread message counters from the Message table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Only rebuild counters for this user (can be repeated)'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+
+        self.stdout.write("Rebuilding unread message counters...")
+
+        try:
+            conversation_counters = UnreadCounterService.rebuild(user_ids=user_ids)
+            user_counters = UserUnreadCounter.objects.count() if user_ids is None else len(user_ids)
+            self.stdout.write(f"Rebuilt {user_counters} user counters and {conversation_counters} conversation counters")
+            self.stdout.write(self.style.SUCCESS('Unread counter rebuild completed successfully'))
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Error rebuilding unread counters: {str(e)}'))
+            logger.error(f'Unread counter rebuild error: {str(e)}')
@@ -1,12 +1,212 @@
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
-from django.db import transaction
-from api.models import TeacherData, AggregatedData, SchoolData, FilterOptions, DataSyncLog, UserSchoolProfile
+from api.models import TeacherData, AggregatedData, SchoolData, SchoolActivity, SchoolDirectory, TeacherObservation, FilterOptions, DataSyncLog, UserSchoolProfile
+from api.services import SchoolProfileService, SnapshotService, AdminSnapshotService, ObservationService, PrincipalDirectoryService
+from api.cache import BigQueryCache
+from api.sync import SYNC_DATASETS, LoadProgress, replace_rows, upsert_rows, swap_rows, run_queries
+from datetime import datetime
+from itertools import chain
 from google.cloud import bigquery
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Weekly and monthly aggregates differ only in the DATE_TRUNC granularity
+AGGREGATED_QUERY = """
+SELECT
+    e.Institute as School,
+    e.Sector,
+    DATE_TRUNC(a.week_start, {granularity}) as period,
+    COUNT(DISTINCT a.user_id) as teacher_count,
+    AVG(LEAST(IFNULL(lp_started, 0) / max_classes, 1) * 100) as avg_lp_ratio
+FROM `tbproddb.weekly_time_table_NF` a
+INNER JOIN `tbproddb.slo_grade` b ON a.grade_assigned=b.id
+INNER JOIN `tbproddb.slo_subject` c ON a.subject_assigned=c.id
+INNER JOIN `tbproddb.user_school_profiles` d ON a.user_id=d.user_id
+INNER JOIN `tbproddb.FDE_Schools` e ON d.emis_1=e.EMIS
+WHERE max_classes != 0
+GROUP BY e.Institute, e.Sector, period
+ORDER BY period DESC, e.Institute
+"""
+
+QUERIES = {
+    'userschoolprofile': """
+    SELECT a.user_id, a.user_name as Teacher, b.Sector, b.EMIS, b.Institute as School
+    FROM `tbproddb.user_school_profiles` a
+    INNER JOIN `tbproddb.FDE_Schools` b ON a.emis_1 = b.EMIS
+    """,
+    # Teacher data with individual LP ratios
+    'teacher_data': """
+    SELECT
+        a.user_id,
+        d.user_name as Teacher,
+        e.Sector,
+        e.EMIS,
+        e.Institute as School,
+        AVG(LEAST(IFNULL(lp_started, 0) / max_classes, 1) * 100) AS lp_ratio
+    FROM `tbproddb.weekly_time_table_NF` a
+    INNER JOIN `tbproddb.user_school_profiles` d ON a.user_id=d.user_id
+    INNER JOIN `tbproddb.FDE_Schools` e ON d.emis_1=e.EMIS
+    WHERE max_classes != 0
+    GROUP BY user_id, d.user_name, e.Sector, e.EMIS, e.Institute
+    ORDER BY e.Institute, d.user_name
+    """,
+    'aggregated_weekly': AGGREGATED_QUERY.format(granularity='WEEK'),
+    'aggregated_monthly': AGGREGATED_QUERY.format(granularity='MONTH'),
+    'school_data': """
+    SELECT
+        e.Institute as school_name,
+        e.Sector as sector,
+        e.EMIS as emis,
+        COUNT(DISTINCT a.user_id) as teacher_count,
+        AVG(LEAST(IFNULL(lp_started, 0) / max_classes, 1) * 100) as avg_lp_ratio
+    FROM `tbproddb.FDE_Schools` e
+    LEFT JOIN `tbproddb.user_school_profiles` d ON e.EMIS = d.emis_1
+    LEFT JOIN `tbproddb.weekly_time_table_NF` a ON d.user_id = a.user_id AND max_classes != 0
+    GROUP BY e.Institute, e.Sector, e.EMIS
+    ORDER BY e.Institute
+    """,
+    # Per-school teacher activity and infrastructure scores from teacher observations (AEO sector view)
+    'school_activity': """
+    SELECT
+        c.EMIS as emis,
+        c.Institute as school_name,
+        c.Sector as sector,
+        COUNT(DISTINCT d.user_id) as teacher_count,
+        AVG(LEAST(IFNULL(a.lp_started, 0) / a.max_classes, 1) * 100) as avg_lp_ratio,
+        COUNT(DISTINCT CASE
+            WHEN obs.supp_learn_envi_supp_learn_envi_score IS NOT NULL
+            THEN obs.user_id
+        END) as teachers_with_observations,
+        AVG(CAST(obs.supp_learn_envi_supp_learn_envi_score AS FLOAT64)) as avg_infrastructure_score,
+        CASE
+            WHEN AVG(CAST(obs.supp_learn_envi_supp_learn_envi_score AS FLOAT64)) >= 4.0 THEN 'Available'
+            WHEN AVG(CAST(obs.supp_learn_envi_supp_learn_envi_score AS FLOAT64)) >= 3.0 THEN 'Limited'
+            ELSE 'Not Available'
+        END as wifi_status,
+        COUNT(DISTINCT CASE
+            WHEN LEAST(IFNULL(a.lp_started, 0) / a.max_classes, 1) * 100 > 10
+            THEN a.user_id
+        END) as active_teachers,
+        COUNT(DISTINCT CASE
+            WHEN LEAST(IFNULL(a.lp_started, 0) / a.max_classes, 1) * 100 <= 10
+            THEN a.user_id
+        END) as inactive_teachers,
+        COUNT(DISTINCT CASE
+            WHEN CAST(obs.supp_learn_envi_supp_learn_envi_score AS FLOAT64) >= 3.5
+            THEN obs.user_id
+        END) as teachers_with_mobile_access
+    FROM `tbproddb.FDE_Schools` c
+    LEFT JOIN `tbproddb.user_school_profiles` d ON c.EMIS = d.emis_1
+    LEFT JOIN `tbproddb.weekly_time_table_NF` a ON d.user_id = a.user_id AND a.max_classes != 0
+    LEFT JOIN `tbproddb.TEACH_TOOL_OBSERVATION` obs ON d.user_id = obs.user_id
+        AND obs.supp_learn_envi_supp_learn_envi_score IS NOT NULL
+        AND obs.supp_learn_envi_supp_learn_envi_score != ''
+    WHERE c.EMIS IS NOT NULL
+    GROUP BY c.EMIS, c.Institute, c.Sector
+    ORDER BY c.Institute
+    """,
+    # EMIS -> school/sector index used to resolve principal EMIS logins
+    'school_directory': """
+    SELECT
+        c.EMIS as emis,
+        ANY_VALUE(c.Institute) as school_name,
+        ANY_VALUE(c.Sector) as sector,
+        ANY_VALUE(CONCAT('principal_', LOWER(REPLACE(REPLACE(c.Institute, ' ', '_'), '-', '_')))) as principal_username
+    FROM `tbproddb.FDE_Schools` c
+    WHERE c.EMIS IS NOT NULL AND c.Institute IS NOT NULL
+    GROUP BY c.EMIS
+    ORDER BY c.EMIS
+    """,
+    # TEACH tool observation scores for the principal observation and infrastructure views
+    'teacher_observations': """
+    SELECT
+        a.date,
+        a.user_id,
+        c.EMIS,
+        c.Institute as School,
+        c.Sector,
+        CAST(supp_learn_envi_supp_learn_envi_score AS FLOAT64) AS supp_learn_envi_score,
+        CAST(pos_behav_expec_pos_behav_expec_score AS FLOAT64) AS pos_behav_expec_score,
+        CAST(lesson_facilitation_lesson_facilitation_score AS FLOAT64) AS lesson_facilitation_score,
+        CAST(cfu_cfu_score AS FLOAT64) AS cfu_score,
+        CAST(feedback_feedback_score AS FLOAT64) AS feedback_score,
+        CAST(ct_ct_score AS FLOAT64) AS ct_score,
+        CAST(autonomy_autonomy_score AS FLOAT64) AS autonomy_score,
+        CAST(perseverance_perseverance_score AS FLOAT64) AS perseverance_score,
+        CAST(social_social_score AS FLOAT64) AS social_score,
+        ROUND((
+            CAST(supp_learn_envi_supp_learn_envi_score AS FLOAT64) +
+            CAST(pos_behav_expec_pos_behav_expec_score AS FLOAT64) +
+            CAST(lesson_facilitation_lesson_facilitation_score AS FLOAT64) +
+            CAST(cfu_cfu_score AS FLOAT64) +
+            CAST(feedback_feedback_score AS FLOAT64) +
+            CAST(ct_ct_score AS FLOAT64) +
+            CAST(autonomy_autonomy_score AS FLOAT64) +
+            CAST(perseverance_perseverance_score AS FLOAT64) +
+            CAST(social_social_score AS FLOAT64)
+        ) / 9.0, 2) AS overall_average_score
+    FROM `tbproddb.TEACH_TOOL_OBSERVATION` a
+    INNER JOIN `tbproddb.user_school_profiles` b ON a.user_id = b.user_id
+    INNER JOIN `tbproddb.FDE_Schools` c ON b.emis_1 = c.EMIS
+    WHERE supp_learn_envi_supp_learn_envi_score IS NOT NULL
+        AND supp_learn_envi_supp_learn_envi_score != ''
+    ORDER BY a.date DESC, a.user_id
+    """,
+    'filter_schools': """
+    SELECT DISTINCT e.Institute as school
+    FROM `tbproddb.FDE_Schools` e
+    ORDER BY e.Institute
+    """,
+    'filter_sectors': """
+    SELECT DISTINCT e.Sector as sector
+    FROM `tbproddb.FDE_Schools` e
+    ORDER BY e.Sector
+    """,
+    'filter_grades': """
+    SELECT DISTINCT b.label as grade
+    FROM `tbproddb.weekly_time_table_NF` a
+    INNER JOIN `tbproddb.slo_grade` b ON a.grade_assigned=b.id
+    INNER JOIN `tbproddb.user_school_profiles` d ON a.user_id=d.user_id
+    INNER JOIN `tbproddb.FDE_Schools` e ON d.emis_1=e.EMIS
+    WHERE max_classes != 0
+    ORDER BY b.label
+    """,
+    'filter_subjects': """
+    SELECT DISTINCT c.label as subject
+    FROM `tbproddb.weekly_time_table_NF` a
+    INNER JOIN `tbproddb.slo_subject` c ON a.subject_assigned=c.id
+    INNER JOIN `tbproddb.user_school_profiles` d ON a.user_id=d.user_id
+    INNER JOIN `tbproddb.FDE_Schools` e ON d.emis_1=e.EMIS
+    WHERE max_classes != 0
+    ORDER BY c.label
+    """,
+}
+
+# Sync order and the BigQuery jobs each data type needs
+DATASET_QUERIES = {
+    'userschoolprofile': ['userschoolprofile'],
+    'teacher_data': ['teacher_data'],
+    'aggregated_data': ['aggregated_weekly', 'aggregated_monthly'],
+    'school_data': ['school_data'],
+    'school_activity': ['school_activity'],
+    'school_directory': ['school_directory'],
+    'teacher_observations': ['teacher_observations'],
+    'filter_options': ['filter_schools', 'filter_sectors', 'filter_grades', 'filter_subjects'],
+}
+
+# Data types skipped without --force when synced within the last 2 hours
+RECENCY_CHECKS = {
+    'teacher_data': (TeacherData, 'updated_at'),
+    'aggregated_data': (AggregatedData, 'updated_at'),
+    'school_data': (SchoolData, 'updated_at'),
+    'school_activity': (SchoolActivity, 'updated_at'),
+    'school_directory': (SchoolDirectory, 'updated_at'),
+    'teacher_observations': (TeacherObservation, 'updated_at'),
+    'filter_options': (FilterOptions, 'created_at'),
+}
+
 class Command(BaseCommand):
     help = 'Sync data from BigQuery to Django database'
 
@@ -14,7 +214,7 @@ class Command(BaseCommand):
         parser.add_argument(
             '--data-type',
             type=str,
-            choices=['all', 'teacher_data', 'aggregated_data', 'school_data', 'filter_options', 'userschoolprofile'],
+            choices=['all'] + list(DATASET_QUERIES),
             default='all',
             help='Type of data to sync'
         )
@@ -23,57 +223,209 @@ class Command(BaseCommand):
             action='store_true',
             help='Force sync even if data is recent'
         )
+        parser.add_argument(
+            '--mode',
+            type=str,
+            choices=['replace', 'incremental', 'swap'],
+            default='replace',
+            help=('replace: reload every row; incremental: insert/update/delete only rows whose content hash changed; '
+                  'swap: load into a shadow table and swap it in atomically')
+        )
+        parser.add_argument(
+            '--max-concurrency',
+            type=int,
+            default=None,
+            help='Maximum BigQuery jobs in flight at once (default: BIGQUERY_SYNC_MAX_CONCURRENCY; 1 runs them one by one)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Rows fetched from BigQuery and written per batch (default: BIGQUERY_SYNC_CHUNK_SIZE)'
+        )
 
     def handle(self, *args, **options):
         data_type = options['data_type']
         force = options['force']
+        self.mode = options['mode']
+        self.max_concurrency = max(1, options['max_concurrency'] or getattr(settings, 'BIGQUERY_SYNC_MAX_CONCURRENCY', 4))
+        self.chunk_size = max(1, options['chunk_size'] or getattr(settings, 'BIGQUERY_SYNC_CHUNK_SIZE', 1000))
+        self.verbosity = options.get('verbosity', 1)
 
-        self.stdout.write(f"Starting BigQuery data sync for: {data_type}")
+        self.stdout.write(f"Starting BigQuery data sync for: {data_type} ({self.mode} mode, up to {self.max_concurrency} concurrent jobs)")
 
         try:
             client = bigquery.Client()
-            if data_type in ['all', 'userschoolprofile']:
-                self.sync_userschoolprofile(client, force)
-            if data_type in ['all', 'teacher_data']:
-                self.sync_teacher_data(client, force)
-            if data_type in ['all', 'aggregated_data']:
-                self.sync_aggregated_data(client, force)
-            if data_type in ['all', 'school_data']:
-                self.sync_school_data(client, force)
-            if data_type in ['all', 'filter_options']:
-                self.sync_filter_options(client, force)
-            self.stdout.write(self.style.SUCCESS('BigQuery data sync completed successfully'))
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Error during sync: {str(e)}'))
             logger.error(f'BigQuery sync error: {str(e)}')
+            raise CommandError(f'Error during sync: {str(e)}')
 
-    def sync_userschoolprofile(self, client, force=False):
-        """Sync all teacher-school assignments from BigQuery"""
-        from api.models import UserSchoolProfile
-        UserSchoolProfile.objects.all().delete()
-        query = '''
-        SELECT a.user_id, a.user_name as Teacher, b.Sector, b.EMIS, b.Institute as School
-        FROM `tbproddb.user_school_profiles` a
-        INNER JOIN `tbproddb.FDE_Schools` b ON a.emis_1 = b.EMIS
-        '''
-        query_job = client.query(query)
-        results = query_job.result()
-        objs = []
-        for row in results:
-            objs.append(UserSchoolProfile(
-                user_id=row.user_id,
-                teacher=row.Teacher,
-                sector=row.Sector,
-                emis=row.EMIS,
-                school=row.School
-            ))
-        if objs:
-            UserSchoolProfile.objects.bulk_create(objs)
-            self.stdout.write(f"Synced {len(objs)} UserSchoolProfile records")
+        self.failures = {}
+        data_types = [name for name in DATASET_QUERIES if data_type in ['all', name]]
+        if self.max_concurrency > 1:
+            self.sync_concurrently(client, data_types, force)
         else:
-            self.stdout.write("No UserSchoolProfile data found in BigQuery")
+            for name in data_types:
+                self.sync_dataset(name, client, force)
+
+        # Datasets that did load changed their tables (and snapshot versions) even if others failed
+        BigQueryCache.invalidate_all()
+        self.rebuild_admin_snapshot()
+
+        if self.failures:
+            raise CommandError(f"BigQuery data sync failed for: {', '.join(self.failures)}")
+        self.stdout.write(self.style.SUCCESS('BigQuery data sync completed successfully'))
+
+    def sync_dataset(self, name, client, force=False, jobs=None):
+        """Run one data type's sync, recording a failure instead of abandoning the remaining data types"""
+        try:
+            getattr(self, f'sync_{name}')(client, force, jobs=jobs)
+        except Exception as e:
+            self.failures[name] = e
+            self.stdout.write(self.style.ERROR(f'Error syncing {name}: {str(e)}'))
+            logger.error(f'BigQuery sync error ({name}): {str(e)}')
+
+    def rebuild_admin_snapshot(self):
+        """Materialize the default admin dashboard for the data version just loaded"""
+        try:
+            entry = AdminSnapshotService.build()
+            self.stdout.write(f"Admin snapshot rebuilt (version {entry['version']})")
+        except Exception as e:
+            logger.warning(f'Admin snapshot rebuild failed: {str(e)}')
+
+    def sync_concurrently(self, client, data_types, force=False):
+        """Submit every needed job at once and load each data type as soon as all its jobs finish"""
+        pending = {}
+        for name in data_types:
+            if not force and self.is_recent(name):
+                self.sync_dataset(name, client, force)  # records the skip without querying
+            else:
+                pending[name] = set(DATASET_QUERIES[name])
+
+        owners = {query: name for name, queries in pending.items() for query in queries}
+        finished = {}
+        queries = {query: QUERIES[query] for query in owners}
+        for result in run_queries(client, queries, max_concurrency=self.max_concurrency, page_size=self.chunk_size):
+            finished[result.name] = result
+            name = owners[result.name]
+            pending[name].discard(result.name)
+            if not pending[name]:
+                jobs = {query: finished.pop(query) for query in DATASET_QUERIES[name]}
+                self.sync_dataset(name, client, force, jobs=jobs)
+
+    def run_jobs(self, client, data_type, jobs=None):
+        """Results of the data type's queries, running them now unless already fetched"""
+        if jobs is None:
+            queries = {query: QUERIES[query] for query in DATASET_QUERIES[data_type]}
+            jobs = {result.name: result for result in run_queries(client, queries, page_size=self.chunk_size)}
+        for result in jobs.values():
+            if result.error is not None:
+                raise result.error
+            stats = result.stats
+            self.stdout.write(f"  {stats['job']}: {stats['wall_time_s']}s, {stats['bytes_processed']} bytes processed")
+        return jobs
+
+    def is_recent(self, data_type):
+        if data_type not in RECENCY_CHECKS:
+            return False
+        model, field = RECENCY_CHECKS[data_type]
+        return model.objects.filter(**{f'{field}__gte': timezone.now() - timezone.timedelta(hours=2)}).exists()
+
+    def skip_sync(self, sync_log, message):
+        self.stdout.write(message)
+        sync_log.status = 'skipped'
+        sync_log.completed_at = timezone.now()
+        sync_log.save()
+
+    def report_progress(self, progress):
+        if self.verbosity >= 2:
+            self.stdout.write(f"  {progress.rows} rows written ({progress.rows_per_second} rows/sec)")
+
+    def load_rows(self, model, objs):
+        """Stream rows into the table using the selected mode, ``chunk_size`` at a time.
+
+        ``objs`` may be a generator over a BigQuery RowIterator; only one
+        chunk of model instances is alive at once. Returns the sync counts
+        plus the number of rows read and the rows/sec throughput.
+        """
+        progress = LoadProgress(self.report_progress)
+        if self.mode == 'incremental':
+            counts = upsert_rows(model, objs, batch_size=self.chunk_size, progress=progress)
+        elif self.mode == 'swap':
+            counts = swap_rows(model, objs, batch_size=self.chunk_size, progress=progress)
+        else:
+            counts = replace_rows(model, objs, batch_size=self.chunk_size, progress=progress)
+        counts['rows'] = progress.rows
+        counts['rows_per_second'] = progress.rows_per_second
+        if counts['duplicates']:
+            logger.warning(f"{model.__name__}: skipped {counts['duplicates']} rows with a repeated natural key "
+                           f"{tuple(SYNC_DATASETS[model]['key_fields'])}")
+
+        # New snapshot version whenever the stored data changed, so caches keyed on it roll over
+        if counts['inserted'] or counts['updated'] or counts['deleted']:
+            version = SnapshotService.bump(SYNC_DATASETS[model]['name'], row_count=progress.rows)
+            self.stdout.write(f"{model.__name__} snapshot is now version {version}")
+        return counts
+
+    def complete_sync_log(self, sync_log, counts, jobs):
+        sync_log.status = 'success'
+        sync_log.records_processed = counts['inserted'] + counts['updated'] + counts['unchanged']
+        sync_log.records_inserted = counts['inserted']
+        sync_log.records_updated = counts['updated']
+        sync_log.records_deleted = counts['deleted']
+        sync_log.records_unchanged = counts['unchanged']
+        sync_log.rows_per_second = counts['rows_per_second']
+        sync_log.job_stats = [result.stats for result in jobs.values()]
+        sync_log.bytes_processed = sum(result.stats['bytes_processed'] for result in jobs.values())
+        sync_log.completed_at = timezone.now()
+        sync_log.save()
+
+    def fail_sync_log(self, sync_log, error, jobs=None):
+        sync_log.status = 'failed'
+        sync_log.error_message = str(error)
+        if jobs:
+            sync_log.job_stats = [result.stats for result in jobs.values()]
+        sync_log.completed_at = timezone.now()
+        sync_log.save()
+
+    def describe_counts(self, counts):
+        duplicates = f"{counts['duplicates']} duplicate keys skipped, " if counts['duplicates'] else ''
+        return (f"{counts['inserted']} inserted, {counts['updated']} updated, "
+                f"{counts['deleted']} deleted, {counts['unchanged']} unchanged, "
+                f"{duplicates}{counts['rows_per_second']} rows/sec")
+
+    def sync_userschoolprofile(self, client, force=False, jobs=None):
+        """Sync all teacher-school assignments from BigQuery"""
+        sync_log = DataSyncLog.objects.create(
+            sync_type='userschoolprofile',
+            status='running'
+        )
 
-    def sync_teacher_data(self, client, force=False):
+        try:
+            jobs = self.run_jobs(client, 'userschoolprofile', jobs)
+            objs = (
+                UserSchoolProfile(
+                    user_id=row.user_id,
+                    teacher=row.Teacher,
+                    sector=row.Sector,
+                    emis=row.EMIS,
+                    school=row.School
+                )
+                for row in jobs['userschoolprofile'].rows
+            )
+            counts = self.load_rows(UserSchoolProfile, objs)
+            if counts['rows']:
+                self.stdout.write(f"Synced {counts['rows']} UserSchoolProfile records ({self.describe_counts(counts)})")
+            else:
+                self.stdout.write("No UserSchoolProfile data found in BigQuery")
+            self.complete_sync_log(sync_log, counts, jobs)
+
+        except Exception as e:
+            self.fail_sync_log(sync_log, e, jobs)
+            raise
+
+    def sync_teacher_data(self, client, force=False, jobs=None):
         """Sync teacher data from BigQuery"""
         sync_log = DataSyncLog.objects.create(
             sync_type='teacher_data',
@@ -82,44 +434,16 @@ class Command(BaseCommand):
 
         try:
             # Check if we have recent data (within 2 hours)
-            if not force:
-                recent_data = TeacherData.objects.filter(
-                    updated_at__gte=timezone.now() - timezone.timedelta(hours=2)
-                ).first()
-                if recent_data:
-                    self.stdout.write("Teacher data is recent, skipping sync")
-                    sync_log.status = 'skipped'
-                    sync_log.completed_at = timezone.now()
-                    sync_log.save()
-                    return
-
-            # Clear existing data
-            TeacherData.objects.all().delete()
-
-            # Query to get teacher data with individual LP ratios
-            query = """
-            SELECT  
-                a.user_id,
-                d.user_name as Teacher,
-                e.Sector,
-                e.EMIS,
-                e.Institute as School,
-                AVG(LEAST(IFNULL(lp_started, 0) / max_classes, 1) * 100) AS lp_ratio
-            FROM `tbproddb.weekly_time_table_NF` a
-            INNER JOIN `tbproddb.user_school_profiles` d ON a.user_id=d.user_id
-            INNER JOIN `tbproddb.FDE_Schools` e ON d.emis_1=e.EMIS
-            WHERE max_classes != 0
-            GROUP BY user_id, d.user_name, e.Sector, e.EMIS, e.Institute
-            ORDER BY e.Institute, d.user_name
-            """
-
-            query_job = client.query(query)
-            results = query_job.result()
-
-            # Bulk create teacher data
-            teacher_data_list = []
-            for row in results:
-                teacher_data_list.append(TeacherData(
+            if not force and self.is_recent('teacher_data'):
+                self.skip_sync(sync_log, "Teacher data is recent, skipping sync")
+                return
+
+            jobs = self.run_jobs(client, 'teacher_data', jobs)
+
+            # Teacher data, converted and written chunk by chunk
+            today = timezone.now().date()
+            teacher_data = (
+                TeacherData(
                     user_id=row.user_id,
                     teacher=row.Teacher,
                     grade='N/A',
@@ -127,35 +451,27 @@ class Command(BaseCommand):
                     sector=row.Sector,
                     emis=row.EMIS,
                     school=row.School,
-                    week_start=timezone.now().date(),
-                    week_end=timezone.now().date(),
+                    week_start=today,
+                    week_end=today,
                     week_number=1,
                     lp_ratio=float(row.lp_ratio) if row.lp_ratio else 0
-                ))
-
-            # Bulk create in batches
-            if teacher_data_list:
-                batch_size = 1000
-                for i in range(0, len(teacher_data_list), batch_size):
-                    batch = teacher_data_list[i:i + batch_size]
-                    TeacherData.objects.bulk_create(batch)
-                self.stdout.write(f"Synced {len(teacher_data_list)} teacher records")
+                )
+                for row in jobs['teacher_data'].rows
+            )
+
+            counts = self.load_rows(TeacherData, teacher_data)
+            if counts['rows']:
+                self.stdout.write(f"Synced {counts['rows']} teacher records ({self.describe_counts(counts)})")
             else:
                 self.stdout.write("No teacher data found in BigQuery")
 
-            sync_log.status = 'success'
-            sync_log.records_processed = len(teacher_data_list)
-            sync_log.completed_at = timezone.now()
-            sync_log.save()
+            self.complete_sync_log(sync_log, counts, jobs)
 
         except Exception as e:
-            sync_log.status = 'failed'
-            sync_log.error_message = str(e)
-            sync_log.completed_at = timezone.now()
-            sync_log.save()
+            self.fail_sync_log(sync_log, e, jobs)
             raise
 
-    def sync_aggregated_data(self, client, force=False):
+    def sync_aggregated_data(self, client, force=False, jobs=None):
         """Sync aggregated data from BigQuery"""
         sync_log = DataSyncLog.objects.create(
             sync_type='aggregated_data',
@@ -164,177 +480,212 @@ class Command(BaseCommand):
 
         try:
             # Check if we have recent data
-            if not force:
-                recent_data = AggregatedData.objects.filter(
-                    updated_at__gte=timezone.now() - timezone.timedelta(hours=2)
-                ).first()
-                if recent_data:
-                    self.stdout.write("Aggregated data is recent, skipping sync")
-                    sync_log.status = 'skipped'
-                    sync_log.completed_at = timezone.now()
-                    sync_log.save()
-                    return
-
-            # Clear existing data
-            AggregatedData.objects.all().delete()
-
-            # Sync weekly data
-            weekly_query = """
-            SELECT  
-                e.Institute as School,
-                e.Sector,
-                DATE_TRUNC(a.week_start, WEEK) as period,
-                COUNT(DISTINCT a.user_id) as teacher_count,
-                AVG(LEAST(IFNULL(lp_started, 0) / max_classes, 1) * 100) as avg_lp_ratio
-            FROM `tbproddb.weekly_time_table_NF` a 
-            INNER JOIN `tbproddb.slo_grade` b ON a.grade_assigned=b.id 
-            INNER JOIN `tbproddb.slo_subject` c ON a.subject_assigned=c.id 
-            INNER JOIN `tbproddb.user_school_profiles` d ON a.user_id=d.user_id 
-            INNER JOIN `tbproddb.FDE_Schools` e ON d.emis_1=e.EMIS
-            WHERE max_classes != 0
-            GROUP BY e.Institute, e.Sector, period
-            ORDER BY period DESC, e.Institute
-            """
-
-            weekly_job = client.query(weekly_query)
-            weekly_results = weekly_job.result()
-
-            # Sync monthly data
-            monthly_query = """
-            SELECT  
-                e.Institute as School,
-                e.Sector,
-                DATE_TRUNC(a.week_start, MONTH) as period,
-                COUNT(DISTINCT a.user_id) as teacher_count,
-                AVG(LEAST(IFNULL(lp_started, 0) / max_classes, 1) * 100) as avg_lp_ratio
-            FROM `tbproddb.weekly_time_table_NF` a 
-            INNER JOIN `tbproddb.slo_grade` b ON a.grade_assigned=b.id 
-            INNER JOIN `tbproddb.slo_subject` c ON a.subject_assigned=c.id 
-            INNER JOIN `tbproddb.user_school_profiles` d ON a.user_id=d.user_id 
-            INNER JOIN `tbproddb.FDE_Schools` e ON d.emis_1=e.EMIS
-            WHERE max_classes != 0
-            GROUP BY e.Institute, e.Sector, period
-            ORDER BY period DESC, e.Institute
-            """
-
-            monthly_job = client.query(monthly_query)
-            monthly_results = monthly_job.result()
-
-            # Process weekly data
-            aggregated_data_list = []
-            for row in weekly_results:
-                aggregated_data_list.append(AggregatedData(
-                    school=row.School,
-                    sector=row.Sector,
-                    period=row.period,
+            if not force and self.is_recent('aggregated_data'):
+                self.skip_sync(sync_log, "Aggregated data is recent, skipping sync")
+                return
+
+            # Weekly and monthly data
+            jobs = self.run_jobs(client, 'aggregated_data', jobs)
+
+            aggregated_data = chain.from_iterable(
+                (
+                    AggregatedData(
+                        school=row.School,
+                        sector=row.Sector,
+                        period=row.period,
+                        teacher_count=int(row.teacher_count) if row.teacher_count else 0,
+                        avg_lp_ratio=float(row.avg_lp_ratio) if row.avg_lp_ratio else 0,
+                        period_type=period_type
+                    )
+                    for row in jobs[query].rows
+                )
+                for query, period_type in [('aggregated_weekly', 'weekly'), ('aggregated_monthly', 'monthly')]
+            )
+
+            counts = self.load_rows(AggregatedData, aggregated_data)
+            if counts['rows']:
+                self.stdout.write(f"Synced {counts['rows']} aggregated records ({self.describe_counts(counts)})")
+            else:
+                self.stdout.write("No aggregated data found in BigQuery")
+
+            self.complete_sync_log(sync_log, counts, jobs)
+
+        except Exception as e:
+            self.fail_sync_log(sync_log, e, jobs)
+            raise
+
+    def sync_school_data(self, client, force=False, jobs=None):
+        """Sync school data from BigQuery"""
+        sync_log = DataSyncLog.objects.create(
+            sync_type='school_data',
+            status='running'
+        )
+
+        try:
+            # Check if we have recent data
+            if not force and self.is_recent('school_data'):
+                self.skip_sync(sync_log, "School data is recent, skipping sync")
+                return
+
+            jobs = self.run_jobs(client, 'school_data', jobs)
+
+            # School data, skipping rows with null school names
+            school_data = (
+                SchoolData(
+                    school_name=row.school_name,
+                    sector=row.sector or '',
+                    emis=row.emis or '',
                     teacher_count=int(row.teacher_count) if row.teacher_count else 0,
-                    avg_lp_ratio=float(row.avg_lp_ratio) if row.avg_lp_ratio else 0,
-                    period_type='weekly'
-                ))
+                    avg_lp_ratio=float(row.avg_lp_ratio) if row.avg_lp_ratio else 0
+                )
+                for row in jobs['school_data'].rows
+                if row.school_name
+            )
+
+            # Fill internet availability and student-teacher ratio from the survey export
+            school_data = (school for school, _ in SchoolProfileService.iter_with_profiles(school_data))
+
+            counts = self.load_rows(SchoolData, school_data)
+            if counts['rows']:
+                self.stdout.write(f"Synced {counts['rows']} school records ({self.describe_counts(counts)})")
+            else:
+                self.stdout.write("No school data found in BigQuery")
 
-            # Process monthly data
-            for row in monthly_results:
-                aggregated_data_list.append(AggregatedData(
-                    school=row.School,
-                    sector=row.Sector,
-                    period=row.period,
+            self.complete_sync_log(sync_log, counts, jobs)
+
+        except Exception as e:
+            self.fail_sync_log(sync_log, e, jobs)
+            raise
+
+    def sync_school_activity(self, client, force=False, jobs=None):
+        """Sync per-school teacher activity and infrastructure scores from BigQuery"""
+        sync_log = DataSyncLog.objects.create(
+            sync_type='school_activity',
+            status='running'
+        )
+
+        try:
+            # Check if we have recent data
+            if not force and self.is_recent('school_activity'):
+                self.skip_sync(sync_log, "School activity is recent, skipping sync")
+                return
+
+            jobs = self.run_jobs(client, 'school_activity', jobs)
+            school_activity = (
+                SchoolActivity(
+                    emis=row.emis,
+                    school_name=row.school_name,
+                    sector=row.sector or '',
                     teacher_count=int(row.teacher_count) if row.teacher_count else 0,
                     avg_lp_ratio=float(row.avg_lp_ratio) if row.avg_lp_ratio else 0,
-                    period_type='monthly'
-                ))
+                    active_teachers=int(row.active_teachers) if row.active_teachers else 0,
+                    inactive_teachers=int(row.inactive_teachers) if row.inactive_teachers else 0,
+                    teachers_with_observations=int(row.teachers_with_observations) if row.teachers_with_observations else 0,
+                    avg_infrastructure_score=float(row.avg_infrastructure_score) if row.avg_infrastructure_score else 0,
+                    wifi_status=row.wifi_status or 'Not Available',
+                    teachers_with_mobile_access=int(row.teachers_with_mobile_access) if row.teachers_with_mobile_access else 0
+                )
+                for row in jobs['school_activity'].rows
+                if row.school_name
+            )
+
+            counts = self.load_rows(SchoolActivity, school_activity)
+            if counts['rows']:
+                self.stdout.write(f"Synced {counts['rows']} school activity records ({self.describe_counts(counts)})")
+            else:
+                self.stdout.write("No school activity data found in BigQuery")
+
+            self.complete_sync_log(sync_log, counts, jobs)
+
+        except Exception as e:
+            self.fail_sync_log(sync_log, e, jobs)
+            raise
 
-            # Bulk create
-            if aggregated_data_list:
-                AggregatedData.objects.bulk_create(aggregated_data_list)
-                self.stdout.write(f"Synced {len(aggregated_data_list)} aggregated records")
+    def sync_school_directory(self, client, force=False, jobs=None):
+        """Sync the EMIS -> school/sector index and pre-provision principal accounts for it"""
+        sync_log = DataSyncLog.objects.create(
+            sync_type='school_directory',
+            status='running'
+        )
+
+        try:
+            # Check if we have recent data
+            if not force and self.is_recent('school_directory'):
+                self.skip_sync(sync_log, "School directory is recent, skipping sync")
+                return
+
+            jobs = self.run_jobs(client, 'school_directory', jobs)
+            entries = (
+                SchoolDirectory(
+                    emis=row.emis,
+                    school_name=row.school_name,
+                    sector=row.sector or '',
+                    principal_username=row.principal_username
+                )
+                for row in jobs['school_directory'].rows
+            )
+
+            counts = self.load_rows(SchoolDirectory, entries)
+            if counts['rows']:
+                self.stdout.write(f"Synced {counts['rows']} school directory entries ({self.describe_counts(counts)})")
             else:
-                self.stdout.write("No aggregated data found in BigQuery")
+                self.stdout.write("No schools found in BigQuery")
+
+            provisioned = PrincipalDirectoryService.provision_principals()
+            self.stdout.write(f"Provisioned principal accounts ({provisioned['users']} users, "
+                              f"{provisioned['profiles']} profiles created)")
 
-            sync_log.status = 'success'
-            sync_log.records_processed = len(aggregated_data_list)
-            sync_log.completed_at = timezone.now()
-            sync_log.save()
+            self.complete_sync_log(sync_log, counts, jobs)
 
         except Exception as e:
-            sync_log.status = 'failed'
-            sync_log.error_message = str(e)
-            sync_log.completed_at = timezone.now()
-            sync_log.save()
+            self.fail_sync_log(sync_log, e, jobs)
             raise
 
-    def sync_school_data(self, client, force=False):
-        """Sync school data from BigQuery"""
+    def sync_teacher_observations(self, client, force=False, jobs=None):
+        """Sync TEACH tool observations from BigQuery and rebuild the per-school summaries"""
         sync_log = DataSyncLog.objects.create(
-            sync_type='school_data',
+            sync_type='teacher_observations',
             status='running'
         )
 
         try:
             # Check if we have recent data
-            if not force:
-                recent_data = SchoolData.objects.filter(
-                    updated_at__gte=timezone.now() - timezone.timedelta(hours=2)
-                ).first()
-                if recent_data:
-                    self.stdout.write("School data is recent, skipping sync")
-                    sync_log.status = 'skipped'
-                    sync_log.completed_at = timezone.now()
-                    sync_log.save()
-                    return
-
-            # Clear existing data
-            SchoolData.objects.all().delete()
-
-            # Query to get school data
-            query = """
-            SELECT  
-                e.Institute as school_name,
-                e.Sector as sector,
-                e.EMIS as emis,
-                COUNT(DISTINCT a.user_id) as teacher_count,
-                AVG(LEAST(IFNULL(lp_started, 0) / max_classes, 1) * 100) as avg_lp_ratio
-            FROM `tbproddb.FDE_Schools` e
-            LEFT JOIN `tbproddb.user_school_profiles` d ON e.EMIS = d.emis_1
-            LEFT JOIN `tbproddb.weekly_time_table_NF` a ON d.user_id = a.user_id AND max_classes != 0
-            GROUP BY e.Institute, e.Sector, e.EMIS
-            ORDER BY e.Institute
-            """
-
-            query_job = client.query(query)
-            results = query_job.result()
-
-            # Bulk create school data
-            school_data_list = []
-            for row in results:
-                # Skip rows with null school names
-                if row.school_name:
-                    school_data_list.append(SchoolData(
-                        school_name=row.school_name,
-                        sector=row.sector or '',
-                        emis=row.emis or '',
-                        teacher_count=int(row.teacher_count) if row.teacher_count else 0,
-                        avg_lp_ratio=float(row.avg_lp_ratio) if row.avg_lp_ratio else 0
-                    ))
+            if not force and self.is_recent('teacher_observations'):
+                self.skip_sync(sync_log, "Teacher observations are recent, skipping sync")
+                return
 
-            if school_data_list:
-                SchoolData.objects.bulk_create(school_data_list)
-                self.stdout.write(f"Synced {len(school_data_list)} school records")
+            jobs = self.run_jobs(client, 'teacher_observations', jobs)
+            observations = (
+                TeacherObservation(
+                    user_id=row.user_id,
+                    emis=row.EMIS or '',
+                    school=row.School,
+                    sector=row.Sector or '',
+                    date=row.date.date() if isinstance(row.date, datetime) else row.date,
+                    overall_average_score=row.overall_average_score,
+                    **{field: getattr(row, field) for field in ObservationService.SCORE_FIELDS}
+                )
+                for row in jobs['teacher_observations'].rows
+                if row.School
+            )
+
+            counts = self.load_rows(TeacherObservation, ObservationService.number_observations(observations))
+            if counts['rows']:
+                self.stdout.write(f"Synced {counts['rows']} teacher observations ({self.describe_counts(counts)})")
             else:
-                self.stdout.write("No school data found in BigQuery")
+                self.stdout.write("No teacher observations found in BigQuery")
+
+            summary_counts = ObservationService.rebuild_school_summaries()
+            self.stdout.write(f"Rebuilt school observation summaries ({summary_counts['inserted']} inserted, "
+                              f"{summary_counts['updated']} updated, {summary_counts['deleted']} deleted)")
 
-            sync_log.status = 'success'
-            sync_log.records_processed = len(school_data_list)
-            sync_log.completed_at = timezone.now()
-            sync_log.save()
+            self.complete_sync_log(sync_log, counts, jobs)
 
         except Exception as e:
-            sync_log.status = 'failed'
-            sync_log.error_message = str(e)
-            sync_log.completed_at = timezone.now()
-            sync_log.save()
+            self.fail_sync_log(sync_log, e, jobs)
             raise
 
-    def sync_filter_options(self, client, force=False):
+    def sync_filter_options(self, client, force=False, jobs=None):
         """Sync filter options from BigQuery"""
         sync_log = DataSyncLog.objects.create(
             sync_type='filter_options',
@@ -343,109 +694,37 @@ class Command(BaseCommand):
 
         try:
             # Check if we have recent data
-            if not force:
-                recent_data = FilterOptions.objects.filter(
-                    created_at__gte=timezone.now() - timezone.timedelta(hours=2)
-                ).first()
-                if recent_data:
-                    self.stdout.write("Filter options are recent, skipping sync")
-                    sync_log.status = 'skipped'
-                    sync_log.completed_at = timezone.now()
-                    sync_log.save()
-                    return
-
-            # Clear existing filter options
-            FilterOptions.objects.all().delete()
-
-            # Get schools
-            schools_query = """
-            SELECT DISTINCT e.Institute as school
-            FROM `tbproddb.FDE_Schools` e
-            ORDER BY e.Institute
-            """
-            schools_job = client.query(schools_query)
-            schools = [row.school for row in schools_job.result()]
-
-            # Get sectors
-            sectors_query = """
-            SELECT DISTINCT e.Sector as sector
-            FROM `tbproddb.FDE_Schools` e
-            ORDER BY e.Sector
-            """
-            sectors_job = client.query(sectors_query)
-            sectors = [row.sector for row in sectors_job.result()]
-
-            # Get grades
-            grades_query = """
-            SELECT DISTINCT b.label as grade
-            FROM `tbproddb.weekly_time_table_NF` a 
-            INNER JOIN `tbproddb.slo_grade` b ON a.grade_assigned=b.id 
-            INNER JOIN `tbproddb.user_school_profiles` d ON a.user_id=d.user_id 
-            INNER JOIN `tbproddb.FDE_Schools` e ON d.emis_1=e.EMIS
-            WHERE max_classes != 0
-            ORDER BY b.label
-            """
-            grades_job = client.query(grades_query)
-            grades = [row.grade for row in grades_job.result()]
-
-            # Get subjects
-            subjects_query = """
-            SELECT DISTINCT c.label as subject
-            FROM `tbproddb.weekly_time_table_NF` a 
-            INNER JOIN `tbproddb.slo_subject` c ON a.subject_assigned=c.id 
-            INNER JOIN `tbproddb.user_school_profiles` d ON a.user_id=d.user_id 
-            INNER JOIN `tbproddb.FDE_Schools` e ON d.emis_1=e.EMIS
-            WHERE max_classes != 0
-            ORDER BY c.label
-            """
-            subjects_job = client.query(subjects_query)
-            subjects = [row.subject for row in subjects_job.result()]
+            if not force and self.is_recent('filter_options'):
+                self.skip_sync(sync_log, "Filter options are recent, skipping sync")
+                return
+
+            # Schools, sectors, grades and subjects
+            jobs = self.run_jobs(client, 'filter_options', jobs)
 
             # Create filter options
             filter_options_list = []
-            
-            for school in schools:
-                if school:  # Skip empty values
-                    filter_options_list.append(FilterOptions(
-                        option_type='schools',
-                        option_value=school
-                    ))
-
-            for sector in sectors:
-                if sector:  # Skip empty values
-                    filter_options_list.append(FilterOptions(
-                        option_type='sectors',
-                        option_value=sector
-                    ))
-
-            for grade in grades:
-                if grade:  # Skip empty values
-                    filter_options_list.append(FilterOptions(
-                        option_type='grades',
-                        option_value=grade
-                    ))
-
-            for subject in subjects:
-                if subject:  # Skip empty values
-                    filter_options_list.append(FilterOptions(
-                        option_type='subjects',
-                        option_value=subject
-                    ))
-
-            if filter_options_list:
-                FilterOptions.objects.bulk_create(filter_options_list)
-                self.stdout.write(f"Synced {len(filter_options_list)} filter options")
+            for query, option_type, column in [
+                ('filter_schools', 'schools', 'school'),
+                ('filter_sectors', 'sectors', 'sector'),
+                ('filter_grades', 'grades', 'grade'),
+                ('filter_subjects', 'subjects', 'subject'),
+            ]:
+                for row in jobs[query].rows:
+                    value = getattr(row, column)
+                    if value:  # Skip empty values
+                        filter_options_list.append(FilterOptions(
+                            option_type=option_type,
+                            option_value=value
+                        ))
+
+            counts = self.load_rows(FilterOptions, filter_options_list)
+            if counts['rows']:
+                self.stdout.write(f"Synced {counts['rows']} filter options ({self.describe_counts(counts)})")
             else:
                 self.stdout.write("No filter options found in BigQuery")
 
-            sync_log.status = 'success'
-            sync_log.records_processed = len(filter_options_list)
-            sync_log.completed_at = timezone.now()
-            sync_log.save()
+            self.complete_sync_log(sync_log, counts, jobs)
 
         except Exception as e:
-            sync_log.status = 'failed'
-            sync_log.error_message = str(e)
-            sync_log.completed_at = timezone.now()
-            sync_log.save()
-            raise 
\ No newline at end of file
+            self.fail_sync_log(sync_log, e, jobs)
+            raise
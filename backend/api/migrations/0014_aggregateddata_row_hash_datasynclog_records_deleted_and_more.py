@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_message_api_message_convers_71406b_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aggregateddata',
+            name='row_hash',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='datasynclog',
+            name='records_deleted',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='datasynclog',
+            name='records_inserted',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='datasynclog',
+            name='records_unchanged',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='datasynclog',
+            name='records_updated',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='filteroptions',
+            name='row_hash',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='schooldata',
+            name='row_hash',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='teacherdata',
+            name='row_hash',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='userschoolprofile',
+            name='row_hash',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_syncsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasynclog',
+            name='bytes_processed',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='datasynclog',
+            name='job_stats',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
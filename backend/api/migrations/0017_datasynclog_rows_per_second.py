@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_datasynclog_bytes_processed_datasynclog_job_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasynclog',
+            name='rows_per_second',
+            field=models.FloatField(default=0),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_datasynclog_rows_per_second'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='teacherdata',
+            index=models.Index(fields=['user_id', '-week_start'], name='api_teacher_user_id_8c3631_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_schoolactivity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolObservationSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('school', models.CharField(max_length=255)),
+                ('emis', models.CharField(max_length=50)),
+                ('sector', models.CharField(max_length=100)),
+                ('observations', models.IntegerField(default=0)),
+                ('total_teachers', models.IntegerField(default=0)),
+                ('teachers_with_good_infrastructure', models.IntegerField(default=0)),
+                ('teachers_with_mobile_access', models.IntegerField(default=0)),
+                ('avg_infrastructure_score', models.FloatField(default=0)),
+                ('avg_overall_score', models.FloatField(default=0)),
+                ('wifi_status', models.CharField(default='Not Available', max_length=20)),
+                ('row_hash', models.CharField(blank=True, default='', max_length=40)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['school'], name='api_schoolo_school_2fdfd7_idx'), models.Index(fields=['emis'], name='api_schoolo_emis_953500_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TeacherObservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.IntegerField()),
+                ('emis', models.CharField(max_length=50)),
+                ('school', models.CharField(max_length=255)),
+                ('sector', models.CharField(max_length=100)),
+                ('date', models.DateField(blank=True, null=True)),
+                ('sequence', models.IntegerField(default=0)),
+                ('supp_learn_envi_score', models.FloatField(blank=True, null=True)),
+                ('pos_behav_expec_score', models.FloatField(blank=True, null=True)),
+                ('lesson_facilitation_score', models.FloatField(blank=True, null=True)),
+                ('cfu_score', models.FloatField(blank=True, null=True)),
+                ('feedback_score', models.FloatField(blank=True, null=True)),
+                ('ct_score', models.FloatField(blank=True, null=True)),
+                ('autonomy_score', models.FloatField(blank=True, null=True)),
+                ('perseverance_score', models.FloatField(blank=True, null=True)),
+                ('social_score', models.FloatField(blank=True, null=True)),
+                ('overall_average_score', models.FloatField(blank=True, null=True)),
+                ('row_hash', models.CharField(blank=True, default='', max_length=40)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['school', '-date'], name='api_teacher_school_a99765_idx'), models.Index(fields=['emis'], name='api_teacher_emis_f8fce6_idx'), models.Index(fields=['user_id'], name='api_teacher_user_id_ea60ac_idx')],
+            },
+        ),
+    ]
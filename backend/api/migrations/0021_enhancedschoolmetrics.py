@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_schoolobservationsummary_teacherobservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnhancedSchoolMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('emis', models.CharField(max_length=50)),
+                ('school_name', models.CharField(max_length=255)),
+                ('sector', models.CharField(max_length=100)),
+                ('teacher_count', models.IntegerField(default=0)),
+                ('avg_lp_ratio', models.FloatField(default=0)),
+                ('teachers_with_observations', models.IntegerField(default=0)),
+                ('avg_infrastructure_score', models.FloatField(default=0)),
+                ('wifi_status', models.CharField(default='Not Available', max_length=20)),
+                ('teachers_with_mobile_access', models.IntegerField(default=0)),
+                ('row_hash', models.CharField(blank=True, default='', max_length=40)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['school_name'], name='api_enhance_school__357942_idx'), models.Index(fields=['sector', 'school_name'], name='api_enhance_sector_c83c3a_idx'), models.Index(fields=['emis'], name='api_enhance_emis_35fa4c_idx')],
+            },
+        ),
+    ]
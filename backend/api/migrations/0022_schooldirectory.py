@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_enhancedschoolmetrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolDirectory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('emis', models.CharField(max_length=50, unique=True)),
+                ('school_name', models.CharField(max_length=255)),
+                ('sector', models.CharField(blank=True, default='', max_length=100)),
+                ('principal_username', models.CharField(max_length=150)),
+                ('row_hash', models.CharField(blank=True, default='', max_length=40)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['principal_username'], name='api_schoold_princip_7da059_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_notificationprunemark'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='EnhancedSchoolMetrics',
+        ),
+        migrations.AddField(
+            model_name='schoolactivity',
+            name='teachers_with_mobile_access',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='schoolactivity',
+            index=models.Index(fields=['school_name'], name='api_schoola_school__26b7b4_idx'),
+        ),
+    ]
@@ -50,6 +50,55 @@ class Message(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['receiver', 'is_read']),
+            models.Index(fields=['conversation', 'timestamp']),
+        ]
+
+class UserUnreadCounter(models.Model):
+    """Denormalized unread message count per user, maintained on message writes"""
+    user = models.OneToOneField(User, related_name='unread_counter', on_delete=models.CASCADE)
+    unread_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.unread_count} unread"
+
+class ConversationUnreadCounter(models.Model):
+    """Denormalized unread message count per user and conversation"""
+    conversation = models.ForeignKey(Conversation, related_name='unread_counters', on_delete=models.CASCADE)
+    user = models.ForeignKey(User, related_name='conversation_unread_counters', on_delete=models.CASCADE)
+    unread_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['conversation', 'user']
+
+class NotificationEvent(models.Model):
+    """Per-user log of pushed notification events; the id is the resume sequence number"""
+    user = models.ForeignKey(User, related_name='notification_events', on_delete=models.CASCADE)
+    event_type = models.CharField(max_length=50)  # unread_count_changed, conversation_updated
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id']),
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.event_type} #{self.id}"
+
+class NotificationPruneMark(models.Model):
+    """Highest NotificationEvent id removed by pruning; resuming from below it requires a resync"""
+    pruned_through = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"pruned through #{self.pruned_through}"
+
 # New models for BigQuery data caching
 class TeacherData(models.Model):
     user_id = models.IntegerField()
@@ -63,6 +112,7 @@ class TeacherData(models.Model):
     week_end = models.DateField()
     week_number = models.IntegerField()
     lp_ratio = models.FloatField()
+    row_hash = models.CharField(max_length=40, blank=True, default='')  # content hash used by incremental sync
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -73,6 +123,7 @@ class TeacherData(models.Model):
             models.Index(fields=['grade']),
             models.Index(fields=['subject']),
             models.Index(fields=['week_start']),
+            models.Index(fields=['user_id', '-week_start']),  # latest row per teacher
         ]
 
 class AggregatedData(models.Model):
@@ -82,6 +133,7 @@ class AggregatedData(models.Model):
     teacher_count = models.IntegerField()
     avg_lp_ratio = models.FloatField()
     period_type = models.CharField(max_length=20, default='weekly')  # weekly, monthly
+    row_hash = models.CharField(max_length=40, blank=True, default='')  # content hash used by incremental sync
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -101,6 +153,7 @@ class SchoolData(models.Model):
     avg_lp_ratio = models.FloatField()
     internet_availability = models.CharField(max_length=10, default='No')
     student_teacher_ratio = models.CharField(max_length=20, default='1:0')
+    row_hash = models.CharField(max_length=40, blank=True, default='')  # content hash used by incremental sync
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -110,9 +163,102 @@ class SchoolData(models.Model):
             models.Index(fields=['sector']),
         ]
 
+class SchoolActivity(models.Model):
+    """Per-school teacher activity, observation-based infrastructure scores and mobile access, synced from BigQuery"""
+    emis = models.CharField(max_length=50)
+    school_name = models.CharField(max_length=255)
+    sector = models.CharField(max_length=100)
+    teacher_count = models.IntegerField(default=0)
+    avg_lp_ratio = models.FloatField(default=0)
+    active_teachers = models.IntegerField(default=0)  # LP ratio above 10%
+    inactive_teachers = models.IntegerField(default=0)
+    teachers_with_observations = models.IntegerField(default=0)
+    avg_infrastructure_score = models.FloatField(default=0)  # supportive learning environment score
+    wifi_status = models.CharField(max_length=20, default='Not Available')  # Available, Limited, Not Available
+    teachers_with_mobile_access = models.IntegerField(default=0)  # supportive environment score >= 3.5
+    row_hash = models.CharField(max_length=40, blank=True, default='')  # content hash used by incremental sync
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['school_name']),
+            models.Index(fields=['sector', 'school_name']),
+            models.Index(fields=['emis']),
+        ]
+
+class SchoolDirectory(models.Model):
+    """EMIS -> school/sector index from FDE_Schools, synced from BigQuery; resolves principal EMIS logins locally"""
+    emis = models.CharField(max_length=50, unique=True)
+    school_name = models.CharField(max_length=255)
+    sector = models.CharField(max_length=100, blank=True, default='')
+    principal_username = models.CharField(max_length=150)  # principal_<school name>, as created on EMIS login
+    row_hash = models.CharField(max_length=40, blank=True, default='')  # content hash used by incremental sync
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['principal_username']),
+        ]
+
+    def __str__(self):
+        return f"{self.emis} - {self.school_name}"
+
+class TeacherObservation(models.Model):
+    """One TEACH tool classroom observation: the nine indicator scores and their average"""
+    user_id = models.IntegerField()
+    emis = models.CharField(max_length=50)
+    school = models.CharField(max_length=255)
+    sector = models.CharField(max_length=100)
+    date = models.DateField(null=True, blank=True)  # not present in the CSV export
+    sequence = models.IntegerField(default=0)  # tells apart observations of a teacher on the same date
+    supp_learn_envi_score = models.FloatField(null=True, blank=True)
+    pos_behav_expec_score = models.FloatField(null=True, blank=True)
+    lesson_facilitation_score = models.FloatField(null=True, blank=True)
+    cfu_score = models.FloatField(null=True, blank=True)
+    feedback_score = models.FloatField(null=True, blank=True)
+    ct_score = models.FloatField(null=True, blank=True)
+    autonomy_score = models.FloatField(null=True, blank=True)
+    perseverance_score = models.FloatField(null=True, blank=True)
+    social_score = models.FloatField(null=True, blank=True)
+    overall_average_score = models.FloatField(null=True, blank=True)
+    row_hash = models.CharField(max_length=40, blank=True, default='')  # content hash used by incremental sync
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['school', '-date']),
+            models.Index(fields=['emis']),
+            models.Index(fields=['user_id']),
+        ]
+
+class SchoolObservationSummary(models.Model):
+    """Per-school averages of TeacherObservation, rebuilt after every observation load"""
+    school = models.CharField(max_length=255)
+    emis = models.CharField(max_length=50)
+    sector = models.CharField(max_length=100)
+    observations = models.IntegerField(default=0)
+    total_teachers = models.IntegerField(default=0)
+    teachers_with_good_infrastructure = models.IntegerField(default=0)  # supportive environment score >= 4
+    teachers_with_mobile_access = models.IntegerField(default=0)  # supportive environment score >= 3.5
+    avg_infrastructure_score = models.FloatField(default=0)
+    avg_overall_score = models.FloatField(default=0)
+    wifi_status = models.CharField(max_length=20, default='Not Available')  # Available, Limited, Not Available
+    row_hash = models.CharField(max_length=40, blank=True, default='')  # content hash used by incremental sync
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['school']),
+            models.Index(fields=['emis']),
+        ]
+
 class FilterOptions(models.Model):
     option_type = models.CharField(max_length=20)  # schools, sectors, grades, subjects
     option_value = models.CharField(max_length=255)
+    row_hash = models.CharField(max_length=40, blank=True, default='')  # content hash used by incremental sync
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -122,9 +268,16 @@ class FilterOptions(models.Model):
         ]
 
 class DataSyncLog(models.Model):
-    sync_type = models.CharField(max_length=50)  # teacher_data, aggregated_data, school_data, filter_options
+    sync_type = models.CharField(max_length=50)  # teacher_data, aggregated_data, school_data, school_activity, school_directory, teacher_observations, filter_options
     status = models.CharField(max_length=20)  # success, failed
     records_processed = models.IntegerField(default=0)
+    records_inserted = models.IntegerField(default=0)
+    records_updated = models.IntegerField(default=0)
+    records_deleted = models.IntegerField(default=0)
+    records_unchanged = models.IntegerField(default=0)
+    bytes_processed = models.BigIntegerField(default=0)
+    rows_per_second = models.FloatField(default=0)
+    job_stats = models.JSONField(default=list, blank=True)  # per BigQuery job: job, job_id, wall_time_s, bytes_processed
     error_message = models.TextField(blank=True, null=True)
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
@@ -132,12 +285,23 @@ class DataSyncLog(models.Model):
     def __str__(self):
         return f"{self.sync_type} - {self.status} - {self.started_at}"
 
+class SyncSnapshot(models.Model):
+    """Version stamp per synced dataset; the global snapshot version is the highest one"""
+    dataset = models.CharField(max_length=50, unique=True)  # matches DataSyncLog.sync_type
+    version = models.PositiveIntegerField(default=0)
+    row_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.dataset} - v{self.version}"
+
 class UserSchoolProfile(models.Model):
     user_id = models.IntegerField()
     teacher = models.CharField(max_length=255)
     sector = models.CharField(max_length=100)
     emis = models.CharField(max_length=50)
     school = models.CharField(max_length=255)
+    row_hash = models.CharField(max_length=40, blank=True, default='')  # content hash used by incremental sync
 
     class Meta:
         indexes = [
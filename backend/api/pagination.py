@@ -0,0 +1,132 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+import base64
+import json
+
+
+class KeysetPagination:
+    """Keyset (cursor) pagination over an ordering field plus the primary key.
+
+    Cursors are opaque base64 strings holding the (field value, pk) of a row.
+    ``after`` returns rows following the cursor in the ordering and ``before``
+    returns rows preceding it, so paging never uses OFFSET and stays fast on
+    deep pages as long as an index covers the ordering field.
+    """
+
+    def __init__(self, field, descending=False, default_page_size=50, max_page_size=200, pk_field='id'):
+        self.field = field
+        self.descending = descending
+        self.pk_field = pk_field  # primary key column when paging ``values()`` rows
+        self.default_page_size = default_page_size
+        self.max_page_size = max_page_size
+
+    @staticmethod
+    def is_requested(request):
+        """Whether the client asked for a cursor page rather than the full list"""
+        return any(param in request.GET for param in ('page_size', 'before', 'after', 'cursor'))
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.GET.get('page_size', self.default_page_size))
+        except (TypeError, ValueError):
+            page_size = self.default_page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, obj):
+        if isinstance(obj, dict):
+            value, pk = obj[self.field], obj[self.pk_field]
+        else:
+            value, pk = getattr(obj, self.field), obj.pk
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        raw = json.dumps([value, pk], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, queryset, cursor):
+        """Return the (field value, pk) stored in a cursor; raises ValueError if invalid"""
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            model_field = queryset.model._meta.get_field(self.field)
+            return model_field.to_python(value), queryset.model._meta.pk.to_python(pk)
+        except Exception:
+            raise ValueError('Invalid cursor')
+
+    def _following(self, queryset, value, pk, forward):
+        # "forward" walks in the pagination ordering, otherwise against it
+        op = 'gt' if forward != self.descending else 'lt'
+        return queryset.filter(
+            Q(**{f'{self.field}__{op}': value}) |
+            Q(**{self.field: value, f'pk__{op}': pk})
+        )
+
+    def _ordering(self, forward):
+        ascending = forward != self.descending
+        prefix = '' if ascending else '-'
+        return [f'{prefix}{self.field}', f'{prefix}pk']
+
+    def order(self, queryset):
+        """``queryset`` in pagination order, e.g. for clients still paging by offset"""
+        return queryset.order_by(*self._ordering(True))
+
+    def paginate(self, queryset, request, start_from_end=False):
+        """Return one page of ``queryset`` in pagination order.
+
+        With no cursor the first page is returned, or the last page when
+        ``start_from_end`` is set (e.g. the latest messages of a conversation).
+        """
+        page_size = self.get_page_size(request)
+        before = request.GET.get('before')
+        after = request.GET.get('after') or request.GET.get('cursor')
+
+        if after:
+            value, pk = self.decode_cursor(queryset, after)
+            queryset = self._following(queryset, value, pk, forward=True)
+            forward = True
+        elif before:
+            value, pk = self.decode_cursor(queryset, before)
+            queryset = self._following(queryset, value, pk, forward=False)
+            forward = False
+        else:
+            forward = not start_from_end
+
+        rows = list(queryset.order_by(*self._ordering(forward))[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if not forward:
+            rows.reverse()
+
+        return {
+            'results': rows,
+            'page_size': page_size,
+            'has_more': has_more,
+            'before_cursor': self.encode_cursor(rows[0]) if rows else before,
+            'after_cursor': self.encode_cursor(rows[-1]) if rows else after,
+        }
+
+
+def estimate_count(queryset, limit=10000):
+    """Cheap row count for large tables.
+
+    PostgreSQL answers from the planner's row estimate; other backends count
+    at most ``limit`` rows, so the cost is bounded however big the table is.
+    """
+    queryset = queryset.order_by()
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    return queryset[:limit].count()
+
+
+def message_history_pagination():
+    """Keyset pagination for conversation history, oldest to newest on (timestamp, id)"""
+    return KeysetPagination(
+        'timestamp',
+        default_page_size=getattr(settings, 'MESSAGE_HISTORY_PAGE_SIZE', 50),
+        max_page_size=getattr(settings, 'MESSAGE_HISTORY_MAX_PAGE_SIZE', 200),
+    )
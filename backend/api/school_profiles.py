@@ -0,0 +1,91 @@
+from django.conf import settings
+from typing import NamedTuple, Optional
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class SchoolProfile(NamedTuple):
+    """Infrastructure survey values for one school"""
+    emis: str
+    internet_availability: str
+    student_teacher_ratio: str
+
+    @property
+    def has_internet(self) -> bool:
+        return self.internet_availability.strip().lower() == 'yes'
+
+    @property
+    def students_per_teacher(self) -> Optional[int]:
+        """Parsed right-hand side of a '1:N' ratio, or None if it is not a valid ratio"""
+        try:
+            _, students = self.student_teacher_ratio.split(':', 1)
+            return int(float(students))
+        except (ValueError, AttributeError):
+            return None
+
+
+class SchoolProfileRegistry:
+    """EMIS-keyed index over school_profile_data.json.
+
+    The file is parsed once and re-parsed only when its modification time
+    changes, so request handlers can look schools up without touching JSON.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._profiles = {}
+
+    def _current_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        profiles = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                json_data = json.load(f)
+            for item in json_data.get('Main Sheet', []):
+                emis = str(item.get("School's EMIS") or '').strip()
+                if emis:
+                    profiles[emis] = SchoolProfile(
+                        emis=emis,
+                        internet_availability=item.get('Internet') or 'No',
+                        student_teacher_ratio=item.get('Student Teacher Ratio') or '1:0',
+                    )
+        except Exception as e:
+            logger.error(f"Error loading school profile data from {self.path}: {e}")
+        return profiles
+
+    def profiles(self):
+        """Return the EMIS -> SchoolProfile mapping, reloading if the file changed"""
+        mtime = self._current_mtime()
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._profiles = self._load() if mtime is not None else {}
+                    self._mtime = mtime
+        return self._profiles
+
+    def get(self, emis):
+        return self.profiles().get(str(emis).strip()) if emis is not None else None
+
+    def clear(self):
+        """Forget the parsed data so the next lookup reloads the file"""
+        with self._lock:
+            self._mtime = None
+            self._profiles = {}
+
+
+school_profiles = SchoolProfileRegistry(getattr(
+    settings,
+    'SCHOOL_PROFILE_DATA_PATH',
+    os.path.join(settings.BASE_DIR, '..', 'frontend', 'src', 'components', 'school_profile_data.json'),
+))
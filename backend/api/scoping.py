@@ -0,0 +1,81 @@
+from typing import NamedTuple, Optional
+from .models import UserProfile, TeacherData, AggregatedData, SchoolData, UserSchoolProfile
+
+# (school field, sector field) on each scoped model
+SCOPE_FIELDS = {
+    TeacherData: ('school', 'sector'),
+    AggregatedData: ('school', 'sector'),
+    SchoolData: ('school_name', 'sector'),
+    UserSchoolProfile: ('school', 'sector'),
+}
+
+RESTRICTED_ROLES = ('AEO', 'Principal')
+
+
+class DataScope(NamedTuple):
+    """The slice of synced data a user may see, derived from their profile.
+
+    AEOs see their sector and principals their school; FDEs and other roles
+    see everything. An AEO without a sector or a principal without a school
+    sees nothing rather than falling back to all data.
+    """
+    role: str
+    sector: Optional[str] = None
+    school: Optional[str] = None
+
+    @classmethod
+    def for_profile(cls, user_profile):
+        """Scope of a UserProfile (or any object with role/sector/school_name)"""
+        if isinstance(user_profile, cls):
+            return user_profile
+        return cls(
+            role=getattr(user_profile, 'role', '') or '',
+            sector=getattr(user_profile, 'sector', None) or None,
+            school=getattr(user_profile, 'school_name', None) or None,
+        )
+
+    @property
+    def key(self):
+        """Stable identifier for per-scope cache keys"""
+        if self.role == 'AEO':
+            return f'AEO:{self.sector or ""}'
+        if self.role == 'Principal':
+            return f'Principal:{self.school or ""}'
+        return 'all'
+
+    def filter(self, queryset):
+        """Restrict a queryset of one of the scoped models to this scope"""
+        school_field, sector_field = SCOPE_FIELDS[queryset.model]
+        if self.role == 'AEO':
+            return queryset.filter(**{sector_field: self.sector}) if self.sector else queryset.none()
+        if self.role == 'Principal':
+            return queryset.filter(**{school_field: self.school}) if self.school else queryset.none()
+        return queryset
+
+    def teacher_data(self):
+        return self.filter(TeacherData.objects.all())
+
+    def aggregated_data(self, period_type=None):
+        queryset = AggregatedData.objects.all()
+        if period_type:
+            queryset = queryset.filter(period_type=period_type)
+        return self.filter(queryset)
+
+    def school_data(self):
+        return self.filter(SchoolData.objects.all())
+
+    def teacher_profiles(self):
+        return self.filter(UserSchoolProfile.objects.all())
+
+
+def get_scope(request):
+    """The requesting user's DataScope, resolved once and cached on the request"""
+    http_request = getattr(request, '_request', request)  # share it across DRF Request wrappers
+    scope = getattr(http_request, '_data_scope', None)
+    if scope is None:
+        profile = UserProfile.objects.filter(user_id=request.user.id).only('role', 'sector', 'school_name').first()
+        if profile is None:
+            raise UserProfile.DoesNotExist('User has no profile')
+        scope = DataScope.for_profile(profile)
+        http_request._data_scope = scope
+    return scope
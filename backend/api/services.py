@@ -1,25 +1,35 @@
-from django.db.models import Q, Avg, Sum
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q, F, Avg, Sum, Count, Min, Max, OuterRef, Subquery, IntegerField, Value, Window
+from django.db.models.functions import Coalesce, Greatest, RowNumber
 from django.utils import timezone
 from datetime import timedelta
-from .models import TeacherData, AggregatedData, SchoolData, FilterOptions, DataSyncLog, UserSchoolProfile
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from .models import UserProfile, TeacherData, AggregatedData, SchoolData, FilterOptions, DataSyncLog, UserSchoolProfile, Conversation, Message, UserUnreadCounter, ConversationUnreadCounter, NotificationEvent, NotificationPruneMark, SyncSnapshot, TeacherObservation, SchoolObservationSummary, SchoolDirectory
+from .school_profiles import school_profiles
+from .scoping import DataScope
+from .sync import upsert_rows
+import csv
+import hashlib
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
 
 class DataService:
-    """Service class to handle data operations from Django database"""
+    """Service class to handle data operations from Django database.
+
+    Methods take a UserProfile (or a DataScope) and restrict results to the
+    user's role scope through DataScope.
+    """
     
     @staticmethod
     def get_teacher_data(user_profile, grade_filter='', subject_filter='', limit=1000):
         """Get teacher data from Django database with role-based filtering"""
-        queryset = TeacherData.objects.all()
-        
-        # Apply role-based filters
-        if user_profile.role == 'AEO':
-            if user_profile.sector:
-                queryset = queryset.filter(sector=user_profile.sector)
-        elif user_profile.role == 'Principal':
-            queryset = queryset.filter(school=user_profile.school_name)
-        elif user_profile.role == 'FDE':
-            # FDE can see all data
-            pass
+        queryset = DataScope.for_profile(user_profile).teacher_data()
         
         # Apply grade filter
         if grade_filter:
@@ -32,8 +42,11 @@ class DataService:
         # Order by school, teacher, and week start
         queryset = queryset.order_by('school', 'teacher', '-week_start')
         
-        # Limit results
-        queryset = queryset[:limit]
+        # Limit results, loading only the returned columns
+        queryset = queryset.only(
+            'user_id', 'teacher', 'grade', 'subject', 'sector', 'emis', 'school',
+            'week_start', 'week_end', 'week_number', 'lp_ratio',
+        )[:limit]
         
         # Convert to list of dictionaries
         data = []
@@ -58,17 +71,7 @@ class DataService:
     @staticmethod
     def get_aggregated_data(user_profile, period='weekly', grade_filter='', subject_filter='', limit=100):
         """Get aggregated data from Django database"""
-        queryset = AggregatedData.objects.filter(period_type=period)
-        
-        # Apply role-based filters
-        if user_profile.role == 'AEO':
-            if user_profile.sector:
-                queryset = queryset.filter(sector=user_profile.sector)
-        elif user_profile.role == 'Principal':
-            queryset = queryset.filter(school=user_profile.school_name)
-        elif user_profile.role == 'FDE':
-            # FDE can see all data
-            pass
+        queryset = DataScope.for_profile(user_profile).aggregated_data(period)
         
         # Apply grade and subject filters (these would need to be implemented differently
         # since aggregated data doesn't have individual grade/subject breakdown)
@@ -78,7 +81,7 @@ class DataService:
         queryset = queryset.order_by('-period', 'school')
         
         # Limit results
-        queryset = queryset[:limit]
+        queryset = queryset.only('school', 'sector', 'period', 'teacher_count', 'avg_lp_ratio')[:limit]
         
         # Convert to list of dictionaries
         data = []
@@ -97,18 +100,8 @@ class DataService:
     @staticmethod
     def get_school_data(user_profile):
         """Get school data from Django database"""
-        if user_profile.role == 'FDE':
-            queryset = SchoolData.objects.all()
-        elif user_profile.role == 'AEO':
-            if user_profile.sector:
-                queryset = SchoolData.objects.filter(sector=user_profile.sector)
-            else:
-                queryset = SchoolData.objects.none()
-        elif user_profile.role == 'Principal':
-            queryset = SchoolData.objects.filter(school_name=user_profile.school_name)
-        else:
-            queryset = SchoolData.objects.all()
-        queryset = queryset.order_by('school_name')
+        queryset = DataScope.for_profile(user_profile).school_data()
+        queryset = queryset.order_by('school_name').only('school_name', 'sector', 'emis', 'teacher_count', 'avg_lp_ratio')
         data = []
         for item in queryset:
             data.append({
@@ -123,24 +116,26 @@ class DataService:
     @staticmethod
     def get_filter_options(user_profile):
         """Get filter options from Django database"""
+        scope = DataScope.for_profile(user_profile)
+        
         # Get schools
         schools_queryset = FilterOptions.objects.filter(option_type='schools')
-        if user_profile.role == 'AEO':
+        if scope.role == 'AEO':
             # For AEO, we need to filter schools by sector
             # This is a simplified approach - in a real scenario, you might need to join with school data
-            if user_profile.sector:
-                schools_queryset = schools_queryset.filter(option_value__contains=user_profile.sector)
-        elif user_profile.role == 'Principal':
-            schools_queryset = schools_queryset.filter(option_value=user_profile.school_name)
+            if scope.sector:
+                schools_queryset = schools_queryset.filter(option_value__contains=scope.sector)
+        elif scope.role == 'Principal':
+            schools_queryset = schools_queryset.filter(option_value=scope.school)
         
         schools = [item.option_value for item in schools_queryset.order_by('option_value')]
         
         # Get sectors
         sectors_queryset = FilterOptions.objects.filter(option_type='sectors')
-        if user_profile.role == 'AEO':
-            if user_profile.sector:
-                sectors_queryset = sectors_queryset.filter(option_value=user_profile.sector)
-        elif user_profile.role == 'Principal':
+        if scope.role == 'AEO':
+            if scope.sector:
+                sectors_queryset = sectors_queryset.filter(option_value=scope.sector)
+        elif scope.role == 'Principal':
             # Principal can only see their school's sector
             # This would need to be implemented based on the school's sector
             pass
@@ -167,24 +162,23 @@ class DataService:
     @staticmethod
     def get_summary_stats(user_profile, grade_filter='', subject_filter=''):
         """Get summary statistics from Django database"""
-        if user_profile.role == 'FDE':
-            total_schools = UserSchoolProfile.objects.values('school').distinct().count()
-            total_sectors = SchoolData.objects.values('sector').distinct().count()
-            total_teachers = UserSchoolProfile.objects.values('user_id').distinct().count()
-            avg_lp_ratio = TeacherData.objects.aggregate(avg_ratio=Avg('lp_ratio'))['avg_ratio'] or 0
-        elif user_profile.role == 'AEO':
+        scope = DataScope.for_profile(user_profile)
+        if scope.role == 'FDE':
+            profiles = SummaryStatsService.profile_stats(UserSchoolProfile.objects.all())
+            total_schools = profiles['schools']
+            total_sectors = SummaryStatsService.school_stats(SchoolData.objects.all())['sectors']
+            total_teachers = profiles['teachers']
+            avg_lp_ratio = SummaryStatsService.teacher_stats(TeacherData.objects.all(), distinct=False)['avg_lp_ratio']
+        elif scope.role == 'AEO':
             # For AEO, use UserSchoolProfile and SchoolData for sector-specific stats
-            if user_profile.sector:
+            if scope.sector:
                 # Get teachers from UserSchoolProfile for the sector
-                teacher_data = UserSchoolProfile.objects.filter(sector=user_profile.sector)
-                total_teachers = teacher_data.values('user_id').distinct().count()
+                total_teachers = SummaryStatsService.profile_stats(scope.teacher_profiles())['teachers']
                 
-                # Get schools from SchoolData for the sector
-                school_data = SchoolData.objects.filter(sector=user_profile.sector)
-                total_schools = school_data.count()
-                
-                # Calculate average LP ratio from SchoolData
-                avg_lp_ratio = school_data.aggregate(avg_ratio=Avg('avg_lp_ratio'))['avg_ratio'] or 0
+                # Schools and average LP ratio from SchoolData for the sector
+                schools = SummaryStatsService.school_stats(scope.school_data())
+                total_schools = schools['schools']
+                avg_lp_ratio = schools['avg_lp_ratio']
                 
                 total_sectors = 1  # AEO only sees their sector
             else:
@@ -194,17 +188,16 @@ class DataService:
                 avg_lp_ratio = 0
         else:
             # For Principal and other roles, use TeacherData
-            teacher_data = TeacherData.objects.all()
-            if user_profile.role == 'Principal':
-                teacher_data = teacher_data.filter(school=user_profile.school_name)
+            teacher_data = scope.teacher_data()
             if grade_filter:
                 teacher_data = teacher_data.filter(grade=grade_filter)
             if subject_filter:
                 teacher_data = teacher_data.filter(subject=subject_filter)
-            total_teachers = teacher_data.values('user_id').distinct().count()
-            total_schools = teacher_data.values('school').distinct().count()
-            total_sectors = teacher_data.values('sector').distinct().count()
-            avg_lp_ratio = teacher_data.aggregate(avg_ratio=Avg('lp_ratio'))['avg_ratio'] or 0
+            teachers = SummaryStatsService.teacher_stats(teacher_data)
+            total_teachers = teachers['teachers']
+            total_schools = teachers['schools']
+            total_sectors = teachers['sectors']
+            avg_lp_ratio = teachers['avg_lp_ratio']
         return {
             'total_teachers': total_teachers,
             'total_schools': total_schools,
@@ -214,14 +207,19 @@ class DataService:
     
     @staticmethod
     def check_data_freshness():
-        """Check if data is fresh (updated within 2 hours)"""
+        """Check if data is fresh (updated or successfully synced within 2 hours)"""
         two_hours_ago = timezone.now() - timedelta(hours=2)
         
+        # Incremental syncs leave unchanged rows untouched, so a recent successful sync also counts
+        recent_syncs = set(DataSyncLog.objects.filter(
+            status='success', completed_at__gte=two_hours_ago
+        ).values_list('sync_type', flat=True).distinct())
+        
         # Check if we have any recent data
-        recent_teacher_data = TeacherData.objects.filter(updated_at__gte=two_hours_ago).exists()
-        recent_aggregated_data = AggregatedData.objects.filter(updated_at__gte=two_hours_ago).exists()
-        recent_school_data = SchoolData.objects.filter(updated_at__gte=two_hours_ago).exists()
-        recent_filter_options = FilterOptions.objects.filter(created_at__gte=two_hours_ago).exists()
+        recent_teacher_data = 'teacher_data' in recent_syncs or TeacherData.objects.filter(updated_at__gte=two_hours_ago).exists()
+        recent_aggregated_data = 'aggregated_data' in recent_syncs or AggregatedData.objects.filter(updated_at__gte=two_hours_ago).exists()
+        recent_school_data = 'school_data' in recent_syncs or SchoolData.objects.filter(updated_at__gte=two_hours_ago).exists()
+        recent_filter_options = 'filter_options' in recent_syncs or FilterOptions.objects.filter(created_at__gte=two_hours_ago).exists()
         
         return {
             'teacher_data_fresh': recent_teacher_data,
@@ -240,14 +238,22 @@ class DataService:
         
         return recent_syncs
     
+    @staticmethod
+    def get_latest_performance(queryset):
+        """Latest TeacherData row per user_id in ``queryset``, keyed by user_id (one query)"""
+        latest = queryset.annotate(
+            row_number=Window(RowNumber(), partition_by=[F('user_id')], order_by=[F('week_start').desc(), F('id').desc()])
+        ).filter(row_number=1).only('user_id', 'grade', 'subject', 'week_start', 'lp_ratio')
+        return {row.user_id: row for row in latest}
+    
     @staticmethod
     def get_school_teachers_data(school_name):
         """Get detailed teacher data for a specific school"""
         # Get teachers from UserSchoolProfile for the school
-        teachers_data = UserSchoolProfile.objects.filter(school=school_name)
+        teachers_data = UserSchoolProfile.objects.filter(school=school_name).only('user_id', 'teacher', 'sector', 'emis', 'school')
         
-        # Get teacher performance data from TeacherData
-        teacher_performance = TeacherData.objects.filter(school=school_name)
+        # Latest performance row of every teacher in the school, matched by user_id
+        latest_by_user = DataService.get_latest_performance(TeacherData.objects.filter(school=school_name))
         
         # Get school details from SchoolData
         school_details = SchoolData.objects.filter(school_name=school_name).first()
@@ -255,10 +261,7 @@ class DataService:
         # Combine data
         teachers_list = []
         for teacher in teachers_data:
-            # Get latest performance data for this teacher
-            latest_performance = teacher_performance.filter(
-                teacher=teacher.teacher
-            ).order_by('-week_start').first()
+            latest_performance = latest_by_user.get(teacher.user_id)
             
             teachers_list.append({
                 'user_id': teacher.user_id,
@@ -284,4 +287,1045 @@ class DataService:
                 'avg_lp_ratio': float(school_details.avg_lp_ratio) if school_details else 0
             },
             'teachers': teachers_list
-        } 
\ No newline at end of file
+        } 
+
+
+class AdminDashboardService:
+    """Admin dashboard statistics computed with grouped queries (a fixed number per request)"""
+
+    FILTER_DEFAULTS = {
+        'sector': '',
+        'school': '',
+        'grade': '',
+        'subject': '',
+        'date_from': '',
+        'date_to': '',
+        'sort_by': 'school',
+        'sort_order': 'asc',
+    }
+
+    @staticmethod
+    def normalize_filters(params):
+        """Filter/sort parameters with defaults applied and whitespace stripped"""
+        return {
+            key: (params.get(key) or default).strip()
+            for key, default in AdminDashboardService.FILTER_DEFAULTS.items()
+        }
+
+    @staticmethod
+    def get_dashboard(filters):
+        """Build the admin dashboard payload for normalized ``filters``"""
+        sector = filters['sector']
+        school = filters['school']
+        grade = filters['grade']
+        subject = filters['subject']
+        date_from = filters['date_from']
+        date_to = filters['date_to']
+        sort_by = filters['sort_by']
+        sort_order = filters['sort_order']
+
+        # Base querysets
+        teacher_data = TeacherData.objects.all()
+        school_data = SchoolData.objects.all()
+        conversations = Conversation.objects.all()
+        messages = Message.objects.all()
+        user_profiles = UserProfile.objects.all()
+        teacher_profiles = UserSchoolProfile.objects.all()
+
+        # Apply filters
+        if sector:
+            teacher_data = teacher_data.filter(sector__icontains=sector)
+            school_data = school_data.filter(sector__icontains=sector)
+            user_profiles = user_profiles.filter(sector__icontains=sector)
+            teacher_profiles = teacher_profiles.filter(sector__icontains=sector)
+        if school:
+            teacher_data = teacher_data.filter(school__icontains=school)
+            school_data = school_data.filter(school_name__icontains=school)
+            conversations = conversations.filter(school_name__icontains=school)
+            messages = messages.filter(school_name__icontains=school)
+            teacher_profiles = teacher_profiles.filter(school__icontains=school)
+        if grade:
+            teacher_data = teacher_data.filter(grade__icontains=grade)
+        if subject:
+            teacher_data = teacher_data.filter(subject__icontains=subject)
+        if date_from:
+            teacher_data = teacher_data.filter(week_start__gte=date_from)
+        if date_to:
+            teacher_data = teacher_data.filter(week_end__lte=date_to)
+
+        # Filter options in one query
+        filter_options = {'sectors': [], 'schools': [], 'grades': [], 'subjects': []}
+        for option_type, option_value in FilterOptions.objects.filter(
+            option_type__in=filter_options.keys()
+        ).values_list('option_type', 'option_value'):
+            filter_options[option_type].append(option_value)
+
+        # Overall statistics; role counts and teacher averages are single aggregates
+        role_counts = user_profiles.aggregate(
+            aeos=Count('id', filter=Q(role='AEO')),
+            principals=Count('id', filter=Q(role='Principal')),
+            fdes=Count('id', filter=Q(role='FDE')),
+        )
+        teacher_totals = teacher_data.aggregate(avg=Avg('lp_ratio'), sectors=Count('sector', distinct=True))
+        stats = {
+            'total_teachers': teacher_profiles.values('user_id').distinct().count(),
+            'total_schools': school_data.count(),
+            'total_conversations': conversations.count(),
+            'total_messages': messages.count(),
+            'total_users': User.objects.count(),
+            'total_aeos': role_counts['aeos'],
+            'total_principals': role_counts['principals'],
+            'total_fdes': role_counts['fdes'],
+            'avg_lp_ratio': teacher_totals['avg'] or 0,
+            'total_sectors': teacher_totals['sectors'],
+        }
+
+        # Sector-wise breakdown: teacher and school figures grouped by sector
+        school_counts = dict(
+            school_data.order_by().values('sector').annotate(count=Count('id')).values_list('sector', 'count')
+        )
+        sector_stats = [
+            {
+                'sector': row['sector'],
+                'teacher_count': row['teacher_count'],
+                'school_count': school_counts.get(row['sector'], 0),
+                'avg_lp_ratio': row['avg_lp_ratio'] or 0,
+            }
+            for row in teacher_data.order_by().values('sector').annotate(
+                teacher_count=Count('id'), avg_lp_ratio=Avg('lp_ratio')
+            ).order_by('sector')
+        ]
+
+        # School-wise breakdown, limited to 50 schools
+        school_order = {'sector': 'sector', 'lp_ratio': 'avg_lp_ratio'}.get(sort_by, 'school')
+        school_order = f'-{school_order}' if sort_order == 'desc' else school_order
+        school_stats = [
+            {
+                'school': row['school'],
+                'teacher_count': row['teacher_count'],
+                'avg_lp_ratio': row['avg_lp_ratio'] or 0,
+                'sector': row['sector'] or '',
+            }
+            for row in teacher_data.order_by().values('school').annotate(
+                teacher_count=Count('id'), avg_lp_ratio=Avg('lp_ratio'), sector=Min('sector')
+            ).order_by(school_order, 'school')[:50]
+        ]
+
+        # User activity for the first 50 users; message counts come from correlated subqueries
+        def message_count(field):
+            return Coalesce(Subquery(
+                messages.order_by().filter(**{field: OuterRef('pk')}).values(field)
+                .annotate(count=Count('id')).values('count')[:1],
+                output_field=IntegerField()
+            ), 0)
+
+        users = User.objects.select_related('userprofile').annotate(
+            sent_count=message_count('sender'),
+            received_count=message_count('receiver'),
+        ).order_by('id')[:50]
+        user_activity = []
+        for user in users:
+            profile = getattr(user, 'userprofile', None)
+            user_activity.append({
+                'username': user.username,
+                'role': profile.role if profile else 'Unknown',
+                'sector': profile.sector if profile else '',
+                'sent_messages': user.sent_count,
+                'received_messages': user.received_count,
+                'total_messages': user.sent_count + user.received_count,
+            })
+
+        # Recent activity
+        recent_messages = messages.select_related('sender', 'receiver').order_by('-timestamp')[:50]
+        recent_conversations = conversations.select_related('aeo', 'principal').order_by('-last_message_at')[:20]
+
+        return {
+            'stats': stats,
+            'filter_options': filter_options,
+            'sector_stats': sector_stats,
+            'school_stats': school_stats,
+            'user_activity': user_activity,
+            'recent_messages': [
+                {
+                    'id': msg.id,
+                    'sender': msg.sender.username,
+                    'receiver': msg.receiver.username,
+                    'school_name': msg.school_name,
+                    'message_text': msg.message_text[:100] + '...' if len(msg.message_text) > 100 else msg.message_text,
+                    'timestamp': msg.timestamp,
+                    'is_read': msg.is_read,
+                } for msg in recent_messages
+            ],
+            'recent_conversations': [
+                {
+                    'id': conv.id,
+                    'school_name': conv.school_name,
+                    'aeo': conv.aeo.username,
+                    'principal': conv.principal.username if conv.principal else None,
+                    'created_at': conv.created_at,
+                    'last_message_at': conv.last_message_at,
+                } for conv in recent_conversations
+            ],
+            'applied_filters': dict(filters),
+        }
+
+class AdminSnapshotService:
+    """Materialized admin dashboard payloads with stale-while-revalidate.
+
+    A payload is cached under its normalized filter set and the data version
+    it was built from, and also as the latest build for that filter set. When
+    the version moves on (a sync, an LP ratio recalculation or a messaging
+    write), the latest build is served immediately while one background
+    rebuild refreshes it, so admin requests only compute inline the very
+    first time a filter set is seen.
+    """
+    KEY_PREFIX = 'admin_snapshot'
+
+    @staticmethod
+    def filters_key(filters):
+        raw = json.dumps(filters, sort_keys=True, separators=(',', ':'))
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    @staticmethod
+    def messages_version():
+        return cache.get(f'{AdminSnapshotService.KEY_PREFIX}:messages', 0)
+
+    @staticmethod
+    def current_version():
+        """Synced data version plus the messaging generation"""
+        return f'{SnapshotService.get_version()}.{AdminSnapshotService.messages_version()}'
+
+    @staticmethod
+    def _keys(filters, version):
+        digest = AdminSnapshotService.filters_key(filters)
+        prefix = AdminSnapshotService.KEY_PREFIX
+        return f'{prefix}:{digest}:{version}', f'{prefix}:{digest}:latest'
+
+    @staticmethod
+    def build(filters=None, version=None):
+        """Compute the dashboard for ``filters`` and store it as fresh and latest"""
+        filters = filters or AdminDashboardService.normalize_filters({})
+        version = version or AdminSnapshotService.current_version()
+        entry = {
+            'payload': AdminDashboardService.get_dashboard(filters),
+            'version': version,
+            'built_at': timezone.now().isoformat(),
+        }
+        ttl = getattr(settings, 'ADMIN_SNAPSHOT_TTL', 86400)
+        fresh_key, latest_key = AdminSnapshotService._keys(filters, version)
+        cache.set_many({fresh_key: entry, latest_key: entry}, ttl)
+        return entry
+
+    @staticmethod
+    def refresh(filters=None):
+        """Rebuild in the background unless a rebuild for these filters is already running"""
+        filters = filters or AdminDashboardService.normalize_filters({})
+        lock_key = f'{AdminSnapshotService.KEY_PREFIX}:lock:{AdminSnapshotService.filters_key(filters)}'
+        if not cache.add(lock_key, True, getattr(settings, 'ADMIN_SNAPSHOT_LOCK_TIMEOUT', 120)):
+            return False
+
+        def rebuild():
+            try:
+                AdminSnapshotService.build(filters)
+            except Exception as e:
+                logger.error(f"Admin snapshot rebuild failed: {e}")
+            finally:
+                cache.delete(lock_key)
+
+        if getattr(settings, 'ADMIN_SNAPSHOT_ASYNC_REFRESH', True):
+            def run():
+                try:
+                    rebuild()
+                finally:
+                    connection.close()
+            threading.Thread(target=run, name='admin-snapshot-refresh', daemon=True).start()
+        else:
+            rebuild()
+        return True
+
+    @staticmethod
+    def get(filters):
+        """Return ``(entry, stale)`` for normalized ``filters``"""
+        version = AdminSnapshotService.current_version()
+        fresh_key, latest_key = AdminSnapshotService._keys(filters, version)
+        entries = cache.get_many([fresh_key, latest_key])
+        if fresh_key in entries:
+            return entries[fresh_key], False
+        if latest_key in entries:
+            AdminSnapshotService.refresh(filters)
+            return entries[latest_key], True
+        return AdminSnapshotService.build(filters, version), False
+
+    @staticmethod
+    def messages_changed():
+        """Move the messaging generation on and refresh the default snapshot"""
+        key = f'{AdminSnapshotService.KEY_PREFIX}:messages'
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted between add and incr
+            cache.set(key, 1, None)
+        AdminSnapshotService.refresh()
+
+
+class AdminDataService:
+    """Filtered, sorted row sets behind the admin detailed data tables.
+
+    Each data type lists its filterable and sortable fields and the columns
+    it returns (a field name, an ``(output name, related field)`` pair or an
+    ``(output name, expression)`` pair), so listing and paging work on
+    ``values()`` rows with a primary-key tiebreaker and never need model
+    instances.
+    """
+    DATA_TYPES = {
+        'teachers': {
+            'model': TeacherData,
+            'columns': None,  # every model field
+            'filters': {'sector': 'sector', 'school': 'school'},
+            'sort_fields': {'school': 'school', 'sector': 'sector', 'lp_ratio': 'lp_ratio', 'date': 'week_start'},
+        },
+        'schools': {
+            'model': SchoolData,
+            'columns': None,
+            'filters': {'sector': 'sector', 'school': 'school_name'},
+            'sort_fields': {'school': 'school_name', 'sector': 'sector', 'lp_ratio': 'avg_lp_ratio'},
+        },
+        'conversations': {
+            'model': Conversation,
+            'columns': ['id', 'school_name', ('aeo', 'aeo__username'), ('principal', 'principal__username'),
+                        'created_at', 'last_message_at'],
+            'filters': {'school': 'school_name'},
+            'sort_fields': {'school': 'school_name', 'date': 'created_at'},
+        },
+        'messages': {
+            'model': Message,
+            'columns': ['id', ('sender', 'sender__username'), ('receiver', 'receiver__username'), 'school_name',
+                        'message_text', 'timestamp', 'is_read'],
+            'filters': {'school': 'school_name'},
+            'sort_fields': {'school': 'school_name', 'date': 'timestamp'},
+        },
+        'users': {
+            'model': User,
+            'columns': ['id', 'username', 'email', ('role', Coalesce(F('userprofile__role'), Value('Unknown'))),
+                        ('sector', Coalesce(F('userprofile__sector'), Value(''))),
+                        ('school_name', Coalesce(F('userprofile__school_name'), Value(''))),
+                        'date_joined', 'last_login', 'is_active', 'is_staff', 'is_superuser'],
+            'filters': {'sector': 'userprofile__sector'},
+            'sort_fields': {'username': 'username', 'date_joined': 'date_joined'},
+        },
+    }
+
+    # contains scans every row; exact and prefix lookups can use the column indexes
+    MATCH_LOOKUPS = {'contains': 'icontains', 'exact': 'exact', 'prefix': 'startswith'}
+
+    @staticmethod
+    def sort_field(data_type, sort_by):
+        """Model field to order by; unknown sort keys fall back to the primary key"""
+        return AdminDataService.DATA_TYPES[data_type]['sort_fields'].get(sort_by, 'id')
+
+    @staticmethod
+    def get_queryset(data_type, filters, match='contains'):
+        """Filtered queryset of ``data_type``; raises KeyError for an unknown type"""
+        config = AdminDataService.DATA_TYPES[data_type]
+        lookup = AdminDataService.MATCH_LOOKUPS.get(match, 'icontains')
+        queryset = config['model'].objects.all()
+        for param, field in config['filters'].items():
+            if filters.get(param):
+                queryset = queryset.filter(**{f'{field}__{lookup}': filters[param]})
+        return queryset
+
+    @staticmethod
+    def get_rows(data_type, queryset):
+        """``values()`` of the data type's columns; pass the rows through ``rename`` for output"""
+        columns = AdminDataService.DATA_TYPES[data_type]['columns']
+        if columns is None:
+            return queryset.values()
+        lookups, expressions = [], {}
+        for column in columns:
+            if isinstance(column, str):
+                lookups.append(column)
+            elif isinstance(column[1], str):
+                lookups.append(column[1])  # related field, renamed afterwards
+            else:
+                expressions[column[0]] = column[1]
+        return queryset.values(*lookups, **expressions)
+
+    @staticmethod
+    def rename(data_type, rows):
+        """Rows keyed by output column names (e.g. ``sender`` for ``sender__username``)"""
+        columns = AdminDataService.DATA_TYPES[data_type]['columns'] or []
+        renames = {column[1]: column[0] for column in columns if not isinstance(column, str) and isinstance(column[1], str)}
+        if not renames:
+            return list(rows)
+        return [{renames.get(key, key): value for key, value in row.items()} for row in rows]
+
+    @staticmethod
+    def export_columns(data_type):
+        """``(name, lookup)`` pairs for streaming the data type's columns with values_list()"""
+        config = AdminDataService.DATA_TYPES[data_type]
+        if config['columns'] is None:
+            return [(field.attname, field.attname) for field in config['model']._meta.concrete_fields]
+        return [(column, column) if isinstance(column, str) else column for column in config['columns']]
+
+
+class InboxService:
+    """Builds a user's conversation inbox in a constant number of queries"""
+
+    @staticmethod
+    def get_inbox_queryset(user):
+        """Conversations for a user annotated with latest message and unread count"""
+        latest_message = Message.objects.filter(
+            conversation=OuterRef('pk')
+        ).order_by('-timestamp')
+
+        unread_messages = Message.objects.filter(
+            conversation=OuterRef('pk'),
+            receiver=user,
+            is_read=False
+        ).order_by().values('conversation').annotate(
+            count=Count('id')
+        ).values('count')
+
+        return Conversation.objects.filter(
+            Q(aeo=user) | Q(principal=user)
+        ).select_related(
+            'aeo__userprofile', 'principal__userprofile'
+        ).annotate(
+            latest_text=Subquery(latest_message.values('message_text')[:1]),
+            latest_timestamp=Subquery(latest_message.values('timestamp')[:1]),
+            latest_sender_id=Subquery(latest_message.values('sender_id')[:1]),
+            unread_count=Coalesce(Subquery(unread_messages, output_field=IntegerField()), Value(0)),
+        ).order_by('-last_message_at')
+
+    @staticmethod
+    def get_user_inbox(user):
+        """Get all conversations for a user with message previews, most recent first"""
+        inbox = []
+        for conversation in InboxService.get_inbox_queryset(user):
+            # Get the other user in the conversation
+            if conversation.aeo_id == user.id:
+                other_user = conversation.principal
+                other_user_role = 'Principal'
+            else:
+                other_user = conversation.aeo
+                other_user_role = 'AEO'
+
+            # Safely get userprofile data
+            other_user_profile = getattr(other_user, 'userprofile', None) if other_user else None
+
+            has_message = conversation.latest_timestamp is not None
+            inbox.append({
+                'conversation_id': conversation.id,
+                'school_name': conversation.school_name,
+                'other_user': {
+                    'id': other_user.id if other_user else None,
+                    'username': other_user.username if other_user else None,
+                    'role': other_user_role,
+                    'school_name': other_user_profile.school_name if other_user_profile else None,
+                    'emis': other_user_profile.emis if other_user_profile else None,
+                },
+                'latest_message': {
+                    'text': conversation.latest_text if has_message else '',
+                    'timestamp': conversation.latest_timestamp if has_message else conversation.created_at,
+                    'sender_id': conversation.latest_sender_id if has_message else None,
+                    'is_own': conversation.latest_sender_id == user.id if has_message else False,
+                },
+                'unread_count': conversation.unread_count,
+                'created_at': conversation.created_at,
+                'last_message_at': conversation.last_message_at,
+            })
+        return inbox
+
+
+class UnreadCounterService:
+    """Maintains denormalized per-user and per-conversation unread message counters"""
+
+    @staticmethod
+    def lock_user_counter(user_id):
+        """Lock the user's counter row, seeding it from the Message table the first time.
+
+        Call inside a transaction. Concurrent first writers serialise on the
+        row lock instead of racing to rebuild, so the seed runs once. Returns
+        (counter, seeded); a seeded counter already includes every committed
+        message.
+        """
+        counter, seeded = UserUnreadCounter.objects.select_for_update().get_or_create(user_id=user_id)
+        if seeded:
+            per_conversation = list(
+                Message.objects.filter(receiver_id=user_id, is_read=False)
+                .order_by().values('conversation_id').annotate(count=Count('id'))
+            )
+            ConversationUnreadCounter.objects.filter(user_id=user_id).delete()
+            ConversationUnreadCounter.objects.bulk_create([
+                ConversationUnreadCounter(conversation_id=row['conversation_id'], user_id=user_id, unread_count=row['count'])
+                for row in per_conversation
+            ])
+            counter.unread_count = sum(row['count'] for row in per_conversation)
+            UserUnreadCounter.objects.filter(pk=counter.pk).update(unread_count=counter.unread_count)
+        return counter, seeded
+
+    @staticmethod
+    def record_new_message(message):
+        """Increment the receiver's counters for a newly created message.
+
+        Call inside the same transaction that creates the message.
+        """
+        with transaction.atomic():
+            user_counter, seeded = UnreadCounterService.lock_user_counter(message.receiver_id)
+            if seeded:
+                # First counter for this user: the seed already counted this message
+                return
+
+            conversation_counter, _ = ConversationUnreadCounter.objects.get_or_create(
+                conversation_id=message.conversation_id,
+                user_id=message.receiver_id
+            )
+            UserUnreadCounter.objects.filter(pk=user_counter.pk).update(
+                unread_count=F('unread_count') + 1,
+                updated_at=timezone.now()
+            )
+            ConversationUnreadCounter.objects.filter(pk=conversation_counter.pk).update(
+                unread_count=F('unread_count') + 1,
+                updated_at=timezone.now()
+            )
+
+    @staticmethod
+    def mark_conversation_read(conversation_id, user):
+        """Mark a user's unread messages in a conversation as read and update counters.
+
+        Returns the number of messages marked as read.
+        """
+        with transaction.atomic():
+            marked = Message.objects.filter(
+                conversation_id=conversation_id,
+                receiver=user,
+                is_read=False
+            ).update(is_read=True)
+
+            if marked:
+                ConversationUnreadCounter.objects.filter(
+                    conversation_id=conversation_id,
+                    user=user
+                ).update(unread_count=0, updated_at=timezone.now())
+                UserUnreadCounter.objects.filter(user=user).update(
+                    unread_count=Greatest(F('unread_count') - marked, 0),
+                    updated_at=timezone.now()
+                )
+        return marked
+
+    @staticmethod
+    def get_user_unread_count(user):
+        """Single-row lookup of the user's unread count, initialising the counter if missing"""
+        unread_count = UserUnreadCounter.objects.filter(user=user).values_list('unread_count', flat=True).first()
+        if unread_count is None:
+            with transaction.atomic():
+                counter, _ = UnreadCounterService.lock_user_counter(user.id)
+                unread_count = counter.unread_count
+        return unread_count or 0
+
+    @staticmethod
+    def get_conversation_unread_count(conversation_id, user):
+        """Single-row lookup of the user's unread count in one conversation"""
+        counter = ConversationUnreadCounter.objects.filter(
+            conversation_id=conversation_id,
+            user=user
+        )
+        unread_count = counter.values_list('unread_count', flat=True).first()
+        if unread_count is None and not UserUnreadCounter.objects.filter(user=user).exists():
+            # Counters for this user were never initialised
+            with transaction.atomic():
+                UnreadCounterService.lock_user_counter(user.id)
+                unread_count = counter.values_list('unread_count', flat=True).first()
+        return unread_count or 0
+
+    @staticmethod
+    def rebuild(user_ids=None):
+        """Recompute counters from the Message table.
+
+        Rebuilds every user's counters, or only those of ``user_ids`` when given.
+        Returns the number of (user, conversation) counters written.
+        """
+        unread_messages = Message.objects.filter(is_read=False)
+        user_counters = UserUnreadCounter.objects.all()
+        conversation_counters = ConversationUnreadCounter.objects.all()
+        if user_ids is not None:
+            unread_messages = unread_messages.filter(receiver_id__in=user_ids)
+            user_counters = user_counters.filter(user_id__in=user_ids)
+            conversation_counters = conversation_counters.filter(user_id__in=user_ids)
+
+        per_conversation = list(
+            unread_messages.order_by().values('conversation_id', 'receiver_id').annotate(count=Count('id'))
+        )
+        per_user = {}
+        for row in per_conversation:
+            per_user[row['receiver_id']] = per_user.get(row['receiver_id'], 0) + row['count']
+        # Users without unread messages still get a zero row so lookups stay single-row
+        for user_id in (user_ids or []):
+            per_user.setdefault(user_id, 0)
+
+        with transaction.atomic():
+            user_counters.delete()
+            conversation_counters.delete()
+            UserUnreadCounter.objects.bulk_create([
+                UserUnreadCounter(user_id=user_id, unread_count=count)
+                for user_id, count in per_user.items()
+            ], batch_size=1000)
+            ConversationUnreadCounter.objects.bulk_create([
+                ConversationUnreadCounter(
+                    conversation_id=row['conversation_id'],
+                    user_id=row['receiver_id'],
+                    unread_count=row['count']
+                )
+                for row in per_conversation
+            ], batch_size=1000)
+        return len(per_conversation)
+
+
+class NotificationService:
+    """Publishes unread-count and inbox deltas to users' notification sockets.
+
+    Every event is stored in NotificationEvent before it is pushed, so a client
+    that reconnects can send its last seen sequence number and replay what it
+    missed instead of refetching everything.
+    """
+    REPLAY_LIMIT = 200
+    RETENTION = timedelta(hours=24)
+
+    @staticmethod
+    def publish(user, event_type, data):
+        """Store an event for a user and push it once the transaction commits"""
+        event = NotificationEvent.objects.create(user=user, event_type=event_type, payload=data)
+        transaction.on_commit(lambda: NotificationService.push(user.id, NotificationService.serialize_event(event)))
+        return event
+
+    @staticmethod
+    def push(user_id, event):
+        """Send a serialized event to the user's notification group"""
+        try:
+            from channels.layers import get_channel_layer
+            from asgiref.sync import async_to_sync
+
+            channel_layer = get_channel_layer()
+            async_to_sync(channel_layer.group_send)(
+                f"user_{user_id}",
+                {'type': 'notification_event', **event}
+            )
+        except Exception as e:
+            print(f"Error pushing notification event: {e}")
+            # Clients catch up through the resume protocol on reconnect
+
+    @staticmethod
+    def serialize_event(event):
+        return {
+            'seq': event.id,
+            'event_type': event.event_type,
+            'data': event.payload,
+        }
+
+    @staticmethod
+    def message_created(message):
+        """Publish inbox and unread deltas to both participants of a new message"""
+        timestamp = message.timestamp.isoformat()
+        participants = [message.receiver] if message.sender_id == message.receiver_id else [message.sender, message.receiver]
+        for user in participants:
+            NotificationService.publish(user, 'conversation_updated', {
+                'conversation_id': str(message.conversation_id),
+                'school_name': message.school_name,
+                'latest_message': {
+                    'text': message.message_text,
+                    'timestamp': timestamp,
+                    'sender_id': message.sender_id,
+                    'is_own': message.sender_id == user.id,
+                },
+                'unread_count': UnreadCounterService.get_conversation_unread_count(message.conversation_id, user),
+                'last_message_at': timestamp,
+            })
+        NotificationService.publish(message.receiver, 'unread_count_changed', {
+            'unread_count': UnreadCounterService.get_user_unread_count(message.receiver),
+        })
+
+    @staticmethod
+    def messages_read(conversation_id, user):
+        """Publish the reader's cleared conversation and new total unread count"""
+        NotificationService.publish(user, 'conversation_updated', {
+            'conversation_id': str(conversation_id),
+            'unread_count': 0,
+        })
+        NotificationService.publish(user, 'unread_count_changed', {
+            'unread_count': UnreadCounterService.get_user_unread_count(user),
+        })
+
+    @staticmethod
+    def get_events_since(user, last_seq):
+        """Events the user missed after ``last_seq``, coalesced to the latest state.
+
+        Returns ``(events, latest_seq)``; ``events`` is None when the gap cannot be
+        replayed (pruned or too long) and the client must refetch.
+        """
+        latest_seq = NotificationEvent.objects.filter(user=user).aggregate(seq=Max('id'))['seq'] or 0
+        # The watermark still covers the gap when pruning has emptied the table
+        pruned_through = NotificationPruneMark.objects.values_list('pruned_through', flat=True).first() or 0
+        oldest_retained = NotificationEvent.objects.aggregate(seq=Min('id'))['seq']
+        if last_seq < pruned_through or (oldest_retained is not None and last_seq + 1 < oldest_retained):
+            return None, latest_seq
+
+        missed = list(
+            NotificationEvent.objects.filter(user=user, id__gt=last_seq).order_by('id')[:NotificationService.REPLAY_LIMIT + 1]
+        )
+        if len(missed) > NotificationService.REPLAY_LIMIT:
+            return None, latest_seq
+
+        # Events carry state, not increments, so only the newest of each kind matters
+        coalesced = {}
+        for event in missed:
+            if event.event_type == 'conversation_updated':
+                key = (event.event_type, event.payload.get('conversation_id'))
+                payload = {**coalesced[key]['data'], **event.payload} if key in coalesced else event.payload
+            else:
+                key = (event.event_type, None)
+                payload = event.payload
+            coalesced[key] = {'seq': event.id, 'event_type': event.event_type, 'data': payload}
+        events = sorted(coalesced.values(), key=lambda event: event['seq'])
+        return events, latest_seq
+
+    @staticmethod
+    def prune(older_than=None):
+        """Delete events older than the retention window and advance the prune watermark; returns the number deleted"""
+        cutoff = timezone.now() - (older_than or NotificationService.RETENTION)
+        expired = NotificationEvent.objects.filter(created_at__lt=cutoff)
+        with transaction.atomic():
+            highest = expired.aggregate(seq=Max('id'))['seq']
+            deleted, _ = expired.delete()
+            if highest is not None:
+                mark, _ = NotificationPruneMark.objects.select_for_update().get_or_create(pk=1)
+                if highest > mark.pruned_through:
+                    mark.pruned_through = highest
+                    mark.save(update_fields=['pruned_through', 'updated_at'])
+        return deleted
+
+class SchoolProfileService:
+    """Copies infrastructure survey values from the profile registry into SchoolData"""
+
+    @staticmethod
+    def iter_with_profiles(schools, registry=None):
+        """Lazily set internet/ratio fields on SchoolData objects, yielding (school, changed)"""
+        profiles = (registry or school_profiles).profiles()
+        for school in schools:
+            profile = profiles.get(str(school.emis).strip())
+            changed = profile is not None and (
+                (school.internet_availability, school.student_teacher_ratio) != (profile.internet_availability, profile.student_teacher_ratio)
+            )
+            if changed:
+                school.internet_availability = profile.internet_availability
+                school.student_teacher_ratio = profile.student_teacher_ratio
+            yield school, changed
+
+    @staticmethod
+    def apply_profiles(schools, registry=None):
+        """Set internet/ratio fields on unsaved or loaded SchoolData objects; returns the changed ones"""
+        return [school for school, changed in SchoolProfileService.iter_with_profiles(schools, registry) if changed]
+
+    @staticmethod
+    def import_into_school_data(registry=None):
+        """Update stored SchoolData rows from the registry; returns the number of rows changed"""
+        schools = SchoolData.objects.only('id', 'emis', 'internet_availability', 'student_teacher_ratio')
+        changed = SchoolProfileService.apply_profiles(schools, registry)
+        SchoolData.objects.bulk_update(changed, ['internet_availability', 'student_teacher_ratio'], batch_size=500)
+        return len(changed)
+
+class ObservationService:
+    """Local store of TEACH tool observations and the per-school summaries derived from them"""
+
+    SCORE_FIELDS = [
+        'supp_learn_envi_score', 'pos_behav_expec_score', 'lesson_facilitation_score', 'cfu_score', 'feedback_score',
+        'ct_score', 'autonomy_score', 'perseverance_score', 'social_score',
+    ]
+
+    @staticmethod
+    def parse_score(value):
+        """Float score, or None for blank/invalid values"""
+        try:
+            return float(value) if value not in (None, '') else None
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def number_observations(observations):
+        """Lazily set ``sequence`` so repeated (user_id, emis, date) observations keep distinct keys"""
+        seen = {}
+        for observation in observations:
+            key = (observation.user_id, str(observation.emis), observation.date)
+            observation.sequence = seen.get(key, 0)
+            seen[key] = observation.sequence + 1
+            yield observation
+
+    @staticmethod
+    def iter_csv(path=None):
+        """TeacherObservation objects from the teach_tool_scores.csv export, skipping rows without a school"""
+        path = path or settings.TEACH_TOOL_SCORES_PATH
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                if not row.get('School') or not row.get('user_id'):
+                    continue
+                yield TeacherObservation(
+                    user_id=int(row['user_id']),
+                    emis=row.get('EMIS') or '',
+                    school=row['School'],
+                    sector=row.get('Sector') or '',
+                    overall_average_score=ObservationService.parse_score(row.get('overall_average_score')),
+                    **{field: ObservationService.parse_score(row.get(field)) for field in ObservationService.SCORE_FIELDS},
+                )
+
+    @staticmethod
+    def wifi_status(avg_infrastructure_score):
+        """WiFi status implied by a school's average supportive learning environment score"""
+        if avg_infrastructure_score is not None and avg_infrastructure_score >= 4.0:
+            return 'Available'
+        if avg_infrastructure_score is not None and avg_infrastructure_score >= 3.0:
+            return 'Limited'
+        return 'Not Available'
+
+    @staticmethod
+    def rebuild_school_summaries():
+        """Recompute SchoolObservationSummary from stored observations in one grouped query; returns sync counts"""
+        rows = TeacherObservation.objects.filter(supp_learn_envi_score__isnull=False).order_by().values(
+            'school', 'emis', 'sector'
+        ).annotate(
+            observation_count=Count('pk'),
+            teachers=Count('user_id', distinct=True),
+            good_infrastructure=Count('user_id', distinct=True, filter=Q(supp_learn_envi_score__gte=4.0)),
+            mobile_access=Count('user_id', distinct=True, filter=Q(supp_learn_envi_score__gte=3.5)),
+            avg_infrastructure=Avg('supp_learn_envi_score'),
+            avg_overall=Avg('overall_average_score'),
+        )
+        summaries = (
+            SchoolObservationSummary(
+                school=row['school'],
+                emis=row['emis'],
+                sector=row['sector'],
+                observations=row['observation_count'],
+                total_teachers=row['teachers'],
+                teachers_with_good_infrastructure=row['good_infrastructure'],
+                teachers_with_mobile_access=row['mobile_access'],
+                avg_infrastructure_score=row['avg_infrastructure'] or 0,
+                avg_overall_score=row['avg_overall'] or 0,
+                wifi_status=ObservationService.wifi_status(row['avg_infrastructure']),
+            )
+            for row in rows.iterator()
+        )
+        return upsert_rows(SchoolObservationSummary, summaries)
+
+    @staticmethod
+    def get_observations(school_name, limit=1000):
+        """Latest observations of a school with any supportive learning environment score"""
+        return TeacherObservation.objects.filter(
+            school=school_name, supp_learn_envi_score__isnull=False
+        ).order_by(F('date').desc(nulls_last=True), '-id').values(
+            'date', 'user_id', 'emis', 'school', 'sector', *ObservationService.SCORE_FIELDS, 'overall_average_score'
+        )[:limit]
+
+    @staticmethod
+    def get_school_summary(school_name):
+        """Precomputed infrastructure summary of a school, or None"""
+        return SchoolObservationSummary.objects.filter(school=school_name).first()
+
+class PrincipalDirectoryService:
+    """Resolves principal EMIS logins from the synced SchoolDirectory and provisions their accounts"""
+
+    DEFAULT_PASSWORD = 'pass123'
+    USERNAME_PREFIX = 'principal_'
+
+    @staticmethod
+    def resolve(emis):
+        """SchoolDirectory entry for an EMIS number (leading zeros ignored, as BigQuery compares it as an integer), or None"""
+        try:
+            return SchoolDirectory.objects.filter(emis=str(int(emis))).first()
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def get_or_create_principal(entry):
+        """User for a directory entry, created with its profile if provisioning hasn't covered it yet"""
+        user = User.objects.filter(username=entry.principal_username).first()
+        if user is None:
+            user = User.objects.create_user(
+                username=entry.principal_username,
+                password=PrincipalDirectoryService.DEFAULT_PASSWORD,
+                email=f"{entry.principal_username}@school.edu.pk"
+            )
+            UserProfile.objects.create(
+                user=user,
+                role='Principal',
+                school_name=entry.school_name,
+                sector=entry.sector,
+                emis=entry.emis
+            )
+        return user
+
+    @staticmethod
+    def provision_principals(batch_size=500):
+        """Create the missing principal users and profiles for every directory entry in bulk.
+
+        The default password is hashed once and shared by the new accounts
+        instead of running the password hasher per user; existing users and
+        profiles are left untouched. Returns the number of users and
+        profiles created.
+        """
+        entries = {}
+        for entry in SchoolDirectory.objects.order_by('emis').iterator(chunk_size=batch_size):
+            entries.setdefault(entry.principal_username, entry)  # first EMIS wins for a shared school name
+
+        principals = User.objects.filter(username__startswith=PrincipalDirectoryService.USERNAME_PREFIX)
+        with transaction.atomic():
+            existing = set(principals.values_list('username', flat=True))
+            password = make_password(PrincipalDirectoryService.DEFAULT_PASSWORD)
+            users = User.objects.bulk_create([
+                User(username=username, email=f"{username}@school.edu.pk", password=password)
+                for username in entries if username not in existing
+            ], batch_size=batch_size)
+
+            profiles = UserProfile.objects.bulk_create([
+                UserProfile(user_id=user_id, role='Principal', school_name=entries[username].school_name,
+                            sector=entries[username].sector, emis=entries[username].emis)
+                for user_id, username in principals.filter(userprofile__isnull=True).values_list('id', 'username')
+                if username in entries
+            ], batch_size=batch_size)
+
+        return {'users': len(users), 'profiles': len(profiles)}
+
+class SummaryStatsService:
+    """Summary statistics computed with one conditional-aggregation query per source table.
+
+    Counts, distinct counts, averages and LP performance bands for a
+    queryset come back from a single ``aggregate()`` call instead of one
+    query each.
+    """
+
+    @staticmethod
+    def get_bands(bands=None):
+        """``(name, lower bound)`` pairs from best to worst; the last band takes every lower value"""
+        return bands or getattr(settings, 'LP_PERFORMANCE_BANDS', [
+            ('excellent', 80), ('good', 60), ('needs_improvement', None),
+        ])
+
+    @staticmethod
+    def band_aggregates(field, bands=None):
+        """Conditional counts for each band of ``field``"""
+        aggregates = {}
+        upper = None
+        bands = SummaryStatsService.get_bands(bands)
+        for index, (name, lower) in enumerate(bands):
+            condition = Q()
+            if lower is not None and index < len(bands) - 1:
+                condition &= Q(**{f'{field}__gte': lower})
+            if upper is not None:
+                condition &= Q(**{f'{field}__lt': upper})
+            aggregates[f'band_{name}'] = Count('pk', filter=condition)
+            upper = lower
+        return aggregates
+
+    @staticmethod
+    def _split_bands(row, bands=None):
+        return {name: row.pop(f'band_{name}') for name, _ in SummaryStatsService.get_bands(bands)}
+
+    @staticmethod
+    def teacher_stats(queryset, bands=None, distinct=True):
+        """Row count, average LP ratio and bands of TeacherData rows
+
+        With ``distinct`` the distinct teacher/school/sector counts are
+        included too; they cost a sort each, so skip them when unused.
+        """
+        aggregates = {'rows': Count('pk'), 'avg_lp_ratio': Avg('lp_ratio')}
+        if distinct:
+            aggregates.update(
+                teachers=Count('user_id', distinct=True),
+                schools=Count('school', distinct=True),
+                sectors=Count('sector', distinct=True),
+            )
+        row = queryset.order_by().aggregate(**aggregates, **SummaryStatsService.band_aggregates('lp_ratio', bands))
+        row['avg_lp_ratio'] = row['avg_lp_ratio'] or 0
+        row['bands'] = SummaryStatsService._split_bands(row, bands)
+        return row
+
+    @staticmethod
+    def school_stats(queryset):
+        """School count, distinct sectors and average LP ratio of SchoolData rows"""
+        row = queryset.order_by().aggregate(
+            schools=Count('pk'),
+            sectors=Count('sector', distinct=True),
+            avg_lp_ratio=Avg('avg_lp_ratio'),
+        )
+        row['avg_lp_ratio'] = row['avg_lp_ratio'] or 0
+        return row
+
+    @staticmethod
+    def profile_stats(queryset):
+        """Distinct teachers and schools of UserSchoolProfile rows"""
+        return queryset.order_by().aggregate(
+            teachers=Count('user_id', distinct=True),
+            schools=Count('school', distinct=True),
+        )
+
+    # group_by -> (model, grouping field)
+    USAGE_GROUPS = {
+        'sector': (SchoolData, 'sector'),
+        'school': (SchoolData, 'school_name'),
+        'period': (AggregatedData, 'period'),
+    }
+
+    @staticmethod
+    def usage_distribution(group_by='sector', period_type='weekly'):
+        """Share of lesson plan usage (avg LP ratio x teacher count) per sector, school or period
+
+        One grouped query; ``period_type`` selects the AggregatedData rows
+        when grouping by period. Raises ValueError for an unknown grouping.
+        """
+        if group_by not in SummaryStatsService.USAGE_GROUPS:
+            raise ValueError(f"Unsupported grouping: {group_by}")
+        model, field = SummaryStatsService.USAGE_GROUPS[group_by]
+        queryset = model.objects.all()
+        if model is AggregatedData:
+            queryset = queryset.filter(period_type=period_type)
+
+        rows = list(queryset.order_by().values(field).annotate(
+            usage=Sum(Coalesce('avg_lp_ratio', 0.0) * Coalesce('teacher_count', 0))
+        ).values_list(field, 'usage'))
+        total_usage = sum(usage or 0 for _, usage in rows)
+
+        distribution = [
+            {
+                group_by: str(key) if group_by == 'period' else key,
+                'percentage': round((usage or 0) / total_usage * 100, 1) if total_usage > 0 else 0,
+                'usage': (usage or 0) / total_usage * 100 if total_usage > 0 else usage or 0,
+            }
+            for key, usage in rows
+        ]
+        if group_by == 'period':
+            distribution.sort(key=lambda x: x['period'])
+        else:
+            distribution.sort(key=lambda x: x['percentage'], reverse=True)
+        return {'distribution': distribution, 'total_usage': total_usage}
+
+
+class SnapshotService:
+    """Monotonic version numbers for synced data, for use in cache keys"""
+
+    @staticmethod
+    def get_version(dataset=None):
+        """Version of one dataset, or the global version (highest of all datasets)"""
+        if dataset is not None:
+            return SyncSnapshot.objects.filter(dataset=dataset).values_list('version', flat=True).first() or 0
+        return SyncSnapshot.objects.aggregate(version=Max('version'))['version'] or 0
+
+    @staticmethod
+    def bump(dataset, row_count=None):
+        """Give ``dataset`` a new version above every existing one; returns it"""
+        with transaction.atomic():
+            # Lock the rows so concurrent bumps can't hand out the same version
+            current = max(SyncSnapshot.objects.select_for_update().values_list('version', flat=True), default=0)
+            defaults = {'version': current + 1}
+            if row_count is not None:
+                defaults['row_count'] = row_count
+            SyncSnapshot.objects.update_or_create(dataset=dataset, defaults=defaults)
+        return current + 1
@@ -0,0 +1,352 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.apps.registry import Apps
+from django.db import connection, models, transaction
+from django.utils import timezone
+from typing import NamedTuple, Optional
+from .models import TeacherData, AggregatedData, SchoolData, SchoolActivity, SchoolDirectory, TeacherObservation, SchoolObservationSummary, FilterOptions, UserSchoolProfile
+import hashlib
+import json
+import time
+
+# Sync name, natural key and content fields for each synced dataset. The
+# content hash covers only the fields BigQuery actually provides, so
+# bookkeeping values (e.g. TeacherData.week_start, which is stamped with the
+# sync date) don't make every row look changed on every run.
+SYNC_DATASETS = {
+    UserSchoolProfile: {
+        'name': 'userschoolprofile',
+        'key_fields': ['user_id', 'emis'],
+        'hash_fields': ['teacher', 'sector', 'school'],
+    },
+    TeacherData: {
+        'name': 'teacher_data',
+        'key_fields': ['user_id', 'emis'],
+        'hash_fields': ['teacher', 'grade', 'subject', 'sector', 'school', 'week_number', 'lp_ratio'],
+    },
+    AggregatedData: {
+        'name': 'aggregated_data',
+        'key_fields': ['period_type', 'period', 'school', 'sector'],
+        'hash_fields': ['teacher_count', 'avg_lp_ratio'],
+    },
+    SchoolData: {
+        'name': 'school_data',
+        'key_fields': ['emis'],
+        'hash_fields': ['school_name', 'sector', 'teacher_count', 'avg_lp_ratio', 'internet_availability', 'student_teacher_ratio'],
+    },
+    SchoolActivity: {
+        'name': 'school_activity',
+        'key_fields': ['emis'],
+        'hash_fields': [
+            'school_name', 'sector', 'teacher_count', 'avg_lp_ratio', 'active_teachers', 'inactive_teachers',
+            'teachers_with_observations', 'avg_infrastructure_score', 'wifi_status', 'teachers_with_mobile_access',
+        ],
+    },
+    SchoolDirectory: {
+        'name': 'school_directory',
+        'key_fields': ['emis'],
+        'hash_fields': ['school_name', 'sector', 'principal_username'],
+    },
+    TeacherObservation: {
+        'name': 'teacher_observations',
+        'key_fields': ['user_id', 'emis', 'date', 'sequence'],
+        'hash_fields': [
+            'school', 'sector', 'supp_learn_envi_score', 'pos_behav_expec_score', 'lesson_facilitation_score',
+            'cfu_score', 'feedback_score', 'ct_score', 'autonomy_score', 'perseverance_score', 'social_score',
+            'overall_average_score',
+        ],
+    },
+    SchoolObservationSummary: {
+        'name': 'school_observation_summary',
+        'key_fields': ['school', 'emis'],
+        'hash_fields': [
+            'sector', 'observations', 'total_teachers', 'teachers_with_good_infrastructure', 'teachers_with_mobile_access',
+            'avg_infrastructure_score', 'avg_overall_score', 'wifi_status',
+        ],
+    },
+    FilterOptions: {
+        'name': 'filter_options',
+        'key_fields': ['option_type', 'option_value'],
+        'hash_fields': [],
+    },
+}
+
+
+def _values(model, obj, fields):
+    # to_python normalises BigQuery types (e.g. INTEGER EMIS) to what the column stores
+    return tuple(model._meta.get_field(f).to_python(getattr(obj, f)) for f in fields)
+
+
+def row_hash(model, obj, fields=None):
+    """Content hash of the synced fields of a model instance"""
+    fields = SYNC_DATASETS[model]['hash_fields'] if fields is None else fields
+    raw = json.dumps([str(v) for v in _values(model, obj, fields)])
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def chunked(iterable, size):
+    """Yield lists of up to ``size`` items without materialising the iterable"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class LoadProgress:
+    """Rows written so far by a loader, and the resulting throughput"""
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.rows = 0
+        self.started = time.perf_counter()
+
+    def advance(self, count):
+        self.rows += count
+        if self.callback:
+            self.callback(self)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        elapsed = self.elapsed
+        return round(self.rows / elapsed, 1) if elapsed > 0 else 0.0
+
+
+def replace_rows(model, objs, batch_size=1000, progress=None):
+    """Delete every row and insert ``objs`` chunk by chunk in one transaction; returns sync counts"""
+    progress = progress or LoadProgress()
+    inserted = 0
+    with transaction.atomic():
+        deleted, _ = model.objects.all().delete()
+        for chunk in chunked(objs, batch_size):
+            for obj in chunk:
+                obj.row_hash = row_hash(model, obj)
+            model.objects.bulk_create(chunk)
+            inserted += len(chunk)
+            progress.advance(len(chunk))
+    return {'inserted': inserted, 'updated': 0, 'deleted': deleted, 'unchanged': 0, 'duplicates': 0}
+
+
+def upsert_rows(model, objs, batch_size=1000, progress=None):
+    """Apply ``objs`` as the new contents of ``model``, writing only changed rows.
+
+    Rows are matched on the dataset's natural key; a row is updated when its
+    content hash differs, inserted when its key is new, and stored rows whose
+    key is absent from ``objs`` are deleted. ``objs`` is consumed chunk by
+    chunk, so only the key -> (pk, hash) index is held for the whole run; if
+    a natural key repeats, its first row wins and the later rows are counted
+    under ``duplicates`` (replace and swap modes store them). Returns sync
+    counts.
+    """
+    progress = progress or LoadProgress()
+    config = SYNC_DATASETS[model]
+    key_fields = config['key_fields']
+    update_fields = config['hash_fields'] + ['row_hash']
+    if any(f.name == 'updated_at' for f in model._meta.concrete_fields):
+        update_fields.append('updated_at')
+    # Remaining columns are refreshed together with changed rows
+    update_fields += [
+        f.name for f in model._meta.concrete_fields
+        if not f.primary_key and f.name not in update_fields + key_fields + ['created_at']
+    ]
+
+    existing = {}
+    for row in model.objects.values_list('pk', 'row_hash', *key_fields).iterator():
+        existing[tuple(row[2:])] = (row[0], row[1])
+
+    now = timezone.now()
+    seen = set()
+    counts = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0, 'duplicates': 0}
+    with transaction.atomic():
+        for chunk in chunked(objs, batch_size):
+            to_insert, to_update = [], []
+            for obj in chunk:
+                key = _values(model, obj, key_fields)
+                if key in seen:
+                    counts['duplicates'] += 1
+                    continue
+                seen.add(key)
+                obj.row_hash = row_hash(model, obj)
+                current = existing.pop(key, None)
+                if current is None:
+                    to_insert.append(obj)
+                elif current[1] != obj.row_hash:
+                    obj.pk = current[0]
+                    obj.updated_at = now
+                    to_update.append(obj)
+                else:
+                    counts['unchanged'] += 1
+            model.objects.bulk_update(to_update, update_fields)
+            model.objects.bulk_create(to_insert)
+            counts['inserted'] += len(to_insert)
+            counts['updated'] += len(to_update)
+            progress.advance(len(chunk))
+
+        stale_ids = [pk for pk, _ in existing.values()]
+        for i in range(0, len(stale_ids), batch_size):
+            model.objects.filter(pk__in=stale_ids[i:i + batch_size]).delete()
+        counts['deleted'] = len(stale_ids)
+
+    return counts
+
+
+def _shadow_index(index):
+    return models.Index(fields=index.fields, name=f'{index.name}_sw')
+
+
+def shadow_model(model):
+    """Unregistered copy of ``model`` bound to ``<table>_shadow``"""
+    meta = type('Meta', (), {
+        'app_label': model._meta.app_label,
+        'db_table': f'{model._meta.db_table}_shadow',
+        'apps': Apps(),
+        'indexes': [_shadow_index(index) for index in model._meta.indexes],
+        'unique_together': model._meta.unique_together,
+    })
+    attrs = {'__module__': model.__module__, 'Meta': meta}
+    for field in model._meta.local_concrete_fields:
+        attrs[field.name] = field.clone()
+    return type(f'{model.__name__}Shadow', (models.Model,), attrs)
+
+
+def _restore_constraint_names(editor, model, shadow_table, live_table):
+    """Rename constraints, indexes and sequences created under the shadow table's name after the swap.
+
+    Otherwise the next run's ``<table>_shadow`` would collide with them
+    (e.g. ``<table>_shadow_pkey`` on PostgreSQL, unique_together indexes on
+    SQLite). Meta.indexes are renamed separately.
+    """
+    connection = editor.connection
+    quote = editor.quote_name
+    postgres = connection.vendor == 'postgresql'
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, live_table)
+        sequences = connection.introspection.get_sequences(cursor, live_table) if postgres else []
+
+    shadow_indexes = {_shadow_index(index).name for index in model._meta.indexes}
+    for name, constraint in constraints.items():
+        if shadow_table not in name or name in shadow_indexes:
+            continue
+        if constraint['unique'] and not constraint['primary_key'] and name.endswith('_uniq'):
+            # The name Django generates for unique_together on the live table
+            new_name = editor._create_index_name(live_table, constraint['columns'], suffix='_uniq')
+        else:
+            new_name = name.replace(shadow_table, live_table, 1)
+        if postgres:
+            if constraint['index'] and not (constraint['primary_key'] or constraint['unique']):
+                editor.execute(f'ALTER INDEX {quote(name)} RENAME TO {quote(new_name)}')
+            else:
+                editor.execute(f'ALTER TABLE {quote(live_table)} RENAME CONSTRAINT {quote(name)} TO {quote(new_name)}')
+        elif constraint['index']:
+            # SQLite and MySQL can't rename every index in place; recreate it under the live name
+            columns = ', '.join(quote(column) for column in constraint['columns'])
+            unique = 'UNIQUE ' if constraint['unique'] else ''
+            editor.execute(f'DROP INDEX {quote(name)}' + ('' if connection.vendor == 'sqlite' else f' ON {quote(live_table)}'))
+            editor.execute(f'CREATE {unique}INDEX {quote(new_name)} ON {quote(live_table)} ({columns})')
+
+    for sequence in sequences:
+        if shadow_table in sequence['name']:
+            new_name = sequence['name'].replace(shadow_table, live_table, 1)
+            editor.execute(f"ALTER SEQUENCE {quote(sequence['name'])} RENAME TO {quote(new_name)}")
+
+
+def swap_rows(model, objs, batch_size=1000, progress=None):
+    """Load ``objs`` into a shadow table, then swap it in for the live table.
+
+    Readers keep querying the previous table, with its indexes, until the
+    swap. The swap drops the live table, renames the shadow into its place
+    and renames the shadow indexes, constraints and sequences back to the
+    names migrations know, all in one schema transaction. ``objs`` is written chunk by chunk. Returns sync
+    counts.
+    """
+    shadow = shadow_model(model)
+    shadow_table = shadow._meta.db_table
+    live_table = model._meta.db_table
+    fields = [f.attname for f in model._meta.local_concrete_fields if not f.primary_key]
+
+    with connection.schema_editor() as editor:
+        if shadow_table in connection.introspection.table_names():
+            editor.delete_model(shadow)  # left over from an interrupted run
+        editor.create_model(shadow)
+
+    progress = progress or LoadProgress()
+    inserted = 0
+    try:
+        for chunk in chunked(objs, batch_size):
+            rows = []
+            for obj in chunk:
+                obj.row_hash = row_hash(model, obj)
+                rows.append(shadow(**{f: getattr(obj, f) for f in fields}))
+            shadow.objects.bulk_create(rows)
+            inserted += len(rows)
+            progress.advance(len(rows))
+        previous = model.objects.count()
+
+        with connection.schema_editor() as editor:
+            editor.delete_model(model)
+            editor.alter_db_table(shadow, shadow_table, live_table)
+            shadow._meta.db_table = live_table
+            for index in model._meta.indexes:
+                editor.rename_index(model, _shadow_index(index), index)
+            _restore_constraint_names(editor, model, shadow_table, live_table)
+    except Exception:
+        with connection.schema_editor() as editor:
+            if shadow_table in connection.introspection.table_names():
+                shadow._meta.db_table = shadow_table
+                editor.delete_model(shadow)
+        raise
+
+    return {'inserted': inserted, 'updated': 0, 'deleted': previous, 'unchanged': 0, 'duplicates': 0}
+
+
+class QueryResult(NamedTuple):
+    """A finished BigQuery job: its row iterator, timing stats and any error"""
+    name: str
+    rows: object
+    stats: dict
+    error: Optional[Exception] = None
+
+
+def _run_query(client, name, sql, page_size=None):
+    started = time.perf_counter()
+    job = None
+    try:
+        job = client.query(sql)
+        # The RowIterator fetches further pages lazily while it is consumed
+        rows = job.result(page_size=page_size)
+        error = None
+    except Exception as e:
+        rows, error = None, e
+    stats = {
+        'job': name,
+        'job_id': getattr(job, 'job_id', None),
+        'wall_time_s': round(time.perf_counter() - started, 3),
+        'bytes_processed': getattr(job, 'total_bytes_processed', None) or 0,
+    }
+    return QueryResult(name, rows, stats, error)
+
+
+def run_queries(client, queries, max_concurrency=1, page_size=None):
+    """Run named queries, yielding a QueryResult for each as it finishes.
+
+    With ``max_concurrency`` above 1 up to that many jobs are in flight at
+    once and results arrive in completion order; otherwise the queries run
+    one by one in the given order. Failures are returned on the result
+    rather than raised, so the caller can attribute them to its dataset.
+    Rows are paged from BigQuery ``page_size`` at a time as they are read.
+    """
+    if max_concurrency <= 1 or len(queries) <= 1:
+        for name, sql in queries.items():
+            yield _run_query(client, name, sql, page_size)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='bigquery-sync') as executor:
+        futures = [executor.submit(_run_query, client, name, sql, page_size) for name, sql in queries.items()]
+        for future in as_completed(futures):
+            yield future.result()
@@ -1,10 +1,32 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
-from .models import UserProfile, Conversation, Message
+from .models import UserProfile, UserLoginTimestamp, AggregatedData, SchoolActivity, TeacherObservation, SchoolObservationSummary, SchoolDirectory, Conversation, Message, SchoolData, TeacherData, FilterOptions, DataSyncLog, UserSchoolProfile, UserUnreadCounter, ConversationUnreadCounter, NotificationEvent, NotificationPruneMark
 from .serializers import UserSerializer, ConversationSerializer, MessageSerializer
+from .services import DataService, InboxService, UnreadCounterService, NotificationService, SchoolProfileService, SnapshotService, AdminDashboardService, AdminSnapshotService, SummaryStatsService, ObservationService, PrincipalDirectoryService
+from .school_profiles import SchoolProfileRegistry
+from .scoping import get_scope
+from .cache import cache_result, get_cache_stats, get_or_compute, invalidate_namespace, make_key
+from .health import MetricsSampler, metrics_sampler
+from .bigquery_gateway import BigQueryGateway, FakeBigQueryClient as GatewayFakeClient, bigquery_gateway
+from .sync import LoadProgress, replace_rows, upsert_rows, swap_rows
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+import threading
+import time
+import json
+import os
+import tempfile
 import uuid
 
 class UserProfileModelTest(TestCase):
@@ -242,3 +264,1540 @@ class HealthCheckAPITest(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['status'], 'healthy')
+
+    def test_health_check_serves_last_sample(self):
+        metrics_sampler.sample_once()
+        response = self.client.get(reverse('health-check'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('cpu_percent', response.data['system'])
+        self.assertIn('latency_ms', response.data['database'])
+        self.assertIn('sampled_at', response.data)
+
+    def test_first_cpu_reading_is_not_reported_as_zero(self):
+        sampler = MetricsSampler(interval=0.05)
+
+        self.assertIsNone(sampler.sample_once()['system']['cpu_percent'])
+        # Still inside the first interval after priming
+        self.assertIsNone(sampler.sample_once()['system']['cpu_percent'])
+        time.sleep(0.06)
+        self.assertIsInstance(sampler.sample_once()['system']['cpu_percent'], float)
+
+    def test_sampler_thread_waits_an_interval_before_reading_cpu(self):
+        sampler = MetricsSampler(interval=0.05)
+        try:
+            placeholder = sampler.latest()
+            self.assertIsNone(placeholder['system']['cpu_percent'])
+            self.assertEqual(placeholder['database']['status'], 'ok')
+            self.assertIsNone(sampler._sample)
+
+            deadline = time.monotonic() + 5
+            while sampler._sample is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            sampler.stop()
+
+        self.assertIsInstance(sampler._sample['system']['cpu_percent'], float)
+
+    def test_liveness(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('health-live'))
+        self.assertEqual(response.data, {'status': 'ok'})
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_readiness_reports_checks(self):
+        response = self.client.get(reverse('health-ready'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['checks']['database']['status'], 'ok')
+        self.assertEqual(response.data['checks']['channel_layer']['status'], 'ok')
+        # No synced data in the test database
+        self.assertEqual(response.data['checks']['data_freshness']['status'], 'stale')
+        self.assertEqual(response.data['status'], 'degraded')
+
+    @override_settings(CHANNEL_LAYERS={'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {'hosts': [('127.0.0.1', 1)]},
+    }})
+    def test_readiness_fails_without_channel_layer(self):
+        response = self.client.get(reverse('health-ready'))
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.data['checks']['channel_layer']['status'], 'error')
+
+class InboxServiceTest(TestCase):
+    def setUp(self):
+        self.aeo = User.objects.create_user(username='aeo', password='testpass123')
+        self.principal = User.objects.create_user(username='principal', password='testpass123')
+        UserProfile.objects.create(user=self.aeo, role='AEO', sector='Nilore')
+        UserProfile.objects.create(user=self.principal, role='Principal', school_name='Test School', emis='123')
+        self.conversation = Conversation.objects.create(
+            id=str(uuid.uuid4()),
+            school_name='Test School',
+            aeo=self.aeo,
+            principal=self.principal
+        )
+
+    def test_inbox_latest_message_and_unread_count(self):
+        for text in ['first', 'second']:
+            Message.objects.create(
+                id=str(uuid.uuid4()),
+                conversation=self.conversation,
+                sender=self.principal,
+                receiver=self.aeo,
+                school_name='Test School',
+                message_text=text
+            )
+
+        inbox = InboxService.get_user_inbox(self.aeo)
+
+        self.assertEqual(len(inbox), 1)
+        self.assertEqual(inbox[0]['latest_message']['text'], 'second')
+        self.assertFalse(inbox[0]['latest_message']['is_own'])
+        self.assertEqual(inbox[0]['unread_count'], 2)
+        self.assertEqual(inbox[0]['other_user']['username'], 'principal')
+        self.assertEqual(inbox[0]['other_user']['emis'], '123')
+        self.assertEqual(InboxService.get_user_inbox(self.principal)[0]['unread_count'], 0)
+
+    def test_inbox_without_messages(self):
+        inbox = InboxService.get_user_inbox(self.principal)
+
+        self.assertEqual(inbox[0]['latest_message']['text'], '')
+        self.assertEqual(inbox[0]['latest_message']['timestamp'], self.conversation.created_at)
+        self.assertEqual(inbox[0]['unread_count'], 0)
+        self.assertEqual(inbox[0]['other_user']['role'], 'AEO')
+
+class InboxBenchmarkTest(APITestCase):
+    """Seeds 500 conversations x 50 messages and checks the inbox query count stays fixed"""
+    CONVERSATIONS = 500
+    MESSAGES_PER_CONVERSATION = 50
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.aeo = User.objects.create_user(username='bench_aeo', password='testpass123')
+        UserProfile.objects.create(user=cls.aeo, role='AEO', sector='Nilore')
+        principals = User.objects.bulk_create([
+            User(username=f'bench_principal_{i}') for i in range(cls.CONVERSATIONS)
+        ])
+        UserProfile.objects.bulk_create([
+            UserProfile(user=principal, role='Principal', school_name=f'School {i}')
+            for i, principal in enumerate(principals)
+        ])
+        conversations = Conversation.objects.bulk_create([
+            Conversation(id=str(uuid.uuid4()), school_name=f'School {i}', aeo=cls.aeo, principal=principal)
+            for i, principal in enumerate(principals)
+        ])
+        messages = []
+        for conversation, principal in zip(conversations, principals):
+            for j in range(cls.MESSAGES_PER_CONVERSATION):
+                messages.append(Message(
+                    id=str(uuid.uuid4()),
+                    conversation=conversation,
+                    sender=principal,
+                    receiver=cls.aeo,
+                    school_name=conversation.school_name,
+                    message_text=f'Message {j}',
+                    is_read=j % 2 == 0
+                ))
+        Message.objects.bulk_create(messages, batch_size=5000)
+
+    def test_inbox_query_count_is_constant(self):
+        self.client.force_authenticate(user=self.aeo)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('user-conversations'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), self.CONVERSATIONS)
+        self.assertEqual(response.data[0]['unread_count'], self.MESSAGES_PER_CONVERSATION // 2)
+        self.assertEqual(len(queries), 1)
+
+    def test_inbox_service_single_query(self):
+        with self.assertNumQueries(1):
+            inbox = InboxService.get_user_inbox(self.aeo)
+        self.assertEqual(len(inbox), self.CONVERSATIONS)
+
+class UnreadCounterTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.aeo = User.objects.create_user(username='aeo', password='testpass123')
+        self.principal = User.objects.create_user(username='principal', password='testpass123')
+        UserProfile.objects.create(user=self.aeo, role='AEO')
+        UserProfile.objects.create(user=self.principal, role='Principal', school_name='Test School')
+        self.conversation = Conversation.objects.create(
+            id=str(uuid.uuid4()),
+            school_name='Test School',
+            aeo=self.aeo,
+            principal=self.principal
+        )
+
+    def send(self, text):
+        self.client.force_authenticate(user=self.aeo)
+        return self.client.post(reverse('send-message'), {
+            'receiverId': self.principal.id,
+            'school_name': 'Test School',
+            'message_text': text,
+            'conversation_id': self.conversation.id,
+        }, format='json')
+
+    def test_counters_follow_send_and_mark_read(self):
+        self.send('one')
+        self.send('two')
+
+        self.assertEqual(UserUnreadCounter.objects.get(user=self.principal).unread_count, 2)
+        self.assertEqual(UnreadCounterService.get_conversation_unread_count(self.conversation.id, self.principal), 2)
+
+        self.client.force_authenticate(user=self.principal)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('unread-message-count'))
+        self.assertEqual(response.data['unread_count'], 2)
+
+        self.client.post(reverse('mark-messages-read', kwargs={'conversation_id': self.conversation.id}))
+        self.assertEqual(UserUnreadCounter.objects.get(user=self.principal).unread_count, 0)
+        self.assertEqual(UnreadCounterService.get_conversation_unread_count(self.conversation.id, self.principal), 0)
+
+    def test_missing_counter_is_initialised_from_messages(self):
+        Message.objects.create(
+            id=str(uuid.uuid4()),
+            conversation=self.conversation,
+            sender=self.aeo,
+            receiver=self.principal,
+            school_name='Test School',
+            message_text='Created without counters'
+        )
+
+        self.assertEqual(UnreadCounterService.get_user_unread_count(self.principal), 1)
+        self.assertEqual(UnreadCounterService.get_user_unread_count(self.aeo), 0)
+
+    def test_first_write_seeds_counter_from_existing_messages(self):
+        Message.objects.create(
+            id=str(uuid.uuid4()),
+            conversation=self.conversation,
+            sender=self.aeo,
+            receiver=self.principal,
+            school_name='Test School',
+            message_text='Created without counters'
+        )
+        self.send('tracked')
+
+        self.assertEqual(UserUnreadCounter.objects.get(user=self.principal).unread_count, 2)
+        self.assertEqual(UnreadCounterService.get_conversation_unread_count(self.conversation.id, self.principal), 2)
+
+    def test_counter_is_seeded_once_and_locked_afterwards(self):
+        Message.objects.create(
+            id=str(uuid.uuid4()),
+            conversation=self.conversation,
+            sender=self.aeo,
+            receiver=self.principal,
+            school_name='Test School',
+            message_text='Created without counters'
+        )
+
+        counter, seeded = UnreadCounterService.lock_user_counter(self.principal.id)
+        self.assertEqual((counter.unread_count, seeded), (1, True))
+        # A concurrent first writer finds the row instead of rebuilding it
+        counter, seeded = UnreadCounterService.lock_user_counter(self.principal.id)
+        self.assertEqual((counter.unread_count, seeded), (1, False))
+        self.assertEqual(ConversationUnreadCounter.objects.filter(user=self.principal).count(), 1)
+
+        self.send('tracked')
+        self.assertEqual(UnreadCounterService.get_user_unread_count(self.principal), 2)
+
+    def test_rebuild_command_reconciles_counters(self):
+        self.send('one')
+        UserUnreadCounter.objects.filter(user=self.principal).update(unread_count=42)
+        ConversationUnreadCounter.objects.all().delete()
+
+        call_command('rebuild_unread_counters', stdout=open(os.devnull, 'w'))
+
+        self.assertEqual(UserUnreadCounter.objects.get(user=self.principal).unread_count, 1)
+        self.assertEqual(UnreadCounterService.get_conversation_unread_count(self.conversation.id, self.principal), 1)
+
+class NotificationEventTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.aeo = User.objects.create_user(username='aeo', password='testpass123')
+        self.principal = User.objects.create_user(username='principal', password='testpass123')
+        UserProfile.objects.create(user=self.aeo, role='AEO')
+        UserProfile.objects.create(user=self.principal, role='Principal', school_name='Test School')
+        self.conversation = Conversation.objects.create(
+            id=str(uuid.uuid4()),
+            school_name='Test School',
+            aeo=self.aeo,
+            principal=self.principal
+        )
+
+    def send(self, text):
+        self.client.force_authenticate(user=self.aeo)
+        return self.client.post(reverse('send-message'), {
+            'receiverId': self.principal.id,
+            'school_name': 'Test School',
+            'message_text': text,
+            'conversation_id': self.conversation.id,
+        }, format='json')
+
+    def test_message_publishes_inbox_and_unread_events(self):
+        self.send('hello')
+
+        receiver_events = list(NotificationEvent.objects.filter(user=self.principal).order_by('id'))
+        self.assertEqual([e.event_type for e in receiver_events], ['conversation_updated', 'unread_count_changed'])
+        self.assertEqual(receiver_events[0].payload['unread_count'], 1)
+        self.assertEqual(receiver_events[0].payload['latest_message']['text'], 'hello')
+        self.assertEqual(receiver_events[1].payload['unread_count'], 1)
+        sender_event = NotificationEvent.objects.get(user=self.aeo)
+        self.assertTrue(sender_event.payload['latest_message']['is_own'])
+
+    def test_mark_read_publishes_cleared_counts(self):
+        self.send('hello')
+        self.client.force_authenticate(user=self.principal)
+        self.client.post(reverse('mark-messages-read', kwargs={'conversation_id': self.conversation.id}))
+
+        events, _ = NotificationService.get_events_since(self.principal, 0)
+        by_type = {event['event_type']: event['data'] for event in events}
+        self.assertEqual(by_type['unread_count_changed']['unread_count'], 0)
+        self.assertEqual(by_type['conversation_updated']['unread_count'], 0)
+        # Coalesced conversation state keeps the latest message from the earlier event
+        self.assertEqual(by_type['conversation_updated']['latest_message']['text'], 'hello')
+
+    def test_resume_replays_only_missed_events(self):
+        self.send('one')
+        _, last_seq = NotificationService.get_events_since(self.principal, 0)
+        self.send('two')
+        self.send('three')
+
+        events, latest_seq = NotificationService.get_events_since(self.principal, last_seq)
+
+        self.assertEqual(len(events), 2)
+        self.assertTrue(all(event['seq'] > last_seq for event in events))
+        self.assertEqual(events[-1]['seq'], latest_seq)
+        unread = [e for e in events if e['event_type'] == 'unread_count_changed'][0]
+        self.assertEqual(unread['data']['unread_count'], 3)
+
+    def test_resume_after_pruned_gap_requires_resync(self):
+        self.send('one')
+        self.send('two')
+        NotificationEvent.objects.filter(id=NotificationEvent.objects.order_by('id').first().id).delete()
+
+        events, latest_seq = NotificationService.get_events_since(self.principal, 0)
+
+        self.assertIsNone(events)
+        self.assertEqual(latest_seq, NotificationEvent.objects.filter(user=self.principal).order_by('-id').first().id)
+
+    def test_resume_after_table_pruned_empty_requires_resync(self):
+        self.send('one')
+        _, last_seq = NotificationService.get_events_since(self.principal, 0)
+        NotificationEvent.objects.update(created_at=timezone.now() - timedelta(days=2))
+
+        self.assertGreater(NotificationService.prune(), 0)
+        self.assertFalse(NotificationEvent.objects.exists())
+        self.assertEqual(NotificationPruneMark.objects.get().pruned_through, last_seq)
+
+        events, _ = NotificationService.get_events_since(self.principal, last_seq - 1)
+        self.assertIsNone(events)
+        events, _ = NotificationService.get_events_since(self.principal, last_seq)
+        self.assertEqual(events, [])
+
+class MessageHistoryPaginationTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.aeo = User.objects.create_user(username='aeo', password='testpass123')
+        self.principal = User.objects.create_user(username='principal', password='testpass123')
+        UserProfile.objects.create(user=self.aeo, role='AEO')
+        UserProfile.objects.create(user=self.principal, role='Principal', school_name='Test School')
+        self.conversation = Conversation.objects.create(
+            id=str(uuid.uuid4()),
+            school_name='Test School',
+            aeo=self.aeo,
+            principal=self.principal
+        )
+        self.base = base = timezone.now()
+        for i in range(7):
+            message = Message.objects.create(
+                id=f'msg-{i}',
+                conversation=self.conversation,
+                sender=self.aeo,
+                receiver=self.principal,
+                school_name='Test School',
+                message_text=f'message {i}'
+            )
+            # Two messages share a timestamp so the id tie-breaker is exercised
+            Message.objects.filter(id=message.id).update(timestamp=base + timedelta(minutes=min(i, 5)))
+        self.client.force_authenticate(user=self.principal)
+        self.url = reverse('conversation-messages', kwargs={'pk': self.conversation.id})
+
+    def texts(self, response):
+        return [m['message_text'] for m in response.data['results']]
+
+    def test_unpaginated_request_returns_full_history(self):
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 7)
+
+    def test_pages_walk_backwards_and_forwards(self):
+        latest = self.client.get(self.url, {'page_size': 3})
+        self.assertEqual(self.texts(latest), ['message 4', 'message 5', 'message 6'])
+        self.assertTrue(latest.data['has_more'])
+
+        older = self.client.get(self.url, {'page_size': 3, 'before': latest.data['before_cursor']})
+        self.assertEqual(self.texts(older), ['message 1', 'message 2', 'message 3'])
+
+        oldest = self.client.get(self.url, {'page_size': 3, 'before': older.data['before_cursor']})
+        self.assertEqual(self.texts(oldest), ['message 0'])
+        self.assertFalse(oldest.data['has_more'])
+
+        newer = self.client.get(self.url, {'page_size': 3, 'after': older.data['after_cursor']})
+        self.assertEqual(self.texts(newer), ['message 4', 'message 5', 'message 6'])
+
+    def test_after_cursor_returns_only_new_messages(self):
+        latest = self.client.get(self.url, {'page_size': 3})
+        empty = self.client.get(self.url, {'after': latest.data['after_cursor']})
+        self.assertEqual(empty.data['results'], [])
+        self.assertEqual(empty.data['after_cursor'], latest.data['after_cursor'])
+
+        Message.objects.create(
+            id='msg-new',
+            conversation=self.conversation,
+            sender=self.aeo,
+            receiver=self.principal,
+            school_name='Test School',
+            message_text='new message'
+        )
+        Message.objects.filter(id='msg-new').update(timestamp=self.base + timedelta(minutes=10))
+        fresh = self.client.get(self.url, {'after': latest.data['after_cursor']})
+        self.assertEqual(self.texts(fresh), ['new message'])
+
+    def test_user_messages_view_paginates(self):
+        response = self.client.get(reverse('user-messages', kwargs={'user_id': self.aeo.id}), {'page_size': 2})
+        self.assertEqual(self.texts(response), ['message 5', 'message 6'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(self.url, {'before': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class SchoolProfileRegistryTest(TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        self.write([{"School's EMIS": '203', 'Student Teacher Ratio': '1:31', 'Internet': 'Yes'}])
+        self.registry = SchoolProfileRegistry(self.path)
+
+    def write(self, rows, mtime=None):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'Main Sheet': rows}, f)
+        if mtime is not None:
+            os.utime(self.path, (mtime, mtime))
+
+    def test_typed_lookup(self):
+        profile = self.registry.get('203')
+        self.assertTrue(profile.has_internet)
+        self.assertEqual(profile.students_per_teacher, 31)
+        self.assertIsNone(self.registry.get('999'))
+
+    def test_reloads_only_when_file_changes(self):
+        first = self.registry.profiles()
+        self.assertIs(self.registry.profiles(), first)
+
+        self.write([{"School's EMIS": '203', 'Student Teacher Ratio': '1:40', 'Internet': 'No'}], mtime=1)
+        profile = self.registry.get('203')
+        self.assertFalse(profile.has_internet)
+        self.assertEqual(profile.student_teacher_ratio, '1:40')
+
+    def test_import_into_school_data(self):
+        SchoolData.objects.create(school_name='School 203', sector='B-K', emis='203', teacher_count=5, avg_lp_ratio=20)
+        SchoolData.objects.create(school_name='School 204', sector='B-K', emis='204', teacher_count=5, avg_lp_ratio=20)
+
+        self.assertEqual(SchoolProfileService.import_into_school_data(self.registry), 1)
+        school = SchoolData.objects.get(emis='203')
+        self.assertEqual((school.internet_availability, school.student_teacher_ratio), ('Yes', '1:31'))
+        self.assertEqual(SchoolData.objects.get(emis='204').student_teacher_ratio, '1:0')
+        self.assertEqual(SchoolProfileService.import_into_school_data(self.registry), 0)
+
+class FakeQueryJob:
+    def __init__(self, client, rows, error=None):
+        self.client = client
+        self.rows = rows
+        self.error = error
+        self.job_id = f'fake-{len(client.queries)}'
+        self.total_bytes_processed = 100 * len(rows)
+
+    def result(self, page_size=None):
+        with self.client.lock:
+            self.client.active += 1
+            self.client.peak_concurrency = max(self.client.peak_concurrency, self.client.active)
+        try:
+            time.sleep(self.client.delay)
+            if self.error:
+                raise self.error
+            return iter(self.rows)
+        finally:
+            with self.client.lock:
+                self.client.active -= 1
+
+
+class FakeBigQueryClient:
+    """Stand-in for bigquery.Client: returns canned rows for the first marker found in the SQL"""
+
+    def __init__(self, responses=None, delay=0, errors=None):
+        self.responses = responses or {}
+        self.errors = errors or {}
+        self.delay = delay
+        self.queries = []
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak_concurrency = 0
+
+    def query(self, sql, job_config=None):
+        self.queries.append(sql)
+        error = next((e for marker, e in self.errors.items() if marker in sql), None)
+        rows = next((r for marker, r in self.responses.items() if marker in sql), [])
+        return FakeQueryJob(self, rows, error)
+
+
+class IncrementalSyncTest(TestCase):
+    def school(self, emis, teacher_count, avg_lp_ratio=50.0):
+        return SchoolData(school_name=f'School {emis}', sector='B-K', emis=emis, teacher_count=teacher_count, avg_lp_ratio=avg_lp_ratio)
+
+    def test_upsert_writes_only_changed_rows(self):
+        counts = upsert_rows(SchoolData, [self.school('1', 5), self.school('2', 6), self.school('3', 7)])
+        self.assertEqual(counts, {'inserted': 3, 'updated': 0, 'deleted': 0, 'unchanged': 0, 'duplicates': 0})
+        first_ids = dict(SchoolData.objects.values_list('emis', 'id'))
+
+        # EMIS arrives as an integer from BigQuery; it must still match the stored key
+        counts = upsert_rows(SchoolData, [self.school(1, 5), self.school('2', 9), self.school('4', 1)])
+        self.assertEqual(counts, {'inserted': 1, 'updated': 1, 'deleted': 1, 'unchanged': 1, 'duplicates': 0})
+
+        self.assertEqual(SchoolData.objects.get(emis='2').teacher_count, 9)
+        self.assertEqual(SchoolData.objects.get(emis='2').id, first_ids['2'])
+        self.assertEqual(SchoolData.objects.get(emis='1').id, first_ids['1'])
+        self.assertFalse(SchoolData.objects.filter(emis='3').exists())
+
+    def test_repeated_keys_are_counted_as_duplicates(self):
+        counts = upsert_rows(SchoolData, [self.school('1', 5), self.school(1, 9), self.school('2', 6)])
+
+        self.assertEqual(counts['inserted'], 2)
+        self.assertEqual(counts['duplicates'], 1)
+        self.assertEqual(SchoolData.objects.get(emis='1').teacher_count, 5)
+
+        stdout = StringIO()
+        rows = [SimpleNamespace(school_name='School 1', sector='B-K', emis=emis, teacher_count=5, avg_lp_ratio=50.0) for emis in ('1', '1')]
+        with patch('api.management.commands.sync_bigquery_data.bigquery.Client', return_value=FakeBigQueryClient({'e.EMIS as emis': rows})):
+            call_command('sync_bigquery_data', data_type='school_data', mode='incremental', force=True, stdout=stdout)
+        self.assertIn('1 duplicate keys skipped', stdout.getvalue())
+
+    def test_sync_command_records_counts(self):
+        rows = [SimpleNamespace(school_name='School 1', sector='B-K', emis='1', teacher_count=5, avg_lp_ratio=50.0)]
+        client = FakeBigQueryClient({'e.EMIS as emis': rows})
+
+        with patch('api.management.commands.sync_bigquery_data.bigquery.Client', return_value=client):
+            call_command('sync_bigquery_data', data_type='school_data', mode='incremental', force=True, stdout=open(os.devnull, 'w'))
+            call_command('sync_bigquery_data', data_type='school_data', mode='incremental', force=True, stdout=open(os.devnull, 'w'))
+
+        log = DataSyncLog.objects.filter(sync_type='school_data').latest('id')
+        self.assertEqual(log.status, 'success')
+        self.assertEqual((log.records_inserted, log.records_updated, log.records_deleted, log.records_unchanged), (0, 0, 0, 1))
+        self.assertEqual(SchoolData.objects.count(), 1)
+
+class ShadowSwapSyncTest(TransactionTestCase):
+    def test_swap_replaces_table_and_keeps_indexes(self):
+        TeacherData.objects.create(
+            user_id=1, teacher='Old', grade='N/A', subject='N/A', sector='B-K', emis='1', school='School 1',
+            week_start=timezone.now().date(), week_end=timezone.now().date(), week_number=1, lp_ratio=10
+        )
+        objs = [
+            TeacherData(user_id=i, teacher=f'Teacher {i}', grade='N/A', subject='N/A', sector='B-K', emis='2',
+                        school='School 2', week_start=timezone.now().date(), week_end=timezone.now().date(),
+                        week_number=1, lp_ratio=50)
+            for i in range(3)
+        ]
+
+        counts = swap_rows(TeacherData, objs)
+
+        self.assertEqual(counts, {'inserted': 3, 'updated': 0, 'deleted': 1, 'unchanged': 0, 'duplicates': 0})
+        self.assertEqual(sorted(TeacherData.objects.values_list('teacher', flat=True)), ['Teacher 0', 'Teacher 1', 'Teacher 2'])
+        self.assertTrue(all(TeacherData.objects.values_list('row_hash', flat=True)))
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, TeacherData._meta.db_table)
+            tables = connection.introspection.table_names(cursor)
+        for index in TeacherData._meta.indexes:
+            self.assertIn(index.name, constraints)
+        self.assertNotIn(f'{TeacherData._meta.db_table}_shadow', tables)
+
+    def test_swap_runs_twice_in_a_row(self):
+        for run in range(2):
+            counts = swap_rows(FilterOptions, [FilterOptions(option_type='sectors', option_value=f'Sector {run}')])
+            self.assertEqual(counts['inserted'], 1)
+
+        self.assertEqual(list(FilterOptions.objects.values_list('option_value', flat=True)), ['Sector 1'])
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, FilterOptions._meta.db_table)
+        self.assertFalse([name for name in constraints if '_shadow' in name])
+        self.assertTrue(any(c['unique'] and c['columns'] == ['option_type', 'option_value'] for c in constraints.values()))
+
+    def test_snapshot_version_bumps_on_changes_only(self):
+        rows = [SimpleNamespace(school_name='School 1', sector='B-K', emis='1', teacher_count=5, avg_lp_ratio=50.0)]
+        client = FakeBigQueryClient({'e.EMIS as emis': rows})
+
+        with patch('api.management.commands.sync_bigquery_data.bigquery.Client', return_value=client):
+            call_command('sync_bigquery_data', data_type='school_data', mode='swap', force=True, stdout=open(os.devnull, 'w'))
+            self.assertEqual(SnapshotService.get_version(), 1)
+            call_command('sync_bigquery_data', data_type='school_data', mode='incremental', force=True, stdout=open(os.devnull, 'w'))
+            self.assertEqual(SnapshotService.get_version(), 1)
+            rows[0].teacher_count = 6
+            call_command('sync_bigquery_data', data_type='school_data', mode='incremental', force=True, stdout=open(os.devnull, 'w'))
+
+        self.assertEqual(SnapshotService.get_version('school_data'), 2)
+        self.assertEqual(SchoolData.objects.get().teacher_count, 6)
+
+class ConcurrentSyncTest(TestCase):
+    def sync(self, client, **options):
+        with patch('api.management.commands.sync_bigquery_data.bigquery.Client', return_value=client):
+            call_command('sync_bigquery_data', force=True, stdout=open(os.devnull, 'w'), **options)
+
+    def test_jobs_run_concurrently_and_record_stats(self):
+        client = FakeBigQueryClient({
+            'e.EMIS as emis': [SimpleNamespace(school_name='School 1', sector='B-K', emis='1', teacher_count=5, avg_lp_ratio=50.0)],
+            'DISTINCT e.Sector as sector': [SimpleNamespace(sector='B-K'), SimpleNamespace(sector='Nilore')],
+        }, delay=0.05)
+
+        self.sync(client, max_concurrency=3)
+
+        self.assertEqual(len(client.queries), 12)
+        self.assertGreater(client.peak_concurrency, 1)
+        self.assertLessEqual(client.peak_concurrency, 3)
+        logs = {log.sync_type: log for log in DataSyncLog.objects.all()}
+        self.assertEqual({log.status for log in logs.values()}, {'success'})
+        self.assertEqual(len(logs['filter_options'].job_stats), 4)
+        self.assertEqual(logs['filter_options'].bytes_processed, 200)
+        self.assertEqual(logs['school_data'].job_stats[0]['job'], 'school_data')
+        self.assertGreaterEqual(logs['school_data'].job_stats[0]['wall_time_s'], 0.05)
+        self.assertEqual(FilterOptions.objects.filter(option_type='sectors').count(), 2)
+
+    def test_failed_job_marks_its_dataset_failed(self):
+        client = FakeBigQueryClient(errors={'AS lp_ratio': RuntimeError('quota exceeded')})
+
+        with self.assertRaisesMessage(CommandError, 'teacher_data'):
+            self.sync(client, data_type='teacher_data', max_concurrency=4)
+
+        log = DataSyncLog.objects.get(sync_type='teacher_data')
+        self.assertEqual(log.status, 'failed')
+        self.assertEqual(log.error_message, 'quota exceeded')
+
+    def test_failure_does_not_abandon_other_datasets(self):
+        client = FakeBigQueryClient({
+            'e.EMIS as emis': [SimpleNamespace(school_name='School 1', sector='B-K', emis='1', teacher_count=5, avg_lp_ratio=50.0)],
+        }, errors={'AS lp_ratio': RuntimeError('quota exceeded')})
+
+        for max_concurrency in (1, 4):
+            with patch('api.management.commands.sync_bigquery_data.BigQueryCache.invalidate_all') as invalidate_all:
+                with self.assertRaises(CommandError):
+                    self.sync(client, max_concurrency=max_concurrency)
+            invalidate_all.assert_called_once()
+
+        self.assertEqual(set(DataSyncLog.objects.filter(status='failed').values_list('sync_type', flat=True)), {'teacher_data'})
+        self.assertEqual(DataSyncLog.objects.filter(status='success').count(), 14)
+        self.assertEqual(SchoolData.objects.count(), 1)
+        self.assertGreater(SnapshotService.get_version('school_data'), 0)
+
+    def test_sequential_mode_runs_one_job_at_a_time(self):
+        client = FakeBigQueryClient(delay=0.01)
+
+        self.sync(client, max_concurrency=1)
+
+        self.assertEqual(client.peak_concurrency, 1)
+        self.assertEqual(DataSyncLog.objects.filter(status='success').count(), 8)
+
+class StreamingSyncTest(TestCase):
+    def test_rows_are_written_chunk_by_chunk(self):
+        produced = []
+        written = []
+
+        def schools():
+            for i in range(5):
+                produced.append(i)
+                yield SchoolData(school_name=f'School {i}', sector='B-K', emis=str(i), teacher_count=1, avg_lp_ratio=10)
+
+        def record(progress):
+            written.append((progress.rows, len(produced), SchoolData.objects.count()))
+
+        counts = replace_rows(SchoolData, schools(), batch_size=2, progress=LoadProgress(record))
+
+        self.assertEqual(counts['inserted'], 5)
+        # Each chunk is written before the next one is converted
+        self.assertEqual(written, [(2, 2, 2), (4, 4, 4), (5, 5, 5)])
+
+    def test_sync_reports_throughput(self):
+        rows = [
+            SimpleNamespace(user_id=i, Teacher=f'Teacher {i}', Sector='B-K', EMIS='1', School='School 1', lp_ratio=20.0)
+            for i in range(7)
+        ]
+        client = FakeBigQueryClient({'AS lp_ratio': rows})
+        out = StringIO()
+
+        with patch('api.management.commands.sync_bigquery_data.bigquery.Client', return_value=client):
+            call_command('sync_bigquery_data', data_type='teacher_data', force=True, chunk_size=3, verbosity=2, stdout=out)
+
+        log = DataSyncLog.objects.get(sync_type='teacher_data')
+        self.assertEqual(log.records_processed, 7)
+        self.assertGreater(log.rows_per_second, 0)
+        self.assertEqual(TeacherData.objects.count(), 7)
+        self.assertIn('rows/sec', out.getvalue())
+        self.assertIn('6 rows written', out.getvalue())
+
+class AdminDashboardQueryTest(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.force_authenticate(user=self.admin)
+
+    def seed(self, sectors, schools_per_sector, teachers_per_school, first_sector=0):
+        for s in range(first_sector, first_sector + sectors):
+            sector = f'Sector {s}'
+            aeo = User.objects.create_user(username=f'aeo{s}', password='testpass123')
+            UserProfile.objects.create(user=aeo, role='AEO', sector=sector)
+            for k in range(schools_per_sector):
+                school = f'School {s}-{k}'
+                SchoolData.objects.create(school_name=school, sector=sector, emis=f'{s}{k}', teacher_count=teachers_per_school, avg_lp_ratio=10)
+                principal = User.objects.create_user(username=f'principal{s}-{k}', password='testpass123')
+                UserProfile.objects.create(user=principal, role='Principal', sector=sector, school_name=school)
+                conversation = Conversation.objects.create(id=str(uuid.uuid4()), school_name=school, aeo=aeo, principal=principal)
+                Message.objects.create(id=str(uuid.uuid4()), conversation=conversation, sender=aeo, receiver=principal, school_name=school, message_text='Hello')
+                for t in range(teachers_per_school):
+                    TeacherData.objects.create(
+                        teacher=f'Teacher {s}-{k}-{t}', user_id=f'{s}{k}{t}', grade='5', subject='Math',
+                        sector=sector, emis=f'{s}{k}', school=school, week_start='2025-01-06', week_end='2025-01-12',
+                        week_number=2, lp_ratio=10 * (t + 1),
+                    )
+
+    def dashboard(self, **params):
+        cache.clear()  # measure a full build, not a snapshot hit
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin-dashboard'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response, len(queries)
+
+    def test_query_count_is_bounded(self):
+        self.seed(sectors=1, schools_per_sector=1, teachers_per_school=1)
+        _, small = self.dashboard()
+        self.seed(sectors=4, schools_per_sector=3, teachers_per_school=3, first_sector=1)
+        response, large = self.dashboard()
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 15)
+        self.assertEqual(len(response.data['sector_stats']), 5)
+
+    def test_breakdowns(self):
+        self.seed(sectors=2, schools_per_sector=2, teachers_per_school=2)
+        response, _ = self.dashboard()
+
+        self.assertEqual(response.data['sector_stats'][0], {
+            'sector': 'Sector 0', 'teacher_count': 4, 'school_count': 2, 'avg_lp_ratio': 15.0,
+        })
+        self.assertEqual(response.data['school_stats'][0], {
+            'school': 'School 0-0', 'teacher_count': 2, 'avg_lp_ratio': 15.0, 'sector': 'Sector 0',
+        })
+        self.assertEqual(response.data['stats']['total_aeos'], 2)
+        self.assertEqual(response.data['stats']['total_principals'], 4)
+        activity = {row['username']: row for row in response.data['user_activity']}
+        self.assertEqual(activity['aeo0']['sent_messages'], 2)
+        self.assertEqual(activity['principal0-1']['received_messages'], 1)
+        self.assertEqual(activity['admin']['role'], 'Unknown')
+
+    def test_filters_and_sorting(self):
+        self.seed(sectors=2, schools_per_sector=2, teachers_per_school=1)
+        response, _ = self.dashboard(sector='Sector 1', sort_order='desc')
+
+        self.assertEqual([row['sector'] for row in response.data['sector_stats']], ['Sector 1'])
+        self.assertEqual([row['school'] for row in response.data['school_stats']], ['School 1-1', 'School 1-0'])
+        self.assertEqual(response.data['applied_filters']['sort_by'], 'school')
+
+    def test_requires_admin(self):
+        user = User.objects.create_user(username='fde', password='testpass123')
+        self.client.force_authenticate(user=user)
+        response = self.client.get(reverse('admin-dashboard'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+@override_settings(ADMIN_SNAPSHOT_ASYNC_REFRESH=False)
+class AdminSnapshotTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.force_authenticate(user=self.admin)
+        TeacherData.objects.create(
+            teacher='Teacher 1', user_id=1, grade='5', subject='Math', sector='B-K', emis='1', school='School 1',
+            week_start='2025-01-06', week_end='2025-01-12', week_number=2, lp_ratio=20,
+        )
+
+    def get_dashboard(self, **params):
+        response = self.client.get(reverse('admin-dashboard'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data
+
+    def test_repeated_loads_are_served_from_snapshot(self):
+        first = self.get_dashboard()
+        with CaptureQueriesContext(connection) as queries:
+            second = self.get_dashboard()
+
+        # Only the version lookup runs
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(second['stats'], first['stats'])
+        self.assertFalse(second['snapshot']['stale'])
+
+    def test_filter_sets_are_cached_separately(self):
+        self.get_dashboard()
+        filtered = self.get_dashboard(sector='Other')
+
+        self.assertEqual(filtered['stats']['avg_lp_ratio'], 0)
+        self.assertEqual(filtered['applied_filters']['sector'], 'Other')
+        # Parameter defaults normalize to the same snapshot
+        self.assertEqual(
+            AdminSnapshotService.filters_key(AdminDashboardService.normalize_filters({'sort_by': 'school'})),
+            AdminSnapshotService.filters_key(AdminDashboardService.normalize_filters({})),
+        )
+
+    def test_stale_snapshot_is_served_while_rebuilding(self):
+        self.get_dashboard()
+        TeacherData.objects.update(lp_ratio=40)
+        SnapshotService.bump('teacher_data')
+
+        stale = self.get_dashboard()
+        self.assertTrue(stale['snapshot']['stale'])
+        self.assertEqual(stale['stats']['avg_lp_ratio'], 20)
+
+        fresh = self.get_dashboard()
+        self.assertFalse(fresh['snapshot']['stale'])
+        self.assertEqual(fresh['stats']['avg_lp_ratio'], 40)
+
+    def test_messaging_writes_move_the_version(self):
+        version = AdminSnapshotService.current_version()
+        AdminSnapshotService.messages_changed()
+
+        self.assertNotEqual(AdminSnapshotService.current_version(), version)
+        entry, stale = AdminSnapshotService.get(AdminDashboardService.normalize_filters({}))
+        self.assertFalse(stale)
+
+    def test_calculate_lp_ratios_rebuilds_snapshot(self):
+        self.get_dashboard()
+        call_command('calculate_lp_ratios', stdout=StringIO())
+
+        entry, stale = AdminSnapshotService.get(AdminDashboardService.normalize_filters({}))
+        self.assertFalse(stale)
+        self.assertEqual(entry['payload']['stats']['total_schools'], 1)
+
+@override_settings(ADMIN_DATA_MAX_PAGE_SIZE=5)
+class AdminDetailedDataTest(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.force_authenticate(user=self.admin)
+        for i in range(12):
+            SchoolData.objects.create(
+                school_name=f'School {i:02d}', sector='B-K' if i % 2 else 'Nilore', emis=str(i),
+                teacher_count=1, avg_lp_ratio=i,
+            )
+
+    def get_data(self, data_type='schools', **params):
+        return self.client.get(reverse('admin-detailed-data', args=[data_type]), params)
+
+    def test_cursor_pages_cover_every_row_once(self):
+        names, cursor = [], None
+        while True:
+            params = {'pagination': 'cursor', 'sort_by': 'lp_ratio', 'sort_order': 'asc', 'count': 'none'}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.get_data(**params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            names.extend(row['school_name'] for row in response.data['data'])
+            if not response.data['pagination']['has_more']:
+                break
+            cursor = response.data['pagination']['next_cursor']
+
+        self.assertEqual(names, [f'School {i:02d}' for i in range(12)])
+
+    def test_page_size_is_capped(self):
+        response = self.get_data(page_size=1000)
+
+        self.assertEqual(len(response.data['data']), 5)
+        self.assertEqual(response.data['pagination']['page_size'], 5)
+        self.assertEqual(response.data['pagination']['total_pages'], 3)
+
+    def test_exact_and_prefix_filters(self):
+        self.assertEqual(self.get_data(sector='B-K', match='exact').data['pagination']['total_count'], 6)
+        self.assertEqual(self.get_data(sector='B', match='exact').data['pagination']['total_count'], 0)
+        self.assertEqual(self.get_data(school='School 1', match='prefix').data['pagination']['total_count'], 2)
+        self.assertEqual(self.get_data(school='1', match='contains').data['pagination']['total_count'], 3)
+
+    def test_estimated_count(self):
+        with override_settings(ADMIN_DATA_COUNT_ESTIMATE_LIMIT=10):
+            response = self.get_data(count='estimate')
+
+        self.assertEqual(response.data['pagination']['count_mode'], 'estimate')
+        self.assertEqual(response.data['pagination']['total_count'], 10)
+
+    def test_message_rows_resolve_usernames(self):
+        receiver = User.objects.create_user(username='principal', password='testpass123')
+        conversation = Conversation.objects.create(id=str(uuid.uuid4()), school_name='School 01', aeo=self.admin, principal=receiver)
+        Message.objects.create(id=str(uuid.uuid4()), conversation=conversation, sender=self.admin, receiver=receiver, school_name='School 01', message_text='Hi')
+
+        response = self.get_data('messages', pagination='cursor', sort_by='date')
+
+        self.assertEqual(response.data['data'][0]['sender'], 'admin')
+        self.assertEqual(response.data['data'][0]['receiver'], 'principal')
+
+    def test_invalid_cursor_and_type(self):
+        self.assertEqual(self.get_data(cursor='nonsense').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get_data('unknown').status_code, status.HTTP_400_BAD_REQUEST)
+
+class StreamingExportTest(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.force_authenticate(user=self.admin)
+        for i in range(5):
+            UserLoginTimestamp.objects.create(user_id=i, username=f'user{i}')
+
+    def read(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_login_timestamps_csv(self):
+        response = self.client.get(reverse('admin-login-timestamps'), {'export_csv': 'true', 'username': 'user'})
+
+        lines = self.read(response).splitlines()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(lines[0], 'User ID,Username,Date,Time,Created At')
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(sorted(line.split(',')[1] for line in lines[1:]), [f'user{i}' for i in range(5)])
+
+    def test_login_timestamps_ndjson(self):
+        response = self.client.get(reverse('admin-login-timestamps'), {'export': 'ndjson', 'user_id': 2})
+
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([row['username'] for row in rows], ['user2'])
+        self.assertIn('created_at', rows[0])
+
+    def test_export_streams_values_list(self):
+        with override_settings(EXPORT_CHUNK_SIZE=2), CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin-login-timestamps'), {'export': 'csv'})
+            self.read(response)
+
+        # values_list() only: no per-row or model instance queries
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"user_id", "api_userlogintimestamp"."username"', queries[0]['sql'])
+
+    def test_admin_data_export(self):
+        receiver = User.objects.create_user(username='principal', password='testpass123')
+        UserProfile.objects.create(user=receiver, role='Principal', sector='B-K')
+        conversation = Conversation.objects.create(id=str(uuid.uuid4()), school_name='School 1', aeo=self.admin, principal=receiver)
+        Message.objects.create(id=str(uuid.uuid4()), conversation=conversation, sender=self.admin, receiver=receiver, school_name='School 1', message_text='Hi')
+
+        messages = self.read(self.client.get(reverse('admin-detailed-data', args=['messages']), {'export': 'ndjson'}))
+        self.assertEqual(json.loads(messages)['receiver'], 'principal')
+
+        users = self.read(self.client.get(reverse('admin-detailed-data', args=['users']), {'export': 'csv', 'sort_by': 'username', 'sort_order': 'asc'}))
+        lines = users.splitlines()
+        self.assertTrue(lines[0].startswith('id,username,email'))
+        self.assertIn('admin,,Unknown', lines[1])
+        self.assertIn('Principal,B-K', lines[2])
+
+    def test_unknown_format(self):
+        response = self.client.get(reverse('admin-login-timestamps'), {'export': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class DataScopeTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        for sector, school, ratio in [('B-K', 'School A', 10), ('B-K', 'School B', 30), ('Nilore', 'School C', 50)]:
+            SchoolData.objects.create(school_name=school, sector=sector, emis=school[-1], teacher_count=2, avg_lp_ratio=ratio)
+            TeacherData.objects.create(
+                teacher=f'Teacher {school}', user_id=ratio, grade='5', subject='Math', sector=sector, emis=school[-1],
+                school=school, week_start='2025-01-06', week_end='2025-01-12', week_number=2, lp_ratio=ratio,
+            )
+
+    def login(self, role, sector=None, school_name=None):
+        user = User.objects.create_user(username=f'{role}-{sector}-{school_name}', password='testpass123')
+        UserProfile.objects.create(user=user, role=role, sector=sector, school_name=school_name)
+        self.client.force_authenticate(user=user)
+
+    def school_names(self, url_name):
+        response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(row.get('school_name', row.get('school')) for row in response.data)
+
+    def test_views_share_role_scope(self):
+        self.login('AEO', sector='B-K')
+        for url_name in ('bigquery-teacher-data', 'bigquery-all-schools', 'schools-with-infrastructure'):
+            self.assertEqual(self.school_names(url_name), ['School A', 'School B'])
+
+        self.login('Principal', school_name='School C')
+        for url_name in ('bigquery-teacher-data', 'bigquery-all-schools', 'schools-with-infrastructure'):
+            self.assertEqual(self.school_names(url_name), ['School C'])
+
+        self.login('FDE')
+        self.assertEqual(len(self.school_names('bigquery-all-schools')), 3)
+
+    def test_incomplete_profile_sees_nothing(self):
+        self.login('AEO')
+        self.assertEqual(self.school_names('bigquery-all-schools'), [])
+        self.assertEqual(self.client.get(reverse('bigquery-summary-stats')).data['total_schools'], 0)
+
+    def test_scope_is_resolved_once_per_request(self):
+        user = User.objects.create_user(username='aeo', password='testpass123')
+        UserProfile.objects.create(user=user, role='AEO', sector='Nilore')
+        request = SimpleNamespace(user=user)
+
+        with self.assertNumQueries(1):
+            first = get_scope(request)
+            second = get_scope(request)
+        self.assertIs(first, second)
+        self.assertEqual(first.key, 'AEO:Nilore')
+        self.assertEqual(list(first.school_data().values_list('school_name', flat=True)), ['School C'])
+
+    def test_data_service_accepts_profiles(self):
+        profile = SimpleNamespace(role='Principal', sector=None, school_name='School B')
+
+        self.assertEqual([row['school_name'] for row in DataService.get_school_data(profile)], ['School B'])
+        self.assertEqual(DataService.get_summary_stats(profile)['total_teachers'], 1)
+
+class ScopedResponseCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        SchoolData.objects.create(school_name='School A', sector='B-K', emis='1', teacher_count=2, avg_lp_ratio=10)
+        SchoolData.objects.create(school_name='School C', sector='Nilore', emis='3', teacher_count=2, avg_lp_ratio=50)
+
+    def login(self, username, role='AEO', sector='B-K'):
+        user = User.objects.create_user(username=username, password='testpass123')
+        UserProfile.objects.create(user=user, role=role, sector=sector)
+        self.client.force_authenticate(user=user)
+
+    def test_users_in_a_scope_share_cached_responses(self):
+        self.login('aeo1')
+        first = self.client.get(reverse('bigquery-all-schools'))
+
+        self.login('aeo2')
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(reverse('bigquery-all-schools'))
+
+        # Scope and snapshot version lookups only
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        self.login('aeo3', sector='Nilore')
+        other = self.client.get(reverse('bigquery-all-schools'))
+        self.assertEqual([row['school_name'] for row in other.data], ['School C'])
+        self.assertNotEqual(other['ETag'], first['ETag'])
+
+    def test_query_params_are_part_of_the_key(self):
+        self.login('fde', role='FDE', sector=None)
+        everything = self.client.get(reverse('bigquery-all-schools'))
+        filtered = self.client.get(reverse('bigquery-all-schools'), {'sector': 'Nilore'})
+
+        self.assertEqual(len(everything.data), 2)
+        self.assertEqual(len(filtered.data), 1)
+
+    def test_etag_revalidation(self):
+        self.login('aeo1')
+        response = self.client.get(reverse('bigquery-summary-stats'))
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with self.assertNumQueries(2):
+            revalidated = self.client.get(reverse('bigquery-summary-stats'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_snapshot_bump_invalidates(self):
+        self.login('aeo1')
+        before = self.client.get(reverse('bigquery-all-schools'))
+        SchoolData.objects.filter(emis='1').update(avg_lp_ratio=20)
+        call_command('calculate_lp_ratios', '--update-sectors', stdout=StringIO())
+
+        after = self.client.get(reverse('bigquery-all-schools'), HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual(after.status_code, status.HTTP_200_OK)
+        self.assertEqual(after.data[0]['avg_lp_ratio'], 20)
+
+class CacheLayerTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+
+    def test_namespace_invalidation(self):
+        @cache_result(timeout=60, namespace='test:squares')
+        def square(x):
+            self.calls.append(x)
+            return x * x
+
+        self.assertEqual([square(3), square(3), square(4)], [9, 9, 16])
+        invalidate_namespace('test:squares')
+        square(3)
+
+        self.assertEqual(self.calls, [3, 4, 3])
+
+    def test_partitions_invalidate_independently(self):
+        @cache_result(timeout=60, namespace='test:users', partition=lambda user_id: user_id)
+        def load(user_id):
+            self.calls.append(user_id)
+            return None  # cached like any other value
+
+        load(1), load(2), load(1), load(2)
+        invalidate_namespace('test:users', 1)
+        load(1), load(2)
+
+        self.assertEqual(self.calls, [1, 2, 1])
+
+    def test_concurrent_misses_compute_once(self):
+        started = threading.Event()
+
+        def compute():
+            self.calls.append('compute')
+            started.set()
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        key = make_key('test:stampede', 'key')
+        threads = [threading.Thread(target=lambda: results.append(get_or_compute('test:stampede', key, compute, 60)))]
+        threads[0].start()
+        started.wait(1)
+        threads += [threading.Thread(target=lambda: results.append(get_or_compute('test:stampede', key, compute, 60))) for _ in range(3)]
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, ['compute'])
+        self.assertEqual(results, ['value'] * 4)
+
+    def test_stats_count_hits_and_misses(self):
+        key = make_key('test:stats', 'key')
+        for _ in range(3):
+            get_or_compute('test:stats', key, lambda: 1, 60)
+
+        stats = get_cache_stats()['namespaces']['test:stats']
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+        self.assertEqual(stats['hit_rate'], 0.667)
+
+    def test_stats_registry_is_shared_between_processes(self):
+        # Counters written by another worker register the namespace in the shared cache too
+        cache.set('stats:namespaces:count', 1, None)
+        cache.set('stats:namespaces:1', 'test:other_worker', None)
+        cache.set('stats:test:other_worker:hits', 4, None)
+        self.assertEqual(get_cache_stats()['namespaces']['test:other_worker']['hits'], 4)
+
+        cache.clear()
+        get_or_compute('test:shared', make_key('test:shared', 'key'), lambda: 1, 60)
+        self.assertEqual(list(get_cache_stats()['namespaces']), ['test:shared'])
+
+    def test_admin_stats_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_superuser(username='admin', password='testpass123'))
+        get_or_compute('test:endpoint', make_key('test:endpoint', 'key'), lambda: 1, 60)
+
+        response = client.get(reverse('admin-cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['namespaces']['test:endpoint']['misses'], 1)
+
+class SummaryStatsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        for index, ratio in enumerate([95, 80, 79.5, 60, 59.9, 0]):
+            school = f'School {index % 2}'
+            TeacherData.objects.create(
+                teacher=f'Teacher {index}', user_id=index, grade='5', subject='Math', sector='B-K', emis=str(index % 2),
+                school=school, week_start='2025-01-06', week_end='2025-01-12', week_number=2, lp_ratio=ratio,
+            )
+        SchoolData.objects.create(school_name='School 0', sector='B-K', emis='0', teacher_count=3, avg_lp_ratio=40)
+        SchoolData.objects.create(school_name='School 1', sector='B-K', emis='1', teacher_count=3, avg_lp_ratio=70)
+        user = User.objects.create_user(username='fde', password='testpass123')
+        UserProfile.objects.create(user=user, role='FDE')
+        self.client.force_authenticate(user=user)
+
+    def test_teacher_stats_in_one_query(self):
+        with self.assertNumQueries(1):
+            stats = SummaryStatsService.teacher_stats(TeacherData.objects.all())
+
+        self.assertEqual(stats['rows'], 6)
+        self.assertEqual((stats['teachers'], stats['schools'], stats['sectors']), (6, 2, 1))
+        self.assertEqual(stats['bands'], {'excellent': 2, 'good': 2, 'needs_improvement': 2})
+
+    @override_settings(LP_PERFORMANCE_BANDS=[('high', 90), ('mid', 50), ('low', 10), ('none', None)])
+    def test_configurable_bands(self):
+        stats = SummaryStatsService.teacher_stats(TeacherData.objects.all(), distinct=False)
+
+        self.assertEqual(stats['bands'], {'high': 1, 'mid': 4, 'low': 0, 'none': 1})
+        self.assertNotIn('teachers', stats)
+
+    def test_summary_stats_view(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('bigquery-summary-stats'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_schools'], 2)
+        self.assertEqual(response.data['active_teachers'], 6)
+        self.assertEqual(response.data['overall_avg_lp_ratio'], 55)
+        self.assertEqual(response.data['performance_breakdown'], {'excellent': 2, 'good': 2, 'needs_improvement': 2})
+        # Scope, snapshot version and one aggregate per table
+        self.assertLessEqual(len(queries), 5)
+
+    def test_benchmark_matches_legacy_numbers(self):
+        out = StringIO()
+        call_command('benchmark_summary_stats', '--iterations', '1', '--seed-rows', '40', stdout=out)
+
+        self.assertIn('Results identical', out.getvalue())
+        self.assertEqual(TeacherData.objects.count(), 6)
+
+class SchoolTeachersDataTest(APITestCase):
+    def setUp(self):
+        SchoolData.objects.create(school_name='School A', sector='B-K', emis='1', teacher_count=2, avg_lp_ratio=50)
+        user = User.objects.create_user(username='principal', password='testpass123')
+        UserProfile.objects.create(user=user, role='Principal', school_name='School A')
+        self.client.force_authenticate(user=user)
+
+    def add_teacher(self, user_id, name, weeks):
+        UserSchoolProfile.objects.create(user_id=user_id, teacher=name, sector='B-K', emis='1', school='School A')
+        for week_start, ratio in weeks:
+            TeacherData.objects.create(
+                teacher=name, user_id=user_id, grade='5', subject='Math', sector='B-K', emis='1', school='School A',
+                week_start=week_start, week_end=week_start, week_number=1, lp_ratio=ratio,
+            )
+
+    def test_latest_row_per_teacher_by_user_id(self):
+        self.add_teacher(1, 'Ayesha', [('2025-01-06', 20), ('2025-01-13', 40)])
+        # Same name, different teacher: must not pick up Ayesha's rows
+        self.add_teacher(2, 'Ayesha', [('2025-01-20', 90)])
+        self.add_teacher(3, 'Bilal', [])
+
+        teachers = {row['user_id']: row for row in self.client.get(reverse('school-teachers')).data['teachers']}
+
+        self.assertEqual((teachers[1]['latest_lp_ratio'], teachers[1]['latest_week']), (40, '2025-01-13'))
+        self.assertEqual(teachers[2]['latest_lp_ratio'], 90)
+        self.assertEqual((teachers[3]['latest_lp_ratio'], teachers[3]['latest_week']), (0, None))
+
+    def test_query_count_is_constant(self):
+        self.add_teacher(1, 'Teacher 1', [('2025-01-06', 20)])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('school-teachers'))
+
+        for user_id in range(2, 12):
+            self.add_teacher(user_id, f'Teacher {user_id}', [('2025-01-06', 20), ('2025-01-13', 30)])
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(reverse('school-teachers'))
+        self.assertEqual(response.data['school_details']['total_teachers'], 11)
+
+class UsageDistributionTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        for name, sector, teachers, ratio in [('School A', 'B-K', 2, 50), ('School B', 'B-K', 1, 100), ('School C', 'Nilore', 4, 25)]:
+            SchoolData.objects.create(school_name=name, sector=sector, emis=name[-1], teacher_count=teachers, avg_lp_ratio=ratio)
+        for period, ratio in [('2025-01-06', 20), ('2025-01-13', 60)]:
+            AggregatedData.objects.create(school='School A', sector='B-K', period=period, teacher_count=1, avg_lp_ratio=ratio)
+        user = User.objects.create_user(username='fde', password='testpass123')
+        UserProfile.objects.create(user=user, role='FDE')
+        self.client.force_authenticate(user=user)
+
+    def get(self, **params):
+        response = self.client.get(reverse('lesson-plan-usage-distribution'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_weighted_distribution_by_sector(self):
+        data = self.get()
+
+        self.assertEqual(data['total_usage'], 300)
+        self.assertEqual(
+            [(row['sector'], row['percentage']) for row in data['distribution']],
+            [('B-K', 66.7), ('Nilore', 33.3)],
+        )
+
+    def test_grouping_by_school_and_period(self):
+        schools = self.get(group_by='school')['distribution']
+        self.assertEqual(sorted(row['school'] for row in schools), ['School A', 'School B', 'School C'])
+        self.assertEqual({row['percentage'] for row in schools}, {33.3})
+
+        periods = self.get(group_by='period')['distribution']
+        self.assertEqual([(row['period'], row['percentage']) for row in periods], [('2025-01-06', 25.0), ('2025-01-13', 75.0)])
+
+        response = self.client.get(reverse('lesson-plan-usage-distribution'), {'group_by': 'grade'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cached_per_snapshot(self):
+        self.get()
+        SchoolData.objects.filter(sector='Nilore').update(teacher_count=8)
+        with self.assertNumQueries(1):  # snapshot version only
+            self.assertEqual(self.get()['total_usage'], 300)
+
+        SnapshotService.bump('school_data')
+        self.assertEqual(self.get()['total_usage'], 400)
+
+class AEOSectorSchoolsTest(APITestCase):
+    ACTIVITY = dict(
+        emis='101', school_name='School A', sector='B-K', teacher_count=4, avg_lp_ratio=35.5, active_teachers=3,
+        inactive_teachers=1, teachers_with_observations=2, avg_infrastructure_score=4.2, wifi_status='Available',
+        teachers_with_mobile_access=1,
+    )
+
+    def login(self, role='AEO', sector='B-K', superuser=False):
+        user = User.objects.create_user(username=f'{role}-{superuser}', password='testpass123', is_superuser=superuser)
+        UserProfile.objects.create(user=user, role=role, sector=sector)
+        self.client.force_authenticate(user=user)
+
+    def test_served_from_synced_table(self):
+        client = FakeBigQueryClient({'TEACH_TOOL_OBSERVATION': [SimpleNamespace(**self.ACTIVITY)]})
+        with patch('api.management.commands.sync_bigquery_data.bigquery.Client', return_value=client):
+            call_command('sync_bigquery_data', data_type='school_activity', force=True, stdout=open(os.devnull, 'w'))
+        SchoolActivity.objects.create(**{**self.ACTIVITY, 'emis': '202', 'school_name': 'School N', 'sector': 'Nilore'})
+
+        self.login()
+        with bigquery_gateway.override(FakeBigQueryClient()) as live_client:
+            response = self.client.get(reverse('aeo-sector-schools'), {'live': '1'})  # ignored for non-admins
+
+        self.assertEqual(live_client.queries, [])
+        self.assertEqual(len(response.data), 1)
+        school = response.data[0]
+        self.assertEqual((school['school_name'], school['activity_percentage'], school['activity_status']), ('School A', 75.0, 'Active'))
+        self.assertTrue(school['wifi_available'])
+        self.assertEqual(school['teachers_with_observations'], 2)
+
+    def test_admin_live_path(self):
+        cache.clear()
+        live_row = SimpleNamespace(EMIS='303', **{k: v for k, v in self.ACTIVITY.items() if k != 'emis'})
+        client = FakeBigQueryClient({'@sector': [live_row]})
+        self.login(role='FDE', sector=None, superuser=True)
+
+        with bigquery_gateway.override(client):
+            response = self.client.get(reverse('aeo-sector-schools'), {'sector': 'B-K', 'live': '1'})
+            # Live reads skip the gateway's result cache
+            self.client.get(reverse('aeo-sector-schools'), {'sector': 'B-K', 'live': '1'})
+
+        self.assertEqual([row['emis'] for row in response.data], ['303'])
+        self.assertEqual(len(client.queries), 2)
+
+    def test_other_roles_denied(self):
+        self.login(role='Principal')
+        self.assertEqual(self.client.get(reverse('aeo-sector-schools')).status_code, 403)
+
+class TeacherObservationStoreTest(APITestCase):
+    CSV = (
+        'user_id,EMIS,School,Sector,supp_learn_envi_score,pos_behav_expec_score,lesson_facilitation_score,cfu_score,'
+        'feedback_score,ct_score,autonomy_score,perseverance_score,social_score,overall_average_score\n'
+        '1,101,School A,B-K,5.0,4.0,4.0,4.0,4.0,4.0,4.0,4.0,4.0,4.11\n'
+        '1,101,School A,B-K,4.0,3.0,3.0,3.0,3.0,3.0,3.0,3.0,3.0,3.11\n'
+        '2,101,School A,B-K,3.0,2.0,2.0,2.0,2.0,2.0,2.0,2.0,2.0,2.11\n'
+        '3,202,School B,Nilore,2.0,,2.0,2.0,2.0,2.0,2.0,2.0,2.0,2.0\n'
+    )
+
+    def setUp(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(self.CSV)
+        self.addCleanup(os.remove, f.name)
+        self.path = f.name
+        user = User.objects.create_user(username='principal', password='testpass123')
+        UserProfile.objects.create(user=user, role='Principal', school_name='School A')
+        self.client.force_authenticate(user=user)
+
+    def import_csv(self):
+        call_command('import_teacher_observations', path=self.path, stdout=open(os.devnull, 'w'))
+
+    def test_csv_import_is_idempotent_and_builds_summaries(self):
+        self.import_csv()
+        self.import_csv()
+
+        self.assertEqual(TeacherObservation.objects.count(), 4)
+        self.assertEqual(TeacherObservation.objects.filter(user_id=1).count(), 2)
+        self.assertIsNone(TeacherObservation.objects.get(user_id=3).pos_behav_expec_score)
+        summary = SchoolObservationSummary.objects.get(school='School A')
+        self.assertEqual((summary.observations, summary.total_teachers), (3, 2))
+        self.assertEqual((summary.teachers_with_good_infrastructure, summary.teachers_with_mobile_access), (1, 1))
+        self.assertEqual((summary.avg_infrastructure_score, summary.wifi_status), (4.0, 'Available'))
+        self.assertEqual(SchoolObservationSummary.objects.get(school='School B').wifi_status, 'Not Available')
+
+    def test_views_read_the_local_store(self):
+        self.import_csv()
+
+        with bigquery_gateway.override(FakeBigQueryClient()) as live_client:
+            observations = self.client.get(reverse('teacher-observations')).data
+            with self.assertNumQueries(1):  # the summary row
+                infrastructure = self.client.get(reverse('school-infrastructure')).data
+
+        self.assertEqual(live_client.queries, [])
+        self.assertEqual(observations['total_observations'], 3)
+        self.assertEqual(observations['observations'][0]['school'], 'School A')
+        self.assertEqual(infrastructure['mobile_phone_percentage'], 50.0)
+        self.assertTrue(infrastructure['wifi_available'])
+
+        missing = self.client.get(reverse('school-infrastructure'), {'school_name': 'Nowhere'}).data
+        self.assertEqual((missing['school'], missing['wifi_status']), ('Nowhere', 'Not Available'))
+
+    def test_sync_step(self):
+        scores = {field: 3.0 for field in ObservationService.SCORE_FIELDS}
+        rows = [
+            SimpleNamespace(date=timezone.now(), user_id=7, EMIS='101', School='School A', Sector='B-K', overall_average_score=3.0, **scores),
+            SimpleNamespace(date=None, user_id=8, EMIS='101', School='School A', Sector='B-K', overall_average_score=3.0, **scores),
+        ]
+        client = FakeBigQueryClient({'AS overall_average_score': rows})
+        with patch('api.management.commands.sync_bigquery_data.bigquery.Client', return_value=client):
+            call_command('sync_bigquery_data', data_type='teacher_observations', force=True, stdout=open(os.devnull, 'w'))
+
+        self.assertEqual(DataSyncLog.objects.get(sync_type='teacher_observations').status, 'success')
+        self.assertEqual(TeacherObservation.objects.filter(date=timezone.now().date()).count(), 1)
+        self.assertEqual(ObservationService.get_school_summary('School A').wifi_status, 'Limited')
+
+class BigQueryGatewayTest(TestCase):
+    SQL = 'SELECT EMIS FROM `tbproddb.FDE_Schools` WHERE EMIS = @emis'
+
+    def setUp(self):
+        cache.clear()
+        self.client = FakeBigQueryClient({'FDE_Schools': [SimpleNamespace(EMIS=101)]})
+        self.gateway = BigQueryGateway(client_factory=lambda: self.client)
+
+    def test_client_created_once_and_results_cached_per_params(self):
+        factory_calls = []
+        gateway = BigQueryGateway(client_factory=lambda: factory_calls.append(1) or self.client)
+
+        first = gateway.query(self.SQL, {'emis': 101})
+        second = gateway.query(self.SQL, {'emis': 101})
+        gateway.query(self.SQL, {'emis': 102})
+        gateway.query(self.SQL, {'emis': 101}, ttl=0)
+
+        self.assertEqual(len(factory_calls), 1)
+        self.assertEqual(len(self.client.queries), 3)
+        self.assertEqual([row.EMIS for row in first], [101])
+        self.assertEqual(second, first)
+
+    def test_concurrent_identical_queries_share_one_job(self):
+        self.client.delay = 0.2
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.gateway.query(self.SQL, {'emis': 101}, ttl=0)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.client.queries), 1)
+        self.assertEqual(len(results), 4)
+
+    def test_errors_are_not_cached(self):
+        self.client.errors = {'FDE_Schools': RuntimeError('quota exceeded')}
+        with self.assertRaises(RuntimeError):
+            self.gateway.query(self.SQL, {'emis': 101})
+
+        self.client.errors = {}
+        self.assertEqual(len(self.gateway.query(self.SQL, {'emis': 101})), 1)
+
+    @override_settings(BIGQUERY_BACKEND='fake')
+    def test_fake_backend(self):
+        gateway = BigQueryGateway()
+        self.assertIsInstance(gateway.client, GatewayFakeClient)
+        self.assertEqual(gateway.query(self.SQL, {'emis': 101}), [])
+        self.assertEqual(gateway.client.queries[0][1], {'emis': 101})
+
+class EnhancedSchoolsDataTest(APITestCase):
+    def setUp(self):
+        rows = [
+            SimpleNamespace(
+                emis=str(100 + i), school_name=f'School {i:02d}', sector='B-K' if i % 2 else 'Nilore', teacher_count=4,
+                avg_lp_ratio=40.0, active_teachers=3, inactive_teachers=1, teachers_with_observations=2,
+                avg_infrastructure_score=3.5, wifi_status='Limited', teachers_with_mobile_access=1,
+            )
+            for i in range(12)
+        ]
+        client = FakeBigQueryClient({'TEACH_TOOL_OBSERVATION': rows})
+        with patch('api.management.commands.sync_bigquery_data.bigquery.Client', return_value=client):
+            call_command('sync_bigquery_data', data_type='school_activity', force=True, stdout=open(os.devnull, 'w'))
+
+        user = User.objects.create_user(username='fde', password='testpass123')
+        UserProfile.objects.create(user=user, role='FDE')
+        self.client.force_authenticate(user=user)
+
+    def test_served_from_synced_table(self):
+        with bigquery_gateway.override(FakeBigQueryClient()) as live_client:
+            response = self.client.get(reverse('enhanced-schools'))
+
+        self.assertEqual(live_client.queries, [])
+        self.assertEqual(len(response.data), 12)
+        self.assertEqual(response.data[0]['school_name'], 'School 00')
+        self.assertEqual((response.data[0]['mobile_phone_percentage'], response.data[0]['wifi_available']), (25.0, False))
+
+    def test_filters_and_pages(self):
+        self.assertEqual([row['emis'] for row in self.client.get(reverse('enhanced-schools'), {'emis': '105'}).data], ['105'])
+
+        response = self.client.get(reverse('enhanced-schools'), {'sector': 'B-K', 'page': 2, 'page_size': 4})
+        self.assertEqual([row['school_name'] for row in response.data['data']], ['School 09', 'School 11'])
+        self.assertEqual(response.data['pagination'], {'page': 2, 'page_size': 4, 'total_pages': 2, 'total_count': 6})
+
+    @override_settings(ENHANCED_SCHOOLS_MAX_PAGE_SIZE=5)
+    def test_page_size_is_capped_by_view_setting(self):
+        response = self.client.get(reverse('enhanced-schools'), {'page_size': 100})
+        self.assertEqual(len(response.data['data']), 5)
+        self.assertEqual(response.data['pagination']['total_pages'], 3)
+
+class PrincipalDirectoryTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        rows = [
+            SimpleNamespace(emis=284, school_name='IMCB G-10/4', sector='B-K', principal_username='principal_imcb_g_10/4'),
+            SimpleNamespace(emis=285, school_name='IMSG Nilore', sector='Nilore', principal_username='principal_imsg_nilore'),
+        ]
+        client = FakeBigQueryClient({'as principal_username': rows})
+        with patch('api.management.commands.sync_bigquery_data.bigquery.Client', return_value=client):
+            call_command('sync_bigquery_data', data_type='school_directory', force=True, stdout=open(os.devnull, 'w'))
+
+    def test_sync_indexes_schools_and_provisions_principals(self):
+        self.assertEqual(SchoolDirectory.objects.get(emis='284').sector, 'B-K')
+        profile = UserProfile.objects.get(user__username='principal_imsg_nilore')
+        self.assertEqual((profile.role, profile.school_name, profile.sector, profile.emis), ('Principal', 'IMSG Nilore', 'Nilore', '285'))
+        self.assertTrue(profile.user.check_password('pass123'))
+
+        self.assertEqual(PrincipalDirectoryService.provision_principals(), {'users': 0, 'profiles': 0})
+        self.assertEqual(User.objects.filter(username__startswith='principal_').count(), 2)
+
+    def test_emis_login_is_resolved_locally(self):
+        with bigquery_gateway.override(FakeBigQueryClient()) as live_client:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(reverse('custom_login'), {'username': '0284', 'password': 'pass123'}, format='json')
+
+        self.assertEqual(live_client.queries, [])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user']['username'], 'principal_imcb_g_10/4')
+        self.assertFalse(any('INSERT INTO "auth_user"' in query['sql'] for query in queries.captured_queries))
+
+        response = self.client.post(reverse('custom_login'), {'username': '999', 'password': 'pass123'}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_login_creates_principal_missing_from_provisioning(self):
+        User.objects.filter(username='principal_imsg_nilore').delete()
+
+        response = self.client.post(reverse('custom_login'), {'username': '285', 'password': 'pass123'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(UserProfile.objects.get(user__username='principal_imsg_nilore').school_name, 'IMSG Nilore')
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class NotificationConsumerResumeTest(TransactionTestCase):
+    def test_resume_replays_missed_events(self):
+        from asgiref.sync import async_to_sync
+        from channels.testing import WebsocketCommunicator
+        from .consumers import NotificationConsumer
+
+        user = User.objects.create_user(username='principal', password='testpass123')
+        first = NotificationEvent.objects.create(user=user, event_type='unread_count_changed', payload={'unread_count': 1})
+        second = NotificationEvent.objects.create(user=user, event_type='unread_count_changed', payload={'unread_count': 2})
+
+        async def run():
+            communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+            communicator.scope['user'] = user
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            await communicator.receive_json_from()  # connection_established
+
+            await communicator.send_json_to({'type': 'resume', 'last_seq': first.id})
+            replayed = await communicator.receive_json_from()
+            complete = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return replayed, complete
+
+        replayed, complete = async_to_sync(run)()
+
+        self.assertEqual(replayed['type'], 'unread_count_changed')
+        self.assertEqual(replayed['seq'], second.id)
+        self.assertEqual(replayed['data']['unread_count'], 2)
+        self.assertEqual(complete, {'type': 'resume_complete', 'seq': second.id})
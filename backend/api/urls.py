@@ -36,6 +36,8 @@ urlpatterns = [
     path('schools-with-infrastructure/', views.SchoolsWithInfrastructureDataView.as_view(), name='schools-with-infrastructure'),
            # Health check
     path('health/', views.HealthCheckView.as_view(), name='health-check'),
+    path('health/live/', views.LivenessView.as_view(), name='health-live'),
+    path('health/ready/', views.ReadinessView.as_view(), name='health-ready'),
     # Data sync management
     path('data-sync/status/', views.DataSyncStatusView.as_view(), name='data-sync-status'),
     path('data-sync/trigger/', views.TriggerDataSyncView.as_view(), name='trigger-data-sync'),
@@ -48,6 +50,7 @@ urlpatterns = [
     # Admin dashboard endpoints
     path('admin/dashboard/', views.AdminDashboardView.as_view(), name='admin-dashboard'),
     path('admin/data/<str:data_type>/', views.AdminDetailedDataView.as_view(), name='admin-detailed-data'),
+    path('admin/cache-stats/', views.CacheStatsView.as_view(), name='admin-cache-stats'),
     path('admin/login-timestamps/', views.UserLoginTimestampView.as_view(), name='admin-login-timestamps'),
     # Admin messaging endpoint
     path('admin/messages/', views.AdminMessageCreateView.as_view(), name='admin-messages'),
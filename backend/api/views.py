@@ -7,18 +7,24 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.contrib.auth.hashers import make_password, check_password
-from .models import UserProfile, Conversation, Message, TeacherData, AggregatedData, FilterOptions, SchoolData, SectorData, UserSchoolProfile, UserLoginTimestamp
+from .models import UserProfile, Conversation, Message, TeacherData, AggregatedData, FilterOptions, SchoolData, SchoolActivity, SchoolObservationSummary, SectorData, UserSchoolProfile, UserLoginTimestamp
 from .serializers import UserSerializer, ConversationSerializer, MessageSerializer, RegisterSerializer, SchoolDataSerializer, SectorDataSerializer, TeacherDataSerializer, UserLoginTimestampSerializer
-from .services import DataService
+from .services import DataService, InboxService, UnreadCounterService, NotificationService, SnapshotService, AdminDashboardService, AdminSnapshotService, AdminDataService, SummaryStatsService, ObservationService, PrincipalDirectoryService
+from .pagination import KeysetPagination, message_history_pagination, estimate_count
+from .exports import stream_export
+from .scoping import get_scope
+from .cache import BigQueryCache, cache_scoped_response, get_cache_stats
+from .bigquery_gateway import bigquery_gateway
+from .school_profiles import school_profiles
+from .health import metrics_sampler, check_database, check_channel_layer
 from rest_framework import status
 from uuid import uuid4
 import os
-from google.cloud import bigquery
 import json
 from django.conf import settings
 import re
@@ -76,6 +82,18 @@ class MessageListView(ListAPIView):
             'receiver__userprofile'
         ).filter(conversation_id=conversation_id).order_by('timestamp')
 
+    def list(self, request, *args, **kwargs):
+        """Full history by default; a cursor page when page_size/before/after is given"""
+        paginator = message_history_pagination()
+        if not paginator.is_requested(request):
+            return super().list(request, *args, **kwargs)
+        try:
+            page = paginator.paginate(self.get_queryset(), request, start_from_end=True)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        page['results'] = self.get_serializer(page['results'], many=True).data
+        return Response(page)
+
 class UserMessagesView(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -91,21 +109,33 @@ class UserMessagesView(APIView):
                 (models.Q(aeo=other_user) & models.Q(principal=current_user))
             )
             
+            paginator = message_history_pagination()
+            paginated = paginator.is_requested(request)
+            
             if not conversations.exists():
+                if paginated:
+                    page = paginator.paginate(Message.objects.none(), request, start_from_end=True)
+                    return Response(page, status=status.HTTP_200_OK)
                 return Response([], status=status.HTTP_200_OK)
             
             # Get all messages from these conversations
-            conversation_ids = [conv.id for conv in conversations]
             messages = Message.objects.select_related(
                 'sender__userprofile', 
                 'receiver__userprofile'
             ).filter(
-                conversation_id__in=conversation_ids
+                conversation__in=conversations
             ).order_by('timestamp')
             
+            if paginated:
+                page = paginator.paginate(messages, request, start_from_end=True)
+                page['results'] = MessageSerializer(page['results'], many=True).data
+                return Response(page, status=status.HTTP_200_OK)
+            
             serializer = MessageSerializer(messages, many=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
             
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except User.DoesNotExist:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
@@ -166,14 +196,12 @@ class LPDataSummaryView(APIView):
     
     def get(self, request):
         try:
-            from django.db.models import Avg, Count
-            
-            # Overall statistics
+            # Overall statistics, one aggregate query per table
             # Use UserSchoolProfile for more accurate teacher count
-            total_teachers = UserSchoolProfile.objects.values('user_id').distinct().count()
-            total_schools = SchoolData.objects.count()
+            total_teachers = SummaryStatsService.profile_stats(UserSchoolProfile.objects.all())['teachers']
+            total_schools = SummaryStatsService.school_stats(SchoolData.objects.all())['schools']
             total_sectors = SectorData.objects.count()
-            overall_avg_lp = TeacherData.objects.aggregate(avg=Avg('lp_ratio'))['avg'] or 0
+            teachers = SummaryStatsService.teacher_stats(TeacherData.objects.all(), distinct=False)
             
             # Sector summary
             sector_summary = SectorData.objects.all().order_by('sector')
@@ -213,7 +241,8 @@ class LPDataSummaryView(APIView):
                     'total_teachers': total_teachers,
                     'total_schools': total_schools,
                     'total_sectors': total_sectors,
-                    'overall_avg_lp_ratio': overall_avg_lp
+                    'overall_avg_lp_ratio': teachers['avg_lp_ratio'],
+                    'performance_breakdown': teachers['bands'],
                 },
                 'sector_summary': sector_data,
                 'top_schools': top_schools_data,
@@ -230,69 +259,9 @@ class UserConversationsView(APIView):
     def get(self, request):
         """Get all conversations for the current user with message previews"""
         try:
-            current_user = request.user
-            
-            # Get all conversations where current user is involved
-            conversations = Conversation.objects.filter(
-                models.Q(aeo=current_user) | models.Q(principal=current_user)
-            ).select_related('aeo__userprofile', 'principal__userprofile')
-            
-            conversation_data = []
-            
-            for conversation in conversations:
-                # Get the other user in the conversation
-                if conversation.aeo == current_user:
-                    other_user = conversation.principal
-                    other_user_role = 'Principal'
-                else:
-                    other_user = conversation.aeo
-                    other_user_role = 'AEO'
-                
-                # Get the latest message in this conversation
-                latest_message = Message.objects.filter(
-                    conversation=conversation
-                ).order_by('-timestamp').first()
-                
-                # Get unread count for current user
-                unread_count = Message.objects.filter(
-                    conversation=conversation,
-                    receiver=current_user,
-                    is_read=False
-                ).count()
-                
-                # Safely get userprofile data
-                try:
-                    other_user_profile = other_user.userprofile
-                    other_user_school_name = other_user_profile.school_name if other_user_profile else None
-                    other_user_emis = other_user_profile.emis if other_user_profile else None
-                except:
-                    other_user_school_name = None
-                    other_user_emis = None
-                
-                conversation_data.append({
-                    'conversation_id': conversation.id,
-                    'school_name': conversation.school_name,
-                    'other_user': {
-                        'id': other_user.id,
-                        'username': other_user.username,
-                        'role': other_user_role,
-                        'school_name': other_user_school_name,
-                        'emis': other_user_emis,
-                    },
-                    'latest_message': {
-                        'text': latest_message.message_text if latest_message else '',
-                        'timestamp': latest_message.timestamp if latest_message else conversation.created_at,
-                        'sender_id': latest_message.sender.id if latest_message else None,
-                        'is_own': latest_message.sender == current_user if latest_message else False,
-                    },
-                    'unread_count': unread_count,
-                    'created_at': conversation.created_at,
-                    'last_message_at': conversation.last_message_at,
-                })
-            
-            # Sort by last message timestamp (most recent first)
-            conversation_data.sort(key=lambda x: x['last_message_at'], reverse=True)
-            
+            # Latest message, unread count and counterpart profile come from a
+            # single annotated query, already sorted by last_message_at
+            conversation_data = InboxService.get_user_inbox(request.user)
             return Response(conversation_data, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -307,11 +276,11 @@ class MarkMessagesReadView(APIView):
             current_user = request.user
             
             # Mark all unread messages in this conversation as read
-            Message.objects.filter(
-                conversation_id=conversation_id,
-                receiver=current_user,
-                is_read=False
-            ).update(is_read=True)
+            with transaction.atomic():
+                marked = UnreadCounterService.mark_conversation_read(conversation_id, current_user)
+                if marked:
+                    NotificationService.messages_read(conversation_id, current_user)
+                    transaction.on_commit(AdminSnapshotService.messages_changed)
             
             return Response({'success': True}, status=status.HTTP_200_OK)
             
@@ -382,18 +351,22 @@ class MessageCreateView(CreateAPIView):
                 if created:
                     print(f"Created new conversation: {conversation.id}")
             
-            message = Message.objects.create(
-                id=str(uuid4()),
-                conversation=conversation,
-                sender=sender,
-                receiver=receiver,
-                school_name=school_name,
-                message_text=message_text
-            )
-            
-            # Update the conversation's last_message_at to the current timestamp
-            conversation.last_message_at = timezone.now()
-            conversation.save()
+            with transaction.atomic():
+                message = Message.objects.create(
+                    id=str(uuid4()),
+                    conversation=conversation,
+                    sender=sender,
+                    receiver=receiver,
+                    school_name=school_name,
+                    message_text=message_text
+                )
+                UnreadCounterService.record_new_message(message)
+                NotificationService.message_created(message)
+                transaction.on_commit(AdminSnapshotService.messages_changed)
+                
+                # Update the conversation's last_message_at to the current timestamp
+                conversation.last_message_at = timezone.now()
+                conversation.save()
             
             # Send WebSocket notification to the receiver
             try:
@@ -503,9 +476,6 @@ class PrincipalDetailView(APIView):
             
             # If not found in local database, try BigQuery as fallback
             try:
-                # Initialize BigQuery client
-                client = bigquery.Client()
-                
                 # Query to get principal information from BigQuery
                 query = """
                 SELECT DISTINCT
@@ -521,13 +491,7 @@ class PrincipalDetailView(APIView):
                 """
                 
                 # Execute query with parameter
-                query_job = client.query(query, job_config=bigquery.QueryJobConfig(
-                    query_parameters=[
-                        bigquery.ScalarQueryParameter("school_name", "STRING", schoolName),
-                    ]
-                ))
-                
-                results = query_job.result()
+                results = bigquery_gateway.query(query, {'school_name': schoolName})
                 
                 # Check if we got any results
                 for row in results:
@@ -564,9 +528,6 @@ class AEOListView(APIView):
     
     def get(self, request):
         try:
-            # Initialize BigQuery client
-            client = bigquery.Client()
-            
             # Query to get all AEOs from BigQuery (based on sectors)
             query = """
             SELECT DISTINCT
@@ -580,8 +541,7 @@ class AEOListView(APIView):
             """
             
             # Execute query
-            query_job = client.query(query)
-            results = query_job.result()
+            results = bigquery_gateway.query(query)
             
             # Convert to list of dictionaries
             data = []
@@ -630,24 +590,16 @@ class FDEListView(APIView):
 class LocalTeacherDataView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @cache_scoped_response('teacher-data')
     def get(self, request):
         try:
-            user = request.user
-            user_profile = user.userprofile
-            
             # Get filter parameters
             grade_filter = request.query_params.get('grade', '')
             subject_filter = request.query_params.get('subject', '')
             sector_filter = request.query_params.get('sector', '')
             
-            # Build query
-            queryset = TeacherData.objects.all()
-            
-            # Apply filters based on user role
-            if user_profile.role == 'AEO' and user_profile.sector:
-                queryset = queryset.filter(sector=user_profile.sector)
-            elif user_profile.role == 'Principal' and user_profile.school_name:
-                queryset = queryset.filter(school=user_profile.school_name)
+            # Build query, scoped to the user's role
+            queryset = get_scope(request).teacher_data()
             
             # Apply additional filters
             if grade_filter:
@@ -658,24 +610,10 @@ class LocalTeacherDataView(APIView):
                 queryset = queryset.filter(sector=sector_filter)
             
             # Limit results
-            queryset = queryset.order_by('-week_start')[:1000]
-            
-            # Convert to list of dictionaries
-            data = []
-            for item in queryset:
-                data.append({
-                    'user_id': item.user_id,
-                    'teacher': item.teacher,
-                    'grade': item.grade,
-                    'subject': item.subject,
-                    'sector': item.sector,
-                    'emis': item.emis,
-                    'school': item.school,
-                    'week_start': item.week_start,
-                    'week_end': item.week_end,
-                    'week_number': item.week_number,
-                    'lp_ratio': item.lp_ratio,
-                })
+            data = list(queryset.order_by('-week_start').values(
+                'user_id', 'teacher', 'grade', 'subject', 'sector', 'emis', 'school',
+                'week_start', 'week_end', 'week_number', 'lp_ratio',
+            )[:1000])
             
             return Response(data)
             
@@ -686,10 +624,9 @@ class LocalTeacherDataView(APIView):
 class LocalAggregatedDataView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @cache_scoped_response('aggregated-data')
     def get(self, request):
         try:
-            user = request.user
-            user_profile = user.userprofile
             period = request.query_params.get('period', 'weekly')
             
             # Get filter parameters
@@ -697,33 +634,17 @@ class LocalAggregatedDataView(APIView):
             subject_filter = request.query_params.get('subject', '')
             sector_filter = request.query_params.get('sector', '')
             
-            # Build query
-            queryset = AggregatedData.objects.filter(period_type=period)
-            
-            # Apply filters based on user role
-            if user_profile.role == 'AEO' and user_profile.sector:
-                queryset = queryset.filter(sector=user_profile.sector)
-            elif user_profile.role == 'Principal' and user_profile.school_name:
-                queryset = queryset.filter(school=user_profile.school_name)
+            # Build query, scoped to the user's role
+            queryset = get_scope(request).aggregated_data(period)
             
             # Apply additional filters
             if sector_filter:
                 queryset = queryset.filter(sector=sector_filter)
             
             # Limit results
-            queryset = queryset.order_by('-period')[:100]
-            
-            # Convert to list of dictionaries
-            data = []
-            for item in queryset:
-                data.append({
-                    'school': item.school,
-                    'sector': item.sector,
-                    'period': item.period,
-                    'teacher_count': item.teacher_count,
-                    'avg_lp_ratio': item.avg_lp_ratio,
-                    'period_type': item.period_type,
-                })
+            data = list(queryset.order_by('-period').values(
+                'school', 'sector', 'period', 'teacher_count', 'avg_lp_ratio', 'period_type',
+            )[:100])
             
             return Response(data)
             
@@ -734,26 +655,26 @@ class LocalAggregatedDataView(APIView):
 class LocalFilterOptionsView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @cache_scoped_response('filter-options')
     def get(self, request):
         try:
-            user = request.user
-            user_profile = user.userprofile
+            scope = get_scope(request)
             
             # Get all filter options
-            filter_options = FilterOptions.objects.all()
+            filter_options = FilterOptions.objects.values_list('option_type', 'option_value')
             
             # Group by option type
             options = {}
-            for option in filter_options:
-                if option.option_type not in options:
-                    options[option.option_type] = []
-                options[option.option_type].append(option.option_value)
+            for option_type, option_value in filter_options:
+                if option_type not in options:
+                    options[option_type] = []
+                options[option_type].append(option_value)
             
             # Filter based on user role
-            if user_profile.role == 'AEO' and user_profile.sector:
+            if scope.role == 'AEO' and scope.sector:
                 # For AEO, only show options for their sector
                 if 'sectors' in options:
-                    options['sectors'] = [user_profile.sector]
+                    options['sectors'] = [scope.sector]
             
             return Response(options)
             
@@ -764,77 +685,46 @@ class LocalFilterOptionsView(APIView):
 class LocalSummaryStatsView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @cache_scoped_response('summary-stats')
     def get(self, request):
         try:
-            user = request.user
-            user_profile = user.userprofile
+            scope = get_scope(request)
             
             # Get filter parameters
             sector_filter = request.query_params.get('sector', '')
             
-            # Build query for school data
-            queryset = SchoolData.objects.all()
-            
-            # Apply filters based on user role
-            if user_profile.role == 'AEO' and user_profile.sector:
-                queryset = queryset.filter(sector=user_profile.sector)
-            elif user_profile.role == 'Principal' and user_profile.school_name:
-                queryset = queryset.filter(school_name=user_profile.school_name)
+            # Build query for school data, scoped to the user's role
+            queryset = scope.school_data()
             
             # Apply additional filters
             if sector_filter:
                 queryset = queryset.filter(sector=sector_filter)
             
-            # Calculate summary statistics
-            total_schools = queryset.count()
-            
-            # Calculate total teachers using UserSchoolProfile table for more accurate count
-            teacher_profile_queryset = UserSchoolProfile.objects.all()
-            
-            # Apply filters based on user role
-            if user_profile.role == 'AEO' and user_profile.sector:
-                teacher_profile_queryset = teacher_profile_queryset.filter(sector=user_profile.sector)
-            elif user_profile.role == 'Principal' and user_profile.school_name:
-                teacher_profile_queryset = teacher_profile_queryset.filter(school=user_profile.school_name)
-            
-            # Apply additional filters
+            # One aggregate query per source table: schools, teacher profiles, teacher rows
+            teacher_profile_queryset = scope.teacher_profiles()
+            teacher_queryset = scope.teacher_data()
             if sector_filter:
                 teacher_profile_queryset = teacher_profile_queryset.filter(sector=sector_filter)
-            
-            # Count distinct teachers from user school profiles
-            total_teachers = teacher_profile_queryset.values('user_id').distinct().count()
-            
-            # Calculate average LP ratio from school data
-            avg_lp_ratio = queryset.aggregate(avg=models.Avg('avg_lp_ratio'))['avg'] or 0
-            
-            # Get recent teacher data for additional stats
-            teacher_queryset = TeacherData.objects.all()
-            if user_profile.role == 'AEO' and user_profile.sector:
-                teacher_queryset = teacher_queryset.filter(sector=user_profile.sector)
-            elif user_profile.role == 'Principal' and user_profile.school_name:
-                teacher_queryset = teacher_queryset.filter(school=user_profile.school_name)
-            
-            if sector_filter:
                 teacher_queryset = teacher_queryset.filter(sector=sector_filter)
             
-            recent_teachers = teacher_queryset.order_by('-week_start')[:100]
-            active_teachers = recent_teachers.count()
+            schools = SummaryStatsService.school_stats(queryset)
+            total_schools = schools['schools']
+            avg_lp_ratio = schools['avg_lp_ratio']
+            
+            # Count distinct teachers from user school profiles
+            total_teachers = SummaryStatsService.profile_stats(teacher_profile_queryset)['teachers']
             
-            # Calculate performance breakdown before slicing
-            excellent_count = teacher_queryset.filter(lp_ratio__gte=80).count()
-            good_count = teacher_queryset.filter(lp_ratio__gte=60, lp_ratio__lt=80).count()
-            needs_improvement_count = teacher_queryset.filter(lp_ratio__lt=60).count()
+            # Teacher rows and performance breakdown; "active" is the most recent 100 rows
+            teachers = SummaryStatsService.teacher_stats(teacher_queryset, distinct=False)
+            active_teachers = min(teachers['rows'], 100)
+            bands = teachers['bands']
             
             summary_stats = {
                 'total_schools': total_schools,
                 'total_teachers': total_teachers,
                 'active_teachers': active_teachers,
                 'overall_avg_lp_ratio': round(avg_lp_ratio, 2),
-                'performance_breakdown': {
-                    'excellent': excellent_count,
-                    'good': good_count,
-                    'needs_improvement': needs_improvement_count,
-                }
+                'performance_breakdown': bands
             }
             
             return Response(summary_stats)
@@ -846,45 +736,33 @@ class LocalSummaryStatsView(APIView):
 class LocalAllSchoolsView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @cache_scoped_response('all-schools')
     def get(self, request):
         try:
-            user = request.user
-            user_profile = user.userprofile
-            
             # Get filter parameters
             sector_filter = request.query_params.get('sector', '')
             
-            # Build query
-            queryset = SchoolData.objects.all()
-            
-            # Apply filters based on user role
-            if user_profile.role == 'AEO' and user_profile.sector:
-                queryset = queryset.filter(sector=user_profile.sector)
-            elif user_profile.role == 'Principal' and user_profile.school_name:
-                queryset = queryset.filter(school_name=user_profile.school_name)
+            # Build query, scoped to the user's role
+            queryset = get_scope(request).school_data()
             
             # Apply additional filters
             if sector_filter:
                 queryset = queryset.filter(sector=sector_filter)
             
             # Order by school name
-            queryset = queryset.order_by('school_name')
+            queryset = queryset.order_by('school_name').values('emis', 'school_name', 'sector', 'teacher_count', 'avg_lp_ratio')
             
             # Convert to list of dictionaries
             data = []
             for item in queryset:
                 data.append({
-                    'emis': item.emis,
-                    'school_name': item.school_name,
-                    'sector': item.sector,
-                    'teacher_count': item.teacher_count,
-                    'avg_lp_ratio': item.avg_lp_ratio,
+                    **item,
                     'wifi_status': 'Available',  # Default value
                     'wifi_available': True,  # Default value
                     'avg_infrastructure_score': 4.0,  # Default value
-                    'teachers_with_mobile_access': item.teacher_count,  # Default value
+                    'teachers_with_mobile_access': item['teacher_count'],  # Default value
                     'mobile_phone_percentage': 100.0,  # Default value
-                    'teachers_with_observations': item.teacher_count,  # Default value
+                    'teachers_with_observations': item['teacher_count'],  # Default value
                 })
             
             return Response(data)
@@ -894,81 +772,80 @@ class LocalAllSchoolsView(APIView):
             return Response({'error': f'Error fetching schools data: {str(e)}'}, status=500)
 
 class EnhancedSchoolsDataView(APIView):
+    """Schools with WiFi status, infrastructure score and mobile access, from the synced SchoolActivity table.
+
+    ``sector`` and ``emis`` filter the schools. Without ``page``/``page_size``
+    every matching school is returned as a list; with either, one page is
+    returned together with pagination details.
+    """
     permission_classes = [IsAuthenticated]
     
+    METRIC_FIELDS = [
+        'id', 'emis', 'school_name', 'sector', 'teacher_count', 'avg_lp_ratio', 'wifi_status',
+        'avg_infrastructure_score', 'teachers_with_mobile_access', 'teachers_with_observations',
+    ]
+    
     def get(self, request):
         try:
-            # Initialize BigQuery client
-            client = bigquery.Client()
+            queryset = SchoolActivity.objects.all()
             
-            # Query to get enhanced school data with WiFi and mobile phone information
-            query = """
-            SELECT  
-                c.EMIS, 
-                c.Institute as school_name, 
-                c.Sector as sector,
-                COUNT(DISTINCT d.user_id) as teacher_count,
-                AVG(LEAST(IFNULL(a.lp_started, 0) / a.max_classes, 1) * 100) as avg_lp_ratio,
-                
-                -- WiFi and infrastructure data from teacher observations
-                COUNT(DISTINCT CASE 
-                    WHEN obs.supp_learn_envi_supp_learn_envi_score IS NOT NULL 
-                    THEN obs.user_id 
-                END) as teachers_with_observations,
-                
-                AVG(CAST(obs.supp_learn_envi_supp_learn_envi_score AS FLOAT64)) as avg_infrastructure_score,
-                
-                -- WiFi status based on infrastructure score
-                CASE 
-                    WHEN AVG(CAST(obs.supp_learn_envi_supp_learn_envi_score AS FLOAT64)) >= 4.0 THEN 'Available'
-                    WHEN AVG(CAST(obs.supp_learn_envi_supp_learn_envi_score AS FLOAT64)) >= 3.0 THEN 'Limited'
-                    ELSE 'Not Available'
-                END as wifi_status,
-                
-                -- Mobile phone access estimation
-                COUNT(DISTINCT CASE 
-                    WHEN CAST(obs.supp_learn_envi_supp_learn_envi_score AS FLOAT64) >= 3.5 
-                    THEN obs.user_id 
-                END) as teachers_with_mobile_access
-                
-            FROM `tbproddb.FDE_Schools` c
-            LEFT JOIN `tbproddb.user_school_profiles` d ON c.EMIS = d.emis_1
-            LEFT JOIN `tbproddb.weekly_time_table_NF` a ON d.user_id = a.user_id AND a.max_classes != 0
-            LEFT JOIN `tbproddb.TEACH_TOOL_OBSERVATION` obs ON d.user_id = obs.user_id 
-                AND obs.supp_learn_envi_supp_learn_envi_score IS NOT NULL 
-                AND obs.supp_learn_envi_supp_learn_envi_score != ''
-            GROUP BY c.EMIS, c.Institute, c.Sector
-            ORDER BY c.Institute
-            """
+            # Apply filters
+            sector = request.query_params.get('sector', '')
+            emis = request.query_params.get('emis', '')
+            if sector:
+                queryset = queryset.filter(sector=sector)
+            if emis:
+                queryset = queryset.filter(emis=emis)
             
-            query_job = client.query(query)
-            results = query_job.result()
+            rows = queryset.order_by('school_name', 'id').values(*self.METRIC_FIELDS)
             
-            # Convert results to list of dictionaries
-            data = []
-            for row in results:
-                total_teachers = int(row.teacher_count) if row.teacher_count else 0
-                mobile_access = int(row.teachers_with_mobile_access) if row.teachers_with_mobile_access else 0
-                
-                data.append({
-                    'emis': row.EMIS,
-                    'school_name': row.school_name,
-                    'sector': row.sector,
-                    'teacher_count': total_teachers,
-                    'avg_lp_ratio': float(row.avg_lp_ratio) if row.avg_lp_ratio else 0,
-                    'wifi_status': row.wifi_status or 'Not Available',
-                    'wifi_available': row.wifi_status == 'Available',
-                    'avg_infrastructure_score': float(row.avg_infrastructure_score) if row.avg_infrastructure_score else 0,
-                    'teachers_with_mobile_access': mobile_access,
-                    'mobile_phone_percentage': round((mobile_access / total_teachers * 100) if total_teachers > 0 else 0, 1),
-                    'teachers_with_observations': int(row.teachers_with_observations) if row.teachers_with_observations else 0
-                })
+            if 'page' not in request.query_params and 'page_size' not in request.query_params:
+                return Response([self.serialize(row) for row in rows])
             
-            return Response(data)
+            try:
+                page_number = max(1, int(request.query_params.get('page', 1)))
+                page_size = int(request.query_params.get('page_size', settings.ENHANCED_SCHOOLS_PAGE_SIZE))
+            except ValueError:
+                return Response({'error': 'page and page_size must be numbers'}, status=400)
+            page_size = max(1, min(page_size, settings.ENHANCED_SCHOOLS_MAX_PAGE_SIZE))
+            offset = (page_number - 1) * page_size
+            total_count = queryset.count()
+            
+            return Response({
+                'data': [self.serialize(row) for row in rows[offset:offset + page_size]],
+                'pagination': {
+                    'page': page_number,
+                    'page_size': page_size,
+                    'total_pages': (total_count + page_size - 1) // page_size,
+                    'total_count': total_count,
+                },
+                'filters': {
+                    'sector': sector,
+                    'emis': emis,
+                }
+            })
             
         except Exception as e:
             print(f"Error fetching enhanced schools data: {e}")
             return Response({'error': str(e)}, status=500)
+    
+    def serialize(self, row):
+        total_teachers = int(row['teacher_count']) if row['teacher_count'] else 0
+        mobile_access = int(row['teachers_with_mobile_access']) if row['teachers_with_mobile_access'] else 0
+        
+        return {
+            'emis': row['emis'],
+            'school_name': row['school_name'],
+            'sector': row['sector'],
+            'teacher_count': total_teachers,
+            'avg_lp_ratio': float(row['avg_lp_ratio']) if row['avg_lp_ratio'] else 0,
+            'wifi_status': row['wifi_status'] or 'Not Available',
+            'wifi_available': row['wifi_status'] == 'Available',
+            'avg_infrastructure_score': float(row['avg_infrastructure_score']) if row['avg_infrastructure_score'] else 0,
+            'teachers_with_mobile_access': mobile_access,
+            'mobile_phone_percentage': round((mobile_access / total_teachers * 100) if total_teachers > 0 else 0, 1),
+            'teachers_with_observations': int(row['teachers_with_observations']) if row['teachers_with_observations'] else 0
+        }
 
 class SchoolTeachersDataView(APIView):
     permission_classes = [IsAuthenticated]
@@ -992,6 +869,11 @@ class SchoolTeachersDataView(APIView):
             return Response({'error': str(e)}, status=500)
 
 class TeacherObservationDataView(APIView):
+    """TEACH tool observations of a school, served from the synced TeacherObservation table.
+
+    Admins may pass ``?live=1`` to query BigQuery directly instead, bypassing
+    the gateway's result cache.
+    """
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
@@ -1006,78 +888,30 @@ class TeacherObservationDataView(APIView):
             if not school_name:
                 return Response({'error': 'School name is required'}, status=400)
             
-            # Initialize BigQuery client
-            client = bigquery.Client()
-            
-            # Query to get teacher observation data
-            query = """
-            SELECT  
-                a.date, 
-                a.user_id, 
-                c.EMIS, 
-                c.Institute as School, 
-                c.Sector,  
-                CAST(supp_learn_envi_supp_learn_envi_score AS FLOAT64) AS supp_learn_envi_score,  
-                CAST(pos_behav_expec_pos_behav_expec_score AS FLOAT64) AS pos_behav_expec_score,  
-                CAST(lesson_facilitation_lesson_facilitation_score AS FLOAT64) AS lesson_facilitation_score,  
-                CAST(cfu_cfu_score AS FLOAT64) AS cfu_score,  
-                CAST(feedback_feedback_score AS FLOAT64) AS feedback_score,  
-                CAST(ct_ct_score AS FLOAT64) AS ct_score,  
-                CAST(autonomy_autonomy_score AS FLOAT64) AS autonomy_score,  
-                CAST(perseverance_perseverance_score AS FLOAT64) AS perseverance_score,  
-                CAST(social_social_score AS FLOAT64) AS social_score,
-                
-                -- Overall average across the 9 indicators
-                ROUND((
-                    CAST(supp_learn_envi_supp_learn_envi_score AS FLOAT64) +  
-                    CAST(pos_behav_expec_pos_behav_expec_score AS FLOAT64) +  
-                    CAST(lesson_facilitation_lesson_facilitation_score AS FLOAT64) +  
-                    CAST(cfu_cfu_score AS FLOAT64) +  
-                    CAST(feedback_feedback_score AS FLOAT64) +  
-                    CAST(ct_ct_score AS FLOAT64) +  
-                    CAST(autonomy_autonomy_score AS FLOAT64) +  
-                    CAST(perseverance_perseverance_score AS FLOAT64) +  
-                    CAST(social_social_score AS FLOAT64)
-                ) / 9.0, 2) AS overall_average_score
-                
-            FROM `tbproddb.TEACH_TOOL_OBSERVATION` a 
-            INNER JOIN `tbproddb.user_school_profiles` b ON a.user_id = b.user_id 
-            INNER JOIN `tbproddb.FDE_Schools` c ON b.emis_1 = c.EMIS
-            WHERE c.Institute = @school_name
-                AND supp_learn_envi_supp_learn_envi_score IS NOT NULL 
-                AND supp_learn_envi_supp_learn_envi_score != ''
-            ORDER BY a.date DESC
-            LIMIT 1000
-            """
-            
-            # Execute query with parameter
-            query_job = client.query(query, job_config=bigquery.QueryJobConfig(
-                query_parameters=[
-                    bigquery.ScalarQueryParameter("school_name", "STRING", school_name),
-                ]
-            ))
-            
-            results = query_job.result()
+            if request.user.is_superuser and request.query_params.get('live') in ('1', 'true'):
+                rows = self.fetch_live(school_name)
+            else:
+                rows = ObservationService.get_observations(school_name)
             
             # Convert results to list of dictionaries
             data = []
-            for row in results:
+            for row in rows:
                 data.append({
-                    'date': row.date.isoformat() if row.date else None,
-                    'user_id': row.user_id,
-                    'emis': row.EMIS,
-                    'school': row.School,
-                    'sector': row.Sector,
-                    'supp_learn_envi_score': float(row.supp_learn_envi_score) if row.supp_learn_envi_score else None,
-                    'pos_behav_expec_score': float(row.pos_behav_expec_score) if row.pos_behav_expec_score else None,
-                    'lesson_facilitation_score': float(row.lesson_facilitation_score) if row.lesson_facilitation_score else None,
-                    'cfu_score': float(row.cfu_score) if row.cfu_score else None,
-                    'feedback_score': float(row.feedback_score) if row.feedback_score else None,
-                    'ct_score': float(row.ct_score) if row.ct_score else None,
-                    'autonomy_score': float(row.autonomy_score) if row.autonomy_score else None,
-                    'perseverance_score': float(row.perseverance_score) if row.perseverance_score else None,
-                    'social_score': float(row.social_score) if row.social_score else None,
-                    'overall_average_score': float(row.overall_average_score) if row.overall_average_score else None
+                    'date': row['date'].isoformat() if row['date'] else None,
+                    'user_id': row['user_id'],
+                    'emis': row['emis'],
+                    'school': row['school'],
+                    'sector': row['sector'],
+                    'supp_learn_envi_score': float(row['supp_learn_envi_score']) if row['supp_learn_envi_score'] else None,
+                    'pos_behav_expec_score': float(row['pos_behav_expec_score']) if row['pos_behav_expec_score'] else None,
+                    'lesson_facilitation_score': float(row['lesson_facilitation_score']) if row['lesson_facilitation_score'] else None,
+                    'cfu_score': float(row['cfu_score']) if row['cfu_score'] else None,
+                    'feedback_score': float(row['feedback_score']) if row['feedback_score'] else None,
+                    'ct_score': float(row['ct_score']) if row['ct_score'] else None,
+                    'autonomy_score': float(row['autonomy_score']) if row['autonomy_score'] else None,
+                    'perseverance_score': float(row['perseverance_score']) if row['perseverance_score'] else None,
+                    'social_score': float(row['social_score']) if row['social_score'] else None,
+                    'overall_average_score': float(row['overall_average_score']) if row['overall_average_score'] else None
                 })
             
             return Response({
@@ -1089,8 +923,66 @@ class TeacherObservationDataView(APIView):
         except Exception as e:
             print(f"Error fetching teacher observation data: {e}")
             return Response({'error': str(e)}, status=500)
+    
+    def fetch_live(self, school_name):
+        """Run the school's observation query directly in BigQuery"""
+        # Query to get teacher observation data
+        query = """
+        SELECT  
+            a.date, 
+            a.user_id, 
+            c.EMIS, 
+            c.Institute as School, 
+            c.Sector,  
+            CAST(supp_learn_envi_supp_learn_envi_score AS FLOAT64) AS supp_learn_envi_score,  
+            CAST(pos_behav_expec_pos_behav_expec_score AS FLOAT64) AS pos_behav_expec_score,  
+            CAST(lesson_facilitation_lesson_facilitation_score AS FLOAT64) AS lesson_facilitation_score,  
+            CAST(cfu_cfu_score AS FLOAT64) AS cfu_score,  
+            CAST(feedback_feedback_score AS FLOAT64) AS feedback_score,  
+            CAST(ct_ct_score AS FLOAT64) AS ct_score,  
+            CAST(autonomy_autonomy_score AS FLOAT64) AS autonomy_score,  
+            CAST(perseverance_perseverance_score AS FLOAT64) AS perseverance_score,  
+            CAST(social_social_score AS FLOAT64) AS social_score,
+        
+            -- Overall average across the 9 indicators
+            ROUND((
+                CAST(supp_learn_envi_supp_learn_envi_score AS FLOAT64) +  
+                CAST(pos_behav_expec_pos_behav_expec_score AS FLOAT64) +  
+                CAST(lesson_facilitation_lesson_facilitation_score AS FLOAT64) +  
+                CAST(cfu_cfu_score AS FLOAT64) +  
+                CAST(feedback_feedback_score AS FLOAT64) +  
+                CAST(ct_ct_score AS FLOAT64) +  
+                CAST(autonomy_autonomy_score AS FLOAT64) +  
+                CAST(perseverance_perseverance_score AS FLOAT64) +  
+                CAST(social_social_score AS FLOAT64)
+            ) / 9.0, 2) AS overall_average_score
+        
+        FROM `tbproddb.TEACH_TOOL_OBSERVATION` a 
+        INNER JOIN `tbproddb.user_school_profiles` b ON a.user_id = b.user_id 
+        INNER JOIN `tbproddb.FDE_Schools` c ON b.emis_1 = c.EMIS
+        WHERE c.Institute = @school_name
+            AND supp_learn_envi_supp_learn_envi_score IS NOT NULL 
+            AND supp_learn_envi_supp_learn_envi_score != ''
+        ORDER BY a.date DESC
+        LIMIT 1000
+        """
+        
+        # Execute query with parameter
+        return [
+            {
+                'date': row.date, 'user_id': row.user_id, 'emis': row.EMIS, 'school': row.School, 'sector': row.Sector,
+                'overall_average_score': row.overall_average_score,
+                **{field: getattr(row, field) for field in ObservationService.SCORE_FIELDS},
+            }
+            for row in bigquery_gateway.query(query, {'school_name': school_name}, ttl=0)
+        ]
 
 class SchoolInfrastructureDataView(APIView):
+    """Infrastructure status of a school from its precomputed SchoolObservationSummary row.
+
+    Admins may pass ``?live=1`` to query BigQuery directly instead, bypassing
+    the gateway's result cache.
+    """
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
@@ -1105,64 +997,18 @@ class SchoolInfrastructureDataView(APIView):
             if not school_name:
                 return Response({'error': 'School name is required'}, status=400)
             
-            # Initialize BigQuery client
-            client = bigquery.Client()
-            
-            # Query to get school infrastructure data including WiFi and mobile phone usage
-            query = """
-            SELECT  
-                c.EMIS, 
-                c.Institute as School, 
-                c.Sector,
-                COUNT(DISTINCT a.user_id) as total_teachers,
-                
-                -- WiFi availability (from teacher observations - supportive learning environment)
-                COUNT(DISTINCT CASE 
-                    WHEN CAST(supp_learn_envi_supp_learn_envi_score AS FLOAT64) >= 4.0 
-                    THEN a.user_id 
-                END) as teachers_with_good_infrastructure,
-                
-                -- Mobile phone usage (estimated from teacher data)
-                COUNT(DISTINCT CASE 
-                    WHEN CAST(supp_learn_envi_supp_learn_envi_score AS FLOAT64) >= 3.5 
-                    THEN a.user_id 
-                END) as teachers_with_mobile_access,
-                
-                -- Average infrastructure score
-                AVG(CAST(supp_learn_envi_supp_learn_envi_score AS FLOAT64)) as avg_infrastructure_score,
-                
-                -- WiFi status based on infrastructure score
-                CASE 
-                    WHEN AVG(CAST(supp_learn_envi_supp_learn_envi_score AS FLOAT64)) >= 4.0 THEN 'Available'
-                    WHEN AVG(CAST(supp_learn_envi_supp_learn_envi_score AS FLOAT64)) >= 3.0 THEN 'Limited'
-                    ELSE 'Not Available'
-                END as wifi_status
-                
-            FROM `tbproddb.TEACH_TOOL_OBSERVATION` a 
-            INNER JOIN `tbproddb.user_school_profiles` b ON a.user_id = b.user_id 
-            INNER JOIN `tbproddb.FDE_Schools` c ON b.emis_1 = c.EMIS
-            WHERE c.Institute = @school_name
-                AND supp_learn_envi_supp_learn_envi_score IS NOT NULL 
-                AND supp_learn_envi_supp_learn_envi_score != ''
-            GROUP BY c.EMIS, c.Institute, c.Sector
-            """
-            
-            # Execute query with parameter
-            query_job = client.query(query, job_config=bigquery.QueryJobConfig(
-                query_parameters=[
-                    bigquery.ScalarQueryParameter("school_name", "STRING", school_name),
-                ]
-            ))
-            
-            results = query_job.result()
+            if request.user.is_superuser and request.query_params.get('live') in ('1', 'true'):
+                row = self.fetch_live(school_name)
+            else:
+                row = ObservationService.get_school_summary(school_name)
             
-            # Convert results to dictionary
+            # Convert result to dictionary
             data = {}
-            for row in results:
+            if row:
                 data = {
-                    'emis': row.EMIS,
-                    'school': row.School,
-                    'sector': row.Sector,
+                    'emis': row.emis,
+                    'school': row.school,
+                    'sector': row.sector,
                     'total_teachers': int(row.total_teachers) if row.total_teachers else 0,
                     'teachers_with_good_infrastructure': int(row.teachers_with_good_infrastructure) if row.teachers_with_good_infrastructure else 0,
                     'teachers_with_mobile_access': int(row.teachers_with_mobile_access) if row.teachers_with_mobile_access else 0,
@@ -1192,17 +1038,68 @@ class SchoolInfrastructureDataView(APIView):
         except Exception as e:
             print(f"Error fetching school infrastructure data: {e}")
             return Response({'error': str(e)}, status=500)
+    
+    def fetch_live(self, school_name):
+        """Run the school's infrastructure query directly in BigQuery; returns the last row or None"""
+        # Query to get school infrastructure data including WiFi and mobile phone usage
+        query = """
+        SELECT  
+            c.EMIS, 
+            c.Institute as School, 
+            c.Sector,
+            COUNT(DISTINCT a.user_id) as total_teachers,
+        
+            -- WiFi availability (from teacher observations - supportive learning environment)
+            COUNT(DISTINCT CASE 
+                WHEN CAST(supp_learn_envi_supp_learn_envi_score AS FLOAT64) >= 4.0 
+                THEN a.user_id 
+            END) as teachers_with_good_infrastructure,
+        
+            -- Mobile phone usage (estimated from teacher data)
+            COUNT(DISTINCT CASE 
+                WHEN CAST(supp_learn_envi_supp_learn_envi_score AS FLOAT64) >= 3.5 
+                THEN a.user_id 
+            END) as teachers_with_mobile_access,
+        
+            -- Average infrastructure score
+            AVG(CAST(supp_learn_envi_supp_learn_envi_score AS FLOAT64)) as avg_infrastructure_score,
+        
+            -- WiFi status based on infrastructure score
+            CASE 
+                WHEN AVG(CAST(supp_learn_envi_supp_learn_envi_score AS FLOAT64)) >= 4.0 THEN 'Available'
+                WHEN AVG(CAST(supp_learn_envi_supp_learn_envi_score AS FLOAT64)) >= 3.0 THEN 'Limited'
+                ELSE 'Not Available'
+            END as wifi_status
+        
+        FROM `tbproddb.TEACH_TOOL_OBSERVATION` a 
+        INNER JOIN `tbproddb.user_school_profiles` b ON a.user_id = b.user_id 
+        INNER JOIN `tbproddb.FDE_Schools` c ON b.emis_1 = c.EMIS
+        WHERE c.Institute = @school_name
+            AND supp_learn_envi_supp_learn_envi_score IS NOT NULL 
+            AND supp_learn_envi_supp_learn_envi_score != ''
+        GROUP BY c.EMIS, c.Institute, c.Sector
+        """
+        
+        # Execute query with parameter
+        summary = None
+        for row in bigquery_gateway.query(query, {'school_name': school_name}, ttl=0):
+            summary = SchoolObservationSummary(
+                emis=row.EMIS,
+                school=row.School,
+                sector=row.Sector,
+                total_teachers=row.total_teachers,
+                teachers_with_good_infrastructure=row.teachers_with_good_infrastructure,
+                teachers_with_mobile_access=row.teachers_with_mobile_access,
+                avg_infrastructure_score=row.avg_infrastructure_score,
+                wifi_status=row.wifi_status,
+            )
+        return summary
 
-# Health check
 class HealthCheckView(APIView):
     permission_classes = [AllowAny]
     
     def get(self, request):
-        """Comprehensive health check endpoint"""
-        import os
-        import psutil
-        from django.conf import settings
-        from django.db import connection
+        """Comprehensive health check endpoint, served from the last background metrics sample"""
         from datetime import datetime
         
         try:
@@ -1215,33 +1112,14 @@ class HealthCheckView(APIView):
                 'debug': settings.DEBUG,
             }
             
-            # Database health check
-            try:
-                with connection.cursor() as cursor:
-                    cursor.execute("SELECT 1")
-                    health_data['database'] = {
-                        'status': 'ok',
-                        'connection': 'active'
-                    }
-            except Exception as e:
-                health_data['database'] = {
-                    'status': 'error',
-                    'error': str(e)
-                }
+            # Database and system resources from the sampler (refreshed every HEALTH_SAMPLE_INTERVAL seconds)
+            sample = metrics_sampler.latest()
+            health_data['database'] = sample['database']
+            health_data['system'] = sample['system']
+            health_data['sampled_at'] = sample['sampled_at']
+            if sample['database'].get('status') != 'ok':
                 health_data['status'] = 'degraded'
             
-            # System resources
-            try:
-                health_data['system'] = {
-                    'cpu_percent': psutil.cpu_percent(interval=1),
-                    'memory_percent': psutil.virtual_memory().percent,
-                    'disk_percent': psutil.disk_usage('/').percent
-                }
-            except Exception as e:
-                health_data['system'] = {
-                    'error': str(e)
-                }
-            
             # CORS configuration check
             try:
                 cors_origins = getattr(settings, 'CORS_ALLOWED_ORIGINS', [])
@@ -1258,6 +1136,8 @@ class HealthCheckView(APIView):
             health_data['endpoints'] = {
                 'auth': '/api/auth/login/',
                 'health': '/api/health/',
+                'liveness': '/api/health/live/',
+                'readiness': '/api/health/ready/',
                 'data': '/api/bigquery/aggregated-data/',
                 'messages': '/api/messages/'
             }
@@ -1271,6 +1151,48 @@ class HealthCheckView(APIView):
                 'timestamp': datetime.now().isoformat()
             }, status=500)
 
+class LivenessView(APIView):
+    """Process liveness probe: no I/O, only proves the worker can serve a request"""
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    throttle_classes = []
+    
+    def get(self, request):
+        return Response({'status': 'ok'})
+
+class ReadinessView(APIView):
+    """Readiness probe: database and channel layer must be reachable; data freshness is reported"""
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    throttle_classes = []
+    
+    def get(self, request):
+        checks = {
+            'database': check_database(),
+            'channel_layer': check_channel_layer(),
+        }
+        ready = all(check['status'] == 'ok' for check in checks.values())
+        
+        # Stale data degrades the response but doesn't pull the instance out of rotation
+        if checks['database']['status'] == 'ok':
+            try:
+                freshness = DataService.check_data_freshness()
+                checks['data_freshness'] = {'status': 'ok' if freshness['all_fresh'] else 'stale', **freshness}
+            except Exception as e:
+                checks['data_freshness'] = {'status': 'error', 'error': str(e)}
+        
+        if not ready:
+            overall = 'unavailable'
+        elif checks.get('data_freshness', {}).get('status') != 'ok':
+            overall = 'degraded'
+        else:
+            overall = 'ok'
+        
+        return Response(
+            {'status': overall, 'checks': checks},
+            status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
 # Data sync management
 class DataSyncStatusView(APIView):
     permission_classes = [IsAuthenticated]
@@ -1283,11 +1205,19 @@ class DataSyncStatusView(APIView):
             
             return Response({
                 'data_freshness': freshness,
+                'snapshot_version': SnapshotService.get_version(),
                 'recent_syncs': [
                     {
                         'sync_type': sync.sync_type,
                         'status': sync.status,
                         'records_processed': sync.records_processed,
+                        'records_inserted': sync.records_inserted,
+                        'records_updated': sync.records_updated,
+                        'records_deleted': sync.records_deleted,
+                        'records_unchanged': sync.records_unchanged,
+                        'bytes_processed': sync.bytes_processed,
+                        'rows_per_second': sync.rows_per_second,
+                        'job_stats': sync.job_stats,
                         'started_at': sync.started_at,
                         'completed_at': sync.completed_at,
                         'error_message': sync.error_message
@@ -1309,14 +1239,16 @@ class TriggerDataSyncView(APIView):
             
             data_type = request.data.get('data_type', 'all')
             force = request.data.get('force', False)
+            mode = request.data.get('mode', 'replace')
             
             # Run the sync command
-            call_command('sync_bigquery_data', data_type=data_type, force=force)
+            call_command('sync_bigquery_data', data_type=data_type, force=force, mode=mode)
             
             return Response({
                 'message': f'Data sync triggered successfully for {data_type}',
                 'data_type': data_type,
-                'force': force
+                'force': force,
+                'mode': mode
             })
         except CommandError as e:
             return Response({'error': str(e)}, status=400)
@@ -1340,64 +1272,12 @@ class CustomLoginView(APIView):
         if username.isdigit() and password == 'pass123' and (role == 'Principal' or role == ''):
             # This might be a principal trying to login with EMIS
             try:
-                # Initialize BigQuery client
-                client = bigquery.Client()
+                # Resolve the EMIS from the synced school directory (no BigQuery round trip)
+                entry = PrincipalDirectoryService.resolve(username)
                 
-                # Query to find principal by EMIS
-                query = """
-                SELECT DISTINCT
-                    e.Institute as school_name,
-                    e.EMIS,
-                    e.Sector,
-                    'Principal' as role,
-                    CONCAT('principal_', LOWER(REPLACE(REPLACE(e.Institute, ' ', '_'), '-', '_'))) as username
-                FROM `tbproddb.FDE_Schools` e
-                WHERE e.EMIS = @emis
-                LIMIT 1
-                """
-                
-                # Execute query with parameter
-                query_job = client.query(query, job_config=bigquery.QueryJobConfig(
-                    query_parameters=[
-                        bigquery.ScalarQueryParameter("emis", "INT64", int(username)),
-                    ]
-                ))
-                
-                results = query_job.result()
-                
-                # Check if we got any results
-                principal_data = None
-                for row in results:
-                    principal_data = {
-                        'id': hash(row.school_name) % 1000000,  # Generate a consistent ID
-                        'username': row.username,
-                        'school_name': row.school_name,
-                        'role': row.role,
-                        'emis': row.EMIS,
-                        'sector': row.Sector
-                    }
-                    break
-                
-                if principal_data:
-                    # Create or get a virtual principal user
-                    try:
-                        # Try to find existing user with this username
-                        user = User.objects.get(username=principal_data['username'])
-                    except User.DoesNotExist:
-                        # Create a new user for this principal
-                        user = User.objects.create_user(
-                            username=principal_data['username'],
-                            password='pass123',  # Set default password
-                            email=f"{principal_data['username']}@school.edu.pk"
-                        )
-                        
-                        # Create user profile
-                        UserProfile.objects.create(
-                            user=user,
-                            role='Principal',
-                            school_name=principal_data['school_name']
-                        )
-                        print(f"Created new principal user: {principal_data['username']}")
+                if entry:
+                    # Principals are pre-provisioned by the directory sync; create one only if it hasn't run since
+                    user = PrincipalDirectoryService.get_or_create_principal(entry)
                     
                     # Generate JWT token
                     refresh = RefreshToken.for_user(user)
@@ -1417,7 +1297,7 @@ class CustomLoginView(APIView):
                     return Response({'error': 'EMIS not found or invalid'}, status=401)
                     
             except Exception as e:
-                print(f"BigQuery EMIS lookup error: {e}")
+                print(f"EMIS lookup error: {e}")
                 return Response({'error': 'Error looking up EMIS'}, status=500)
         
         # Regular authentication for existing users
@@ -1459,11 +1339,8 @@ class UnreadMessageCountView(APIView):
     
     def get(self, request):
         try:
-            # Get unread messages count for the current user
-            unread_count = Message.objects.filter(
-                receiver=request.user,
-                is_read=False
-            ).count()
+            # Single-row lookup of the maintained unread counter
+            unread_count = UnreadCounterService.get_user_unread_count(request.user)
             
             return Response({
                 'unread_count': unread_count
@@ -1504,140 +1381,134 @@ class AEOsBySectorView(APIView):
             return Response({'error': f'Error getting AEOs by sector: {str(e)}'}, status=500)
 
 class AEOSectorSchoolsView(APIView):
+    """Schools in an AEO's sector with WiFi status and teacher activity.
+
+    Served from the synced SchoolActivity table. Admins may pass
+    ``?sector=`` to view any sector and ``?live=1`` to run the original
+    BigQuery join instead, bypassing the gateway's result cache.
+    """
     permission_classes = [IsAuthenticated]
     
+    ACTIVITY_FIELDS = [
+        'emis', 'school_name', 'sector', 'teacher_count', 'avg_lp_ratio', 'active_teachers', 'inactive_teachers',
+        'teachers_with_observations', 'avg_infrastructure_score', 'wifi_status',
+    ]
+    
     def get(self, request):
         """Get schools in AEO's sector with WiFi status and teacher activity"""
         try:
             # Get current user's sector
             user_profile = request.user.userprofile
-            if user_profile.role != 'AEO':
+            is_admin = request.user.is_superuser
+            if user_profile.role != 'AEO' and not is_admin:
                 return Response({'error': 'Access denied. Only AEOs can view sector schools data.'}, status=403)
             
-            sector = user_profile.sector
+            sector = (is_admin and request.query_params.get('sector')) or user_profile.sector
             if not sector:
                 return Response({'error': 'Sector not found in user profile'}, status=400)
             
-            # Initialize BigQuery client
-            client = bigquery.Client()
-            
-            # Query to get schools in AEO's sector with WiFi and teacher activity
-            query = """
-            SELECT  
-                c.EMIS, 
-                c.Institute as school_name, 
-                c.Sector as sector,
-                COUNT(DISTINCT d.user_id) as teacher_count,
-                AVG(LEAST(IFNULL(a.lp_started, 0) / a.max_classes, 1) * 100) as avg_lp_ratio,
-                
-                -- WiFi and infrastructure data from teacher observations
-                COUNT(DISTINCT CASE 
-                    WHEN obs.supp_learn_envi_supp_learn_envi_score IS NOT NULL 
-                    THEN obs.user_id 
-                END) as teachers_with_observations,
-                
-                AVG(CAST(obs.supp_learn_envi_supp_learn_envi_score AS FLOAT64)) as avg_infrastructure_score,
-                
-                -- WiFi status based on infrastructure score
-                CASE 
-                    WHEN AVG(CAST(obs.supp_learn_envi_supp_learn_envi_score AS FLOAT64)) >= 4.0 THEN 'Available'
-                    WHEN AVG(CAST(obs.supp_learn_envi_supp_learn_envi_score AS FLOAT64)) >= 3.0 THEN 'Limited'
-                    ELSE 'Not Available'
-                END as wifi_status,
-                
-                -- Active teachers (those with LP ratio > 10%)
-                COUNT(DISTINCT CASE 
-                    WHEN LEAST(IFNULL(a.lp_started, 0) / a.max_classes, 1) * 100 > 10 
-                    THEN a.user_id 
-                END) as active_teachers,
-                
-                -- Inactive teachers (those with LP ratio <= 10%)
-                COUNT(DISTINCT CASE 
-                    WHEN LEAST(IFNULL(a.lp_started, 0) / a.max_classes, 1) * 100 <= 10 
-                    THEN a.user_id 
-                END) as inactive_teachers
-                
-            FROM `tbproddb.FDE_Schools` c
-            LEFT JOIN `tbproddb.user_school_profiles` d ON c.EMIS = d.emis_1
-            LEFT JOIN `tbproddb.weekly_time_table_NF` a ON d.user_id = a.user_id AND a.max_classes != 0
-            LEFT JOIN `tbproddb.TEACH_TOOL_OBSERVATION` obs ON d.user_id = obs.user_id 
-                AND obs.supp_learn_envi_supp_learn_envi_score IS NOT NULL 
-                AND obs.supp_learn_envi_supp_learn_envi_score != ''
-            WHERE c.Sector = @sector
-            GROUP BY c.EMIS, c.Institute, c.Sector
-            ORDER BY c.Institute
-            """
-            
-            # Set up query parameters
-            job_config = bigquery.QueryJobConfig(
-                query_parameters=[
-                    bigquery.ScalarQueryParameter("sector", "STRING", sector),
-                ]
-            )
+            if is_admin and request.query_params.get('live') in ('1', 'true'):
+                rows = self.fetch_live(sector)
+            else:
+                rows = SchoolActivity.objects.filter(sector=sector).order_by('school_name').values(*self.ACTIVITY_FIELDS)
             
-            query_job = client.query(query, job_config=job_config)
-            results = query_job.result()
+            # School infrastructure data from the shared profile registry
+            school_infrastructure_data = school_profiles.profiles()
             
-            # Load school infrastructure data from JSON file
-            json_file_path = os.path.join(settings.BASE_DIR, '..', 'frontend', 'src', 'components', 'school_profile_data.json')
-            school_infrastructure_data = {}
-            
-            try:
-                with open(json_file_path, 'r', encoding='utf-8') as f:
-                    json_data = json.load(f)
-                    if 'Main Sheet' in json_data:
-                        for item in json_data['Main Sheet']:
-                            emis = item.get("School's EMIS", "")
-                            if emis:
-                                school_infrastructure_data[emis] = {
-                                    'student_teacher_ratio': item.get('Student Teacher Ratio', '1:0'),
-                                    'internet_availability': item.get('Internet', 'No')
-                                }
-            except Exception as e:
-                print(f"Error loading school infrastructure data: {e}")
-            
-            # Convert results to list of dictionaries
-            data = []
-            for row in results:
-                total_teachers = int(row.teacher_count) if row.teacher_count else 0
-                active_teachers = int(row.active_teachers) if row.active_teachers else 0
-                inactive_teachers = int(row.inactive_teachers) if row.inactive_teachers else 0
-                
-                # Calculate activity percentage
-                activity_percentage = round((active_teachers / total_teachers * 100) if total_teachers > 0 else 0, 1)
-                
-                # Determine activity status
-                activity_status = 'Active' if activity_percentage > 10 else 'Inactive'
-                
-                # Get infrastructure data for this school
-                emis_str = str(row.EMIS) if row.EMIS else ""
-                infrastructure_data = school_infrastructure_data.get(emis_str, {})
-                student_teacher_ratio = infrastructure_data.get('student_teacher_ratio', '1:0')
-                internet_availability = infrastructure_data.get('internet_availability', 'No')
-                
-                data.append({
-                    'emis': row.EMIS,
-                    'school_name': row.school_name,
-                    'sector': row.sector,
-                    'teacher_count': total_teachers,
-                    'avg_lp_ratio': float(row.avg_lp_ratio) if row.avg_lp_ratio else 0,
-                    'wifi_status': row.wifi_status or 'Not Available',
-                    'wifi_available': row.wifi_status == 'Available',
-                    'avg_infrastructure_score': float(row.avg_infrastructure_score) if row.avg_infrastructure_score else 0,
-                    'active_teachers': active_teachers,
-                    'inactive_teachers': inactive_teachers,
-                    'activity_percentage': activity_percentage,
-                    'activity_status': activity_status,
-                    'teachers_with_observations': int(row.teachers_with_observations) if row.teachers_with_observations else 0,
-                    'student_teacher_ratio': student_teacher_ratio,
-                    'internet_availability': internet_availability
-                })
-            
-            return Response(data)
+            return Response([self.serialize(row, school_infrastructure_data) for row in rows])
             
         except Exception as e:
             print(f"Error fetching AEO sector schools data: {e}")
             return Response({'error': str(e)}, status=500)
+    
+    def fetch_live(self, sector):
+        """Run the sector's activity join directly in BigQuery"""
+        # Query to get schools in AEO's sector with WiFi and teacher activity
+        query = """
+        SELECT  
+            c.EMIS, 
+            c.Institute as school_name, 
+            c.Sector as sector,
+            COUNT(DISTINCT d.user_id) as teacher_count,
+            AVG(LEAST(IFNULL(a.lp_started, 0) / a.max_classes, 1) * 100) as avg_lp_ratio,
+        
+            -- WiFi and infrastructure data from teacher observations
+            COUNT(DISTINCT CASE 
+                WHEN obs.supp_learn_envi_supp_learn_envi_score IS NOT NULL 
+                THEN obs.user_id 
+            END) as teachers_with_observations,
+        
+            AVG(CAST(obs.supp_learn_envi_supp_learn_envi_score AS FLOAT64)) as avg_infrastructure_score,
+        
+            -- WiFi status based on infrastructure score
+            CASE 
+                WHEN AVG(CAST(obs.supp_learn_envi_supp_learn_envi_score AS FLOAT64)) >= 4.0 THEN 'Available'
+                WHEN AVG(CAST(obs.supp_learn_envi_supp_learn_envi_score AS FLOAT64)) >= 3.0 THEN 'Limited'
+                ELSE 'Not Available'
+            END as wifi_status,
+        
+            -- Active teachers (those with LP ratio > 10%)
+            COUNT(DISTINCT CASE 
+                WHEN LEAST(IFNULL(a.lp_started, 0) / a.max_classes, 1) * 100 > 10 
+                THEN a.user_id 
+            END) as active_teachers,
+        
+            -- Inactive teachers (those with LP ratio <= 10%)
+            COUNT(DISTINCT CASE 
+                WHEN LEAST(IFNULL(a.lp_started, 0) / a.max_classes, 1) * 100 <= 10 
+                THEN a.user_id 
+            END) as inactive_teachers
+        
+        FROM `tbproddb.FDE_Schools` c
+        LEFT JOIN `tbproddb.user_school_profiles` d ON c.EMIS = d.emis_1
+        LEFT JOIN `tbproddb.weekly_time_table_NF` a ON d.user_id = a.user_id AND a.max_classes != 0
+        LEFT JOIN `tbproddb.TEACH_TOOL_OBSERVATION` obs ON d.user_id = obs.user_id 
+            AND obs.supp_learn_envi_supp_learn_envi_score IS NOT NULL 
+            AND obs.supp_learn_envi_supp_learn_envi_score != ''
+        WHERE c.Sector = @sector
+        GROUP BY c.EMIS, c.Institute, c.Sector
+        ORDER BY c.Institute
+        """
+        
+        return [
+            {field: getattr(row, 'EMIS' if field == 'emis' else field) for field in self.ACTIVITY_FIELDS}
+            for row in bigquery_gateway.query(query, {'sector': sector}, ttl=0)
+        ]
+    
+    def serialize(self, row, school_infrastructure_data):
+        total_teachers = int(row['teacher_count']) if row['teacher_count'] else 0
+        active_teachers = int(row['active_teachers']) if row['active_teachers'] else 0
+        inactive_teachers = int(row['inactive_teachers']) if row['inactive_teachers'] else 0
+        
+        # Calculate activity percentage
+        activity_percentage = round((active_teachers / total_teachers * 100) if total_teachers > 0 else 0, 1)
+        
+        # Determine activity status
+        activity_status = 'Active' if activity_percentage > 10 else 'Inactive'
+        
+        # Get infrastructure data for this school
+        emis_str = str(row['emis']) if row['emis'] else ""
+        profile = school_infrastructure_data.get(emis_str)
+        student_teacher_ratio = profile.student_teacher_ratio if profile else '1:0'
+        internet_availability = profile.internet_availability if profile else 'No'
+        
+        return {
+            'emis': row['emis'],
+            'school_name': row['school_name'],
+            'sector': row['sector'],
+            'teacher_count': total_teachers,
+            'avg_lp_ratio': float(row['avg_lp_ratio']) if row['avg_lp_ratio'] else 0,
+            'wifi_status': row['wifi_status'] or 'Not Available',
+            'wifi_available': row['wifi_status'] == 'Available',
+            'avg_infrastructure_score': float(row['avg_infrastructure_score']) if row['avg_infrastructure_score'] else 0,
+            'active_teachers': active_teachers,
+            'inactive_teachers': inactive_teachers,
+            'activity_percentage': activity_percentage,
+            'activity_status': activity_status,
+            'teachers_with_observations': int(row['teachers_with_observations']) if row['teachers_with_observations'] else 0,
+            'student_teacher_ratio': student_teacher_ratio,
+            'internet_availability': internet_availability
+        }
 
 class AdminDashboardView(APIView):
     """Comprehensive admin dashboard with all data and no restrictions"""
@@ -1650,186 +1521,42 @@ class AdminDashboardView(APIView):
             if not request.user.is_superuser:
                 return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
             
-            # Get query parameters for filtering
-            sector = request.GET.get('sector', '')
-            school = request.GET.get('school', '')
-            grade = request.GET.get('grade', '')
-            subject = request.GET.get('subject', '')
-            date_from = request.GET.get('date_from', '')
-            date_to = request.GET.get('date_to', '')
-            sort_by = request.GET.get('sort_by', 'school')
-            sort_order = request.GET.get('sort_order', 'asc')
-            
-            # Base querysets
-            teacher_data = TeacherData.objects.all()
-            aggregated_data = AggregatedData.objects.all()
-            school_data = SchoolData.objects.all()
-            conversations = Conversation.objects.all()
-            messages = Message.objects.all()
-            users = User.objects.all()
-            user_profiles = UserProfile.objects.all()
-            
-            # Apply filters
-            if sector:
-                teacher_data = teacher_data.filter(sector__icontains=sector)
-                aggregated_data = aggregated_data.filter(sector__icontains=sector)
-                school_data = school_data.filter(sector__icontains=sector)
-                user_profiles = user_profiles.filter(sector__icontains=sector)
-            
-            if school:
-                teacher_data = teacher_data.filter(school__icontains=school)
-                aggregated_data = aggregated_data.filter(school__icontains=school)
-                school_data = school_data.filter(school_name__icontains=school)
-                conversations = conversations.filter(school_name__icontains=school)
-                messages = messages.filter(school_name__icontains=school)
-            
-            if grade:
-                teacher_data = teacher_data.filter(grade__icontains=grade)
-            
-            if subject:
-                teacher_data = teacher_data.filter(subject__icontains=subject)
-            
-            if date_from:
-                teacher_data = teacher_data.filter(week_start__gte=date_from)
-                aggregated_data = aggregated_data.filter(period__gte=date_from)
-            
-            if date_to:
-                teacher_data = teacher_data.filter(week_end__lte=date_to)
-                aggregated_data = aggregated_data.filter(period__lte=date_to)
-            
-            # Apply sorting
-            if sort_by == 'school':
-                teacher_data = teacher_data.order_by('school' if sort_order == 'asc' else '-school')
-                aggregated_data = aggregated_data.order_by('school' if sort_order == 'asc' else '-school')
-                school_data = school_data.order_by('school_name' if sort_order == 'asc' else '-school_name')
-            elif sort_by == 'sector':
-                teacher_data = teacher_data.order_by('sector' if sort_order == 'asc' else '-sector')
-                aggregated_data = aggregated_data.order_by('sector' if sort_order == 'asc' else '-sector')
-                school_data = school_data.order_by('sector' if sort_order == 'asc' else '-sector')
-            elif sort_by == 'lp_ratio':
-                teacher_data = teacher_data.order_by('lp_ratio' if sort_order == 'asc' else '-lp_ratio')
-                aggregated_data = aggregated_data.order_by('avg_lp_ratio' if sort_order == 'asc' else '-avg_lp_ratio')
-                school_data = school_data.order_by('avg_lp_ratio' if sort_order == 'asc' else '-avg_lp_ratio')
-            elif sort_by == 'date':
-                teacher_data = teacher_data.order_by('week_start' if sort_order == 'asc' else '-week_start')
-                aggregated_data = aggregated_data.order_by('period' if sort_order == 'asc' else '-period')
-            
-            # Get filter options
-            filter_options = {
-                'sectors': list(FilterOptions.objects.filter(option_type='sectors').values_list('option_value', flat=True)),
-                'schools': list(FilterOptions.objects.filter(option_type='schools').values_list('option_value', flat=True)),
-                'grades': list(FilterOptions.objects.filter(option_type='grades').values_list('option_value', flat=True)),
-                'subjects': list(FilterOptions.objects.filter(option_type='subjects').values_list('option_value', flat=True)),
-            }
-            
-            # Calculate comprehensive statistics
-            # Use UserSchoolProfile for more accurate teacher count
-            teacher_profile_queryset = UserSchoolProfile.objects.all()
-            
-            # Apply filters to teacher profiles
-            if sector:
-                teacher_profile_queryset = teacher_profile_queryset.filter(sector__icontains=sector)
-            if school:
-                teacher_profile_queryset = teacher_profile_queryset.filter(school__icontains=school)
-            
-            stats = {
-                'total_teachers': teacher_profile_queryset.values('user_id').distinct().count(),
-                'total_schools': school_data.count(),
-                'total_conversations': conversations.count(),
-                'total_messages': messages.count(),
-                'total_users': users.count(),
-                'total_aeos': user_profiles.filter(role='AEO').count(),
-                'total_principals': user_profiles.filter(role='Principal').count(),
-                'total_fdes': user_profiles.filter(role='FDE').count(),
-                'avg_lp_ratio': teacher_data.aggregate(avg=models.Avg('lp_ratio'))['avg'] or 0,
-                'total_sectors': teacher_data.values('sector').distinct().count(),
-            }
-            
-            # Get recent activity
-            recent_messages = messages.order_by('-timestamp')[:50]
-            recent_conversations = conversations.order_by('-last_message_at')[:20]
-            
-            # Get sector-wise breakdown
-            sector_stats = []
-            for sector_name in teacher_data.values_list('sector', flat=True).distinct():
-                sector_teachers = teacher_data.filter(sector=sector_name)
-                sector_schools = school_data.filter(sector=sector_name)
-                sector_stats.append({
-                    'sector': sector_name,
-                    'teacher_count': sector_teachers.count(),
-                    'school_count': sector_schools.count(),
-                    'avg_lp_ratio': sector_teachers.aggregate(avg=models.Avg('lp_ratio'))['avg'] or 0,
-                })
-            
-            # Get school-wise breakdown
-            school_stats = []
-            for school_name in teacher_data.values_list('school', flat=True).distinct()[:50]:  # Limit to top 50
-                school_teachers = teacher_data.filter(school=school_name)
-                school_stats.append({
-                    'school': school_name,
-                    'teacher_count': school_teachers.count(),
-                    'avg_lp_ratio': school_teachers.aggregate(avg=models.Avg('lp_ratio'))['avg'] or 0,
-                    'sector': school_teachers.first().sector if school_teachers.exists() else '',
-                })
-            
-            # Get user activity
-            user_activity = []
-            for user in users[:50]:  # Limit to top 50 users
-                sent_messages = messages.filter(sender=user).count()
-                received_messages = messages.filter(receiver=user).count()
-                user_activity.append({
-                    'username': user.username,
-                    'role': user.userprofile.role if hasattr(user, 'userprofile') else 'Unknown',
-                    'sector': user.userprofile.sector if hasattr(user, 'userprofile') else '',
-                    'sent_messages': sent_messages,
-                    'received_messages': received_messages,
-                    'total_messages': sent_messages + received_messages,
-                })
-            
+            filters = AdminDashboardService.normalize_filters(request.GET)
+            snapshot, stale = AdminSnapshotService.get(filters)
             return Response({
-                'stats': stats,
-                'filter_options': filter_options,
-                'sector_stats': sector_stats,
-                'school_stats': school_stats,
-                'user_activity': user_activity,
-                'recent_messages': [
-                    {
-                        'id': msg.id,
-                        'sender': msg.sender.username,
-                        'receiver': msg.receiver.username,
-                        'school_name': msg.school_name,
-                        'message_text': msg.message_text[:100] + '...' if len(msg.message_text) > 100 else msg.message_text,
-                        'timestamp': msg.timestamp,
-                        'is_read': msg.is_read,
-                    } for msg in recent_messages
-                ],
-                'recent_conversations': [
-                    {
-                        'id': conv.id,
-                        'school_name': conv.school_name,
-                        'aeo': conv.aeo.username,
-                        'principal': conv.principal.username if conv.principal else None,
-                        'created_at': conv.created_at,
-                        'last_message_at': conv.last_message_at,
-                    } for conv in recent_conversations
-                ],
-                'applied_filters': {
-                    'sector': sector,
-                    'school': school,
-                    'grade': grade,
-                    'subject': subject,
-                    'date_from': date_from,
-                    'date_to': date_to,
-                    'sort_by': sort_by,
-                    'sort_order': sort_order,
-                }
+                **snapshot['payload'],
+                'snapshot': {
+                    'version': snapshot['version'],
+                    'built_at': snapshot['built_at'],
+                    'stale': stale,
+                },
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class CacheStatsView(APIView):
+    """Per-namespace cache hit/miss counters for admins"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        if not request.user.is_superuser:
+            return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            return Response(get_cache_stats(), status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 class AdminDetailedDataView(APIView):
-    """Get detailed data for admin dashboard with pagination"""
+    """Get detailed data for admin dashboard with pagination.
+
+    Pages by ``page`` number by default; passing ``pagination=cursor`` (or a
+    ``cursor``/``after``/``before`` cursor) switches to keyset pages that stay
+    fast however deep they go. ``match=exact|prefix`` turns the sector/school
+    filters into index-friendly lookups instead of substring scans, and
+    ``count=estimate|none`` avoids counting the whole result set.
+    ``export=csv|ndjson`` streams every matching row as a download instead.
+    """
     permission_classes = [IsAuthenticated]
     
     def get(self, request, data_type):
@@ -1839,156 +1566,80 @@ class AdminDetailedDataView(APIView):
             if not request.user.is_superuser:
                 return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
             
+            if data_type not in AdminDataService.DATA_TYPES:
+                return Response({'error': 'Invalid data type'}, status=status.HTTP_400_BAD_REQUEST)
+            
             # Get query parameters
-            page = int(request.GET.get('page', 1))
-            page_size = int(request.GET.get('page_size', 50))
             sector = request.GET.get('sector', '')
             school = request.GET.get('school', '')
             sort_by = request.GET.get('sort_by', 'id')
             sort_order = request.GET.get('sort_order', 'desc')
+            match = request.GET.get('match', 'contains')
+            count_mode = request.GET.get('count', 'exact')
+            
+            queryset = AdminDataService.get_queryset(data_type, {'sector': sector, 'school': school}, match)
+            paginator = KeysetPagination(
+                AdminDataService.sort_field(data_type, sort_by),
+                descending=sort_order != 'asc',
+                default_page_size=50,
+                max_page_size=getattr(settings, 'ADMIN_DATA_MAX_PAGE_SIZE', 200),
+            )
             
-            # Calculate offset
-            offset = (page - 1) * page_size
+            export_format = request.GET.get('export')
+            if export_format:
+                try:
+                    return stream_export(
+                        paginator.order(queryset),
+                        AdminDataService.export_columns(data_type),
+                        export_format=export_format,
+                        filename=f'admin_{data_type}',
+                    )
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
             
-            if data_type == 'teachers':
-                queryset = TeacherData.objects.all()
-                if sector:
-                    queryset = queryset.filter(sector__icontains=sector)
-                if school:
-                    queryset = queryset.filter(school__icontains=school)
-                
-                # Apply sorting
-                if sort_by == 'school':
-                    queryset = queryset.order_by('school' if sort_order == 'asc' else '-school')
-                elif sort_by == 'sector':
-                    queryset = queryset.order_by('sector' if sort_order == 'asc' else '-sector')
-                elif sort_by == 'lp_ratio':
-                    queryset = queryset.order_by('lp_ratio' if sort_order == 'asc' else '-lp_ratio')
-                elif sort_by == 'date':
-                    queryset = queryset.order_by('week_start' if sort_order == 'asc' else '-week_start')
-                else:
-                    queryset = queryset.order_by('id' if sort_order == 'asc' else '-id')
-                
-                total_count = queryset.count()
-                data = list(queryset[offset:offset + page_size].values())
-                
-            elif data_type == 'schools':
-                queryset = SchoolData.objects.all()
-                if sector:
-                    queryset = queryset.filter(sector__icontains=sector)
-                if school:
-                    queryset = queryset.filter(school_name__icontains=school)
-                
-                # Apply sorting
-                if sort_by == 'school':
-                    queryset = queryset.order_by('school_name' if sort_order == 'asc' else '-school_name')
-                elif sort_by == 'sector':
-                    queryset = queryset.order_by('sector' if sort_order == 'asc' else '-sector')
-                elif sort_by == 'lp_ratio':
-                    queryset = queryset.order_by('avg_lp_ratio' if sort_order == 'asc' else '-avg_lp_ratio')
-                else:
-                    queryset = queryset.order_by('id' if sort_order == 'asc' else '-id')
-                
-                total_count = queryset.count()
-                data = list(queryset[offset:offset + page_size].values())
-                
-            elif data_type == 'conversations':
-                queryset = Conversation.objects.select_related('aeo', 'principal').all()
-                if school:
-                    queryset = queryset.filter(school_name__icontains=school)
-                
-                # Apply sorting
-                if sort_by == 'school':
-                    queryset = queryset.order_by('school_name' if sort_order == 'asc' else '-school_name')
-                elif sort_by == 'date':
-                    queryset = queryset.order_by('created_at' if sort_order == 'asc' else '-created_at')
-                else:
-                    queryset = queryset.order_by('id' if sort_order == 'asc' else '-id')
-                
-                total_count = queryset.count()
-                data = []
-                for conv in queryset[offset:offset + page_size]:
-                    data.append({
-                        'id': conv.id,
-                        'school_name': conv.school_name,
-                        'aeo': conv.aeo.username,
-                        'principal': conv.principal.username if conv.principal else None,
-                        'created_at': conv.created_at,
-                        'last_message_at': conv.last_message_at,
-                    })
-                
-            elif data_type == 'messages':
-                queryset = Message.objects.select_related('sender', 'receiver').all()
-                if school:
-                    queryset = queryset.filter(school_name__icontains=school)
-                
-                # Apply sorting
-                if sort_by == 'school':
-                    queryset = queryset.order_by('school_name' if sort_order == 'asc' else '-school_name')
-                elif sort_by == 'date':
-                    queryset = queryset.order_by('timestamp' if sort_order == 'asc' else '-timestamp')
-                else:
-                    queryset = queryset.order_by('id' if sort_order == 'asc' else '-id')
-                
-                total_count = queryset.count()
-                data = []
-                for msg in queryset[offset:offset + page_size]:
-                    data.append({
-                        'id': msg.id,
-                        'sender': msg.sender.username,
-                        'receiver': msg.receiver.username,
-                        'school_name': msg.school_name,
-                        'message_text': msg.message_text,
-                        'timestamp': msg.timestamp,
-                        'is_read': msg.is_read,
-                    })
-                
-            elif data_type == 'users':
-                queryset = User.objects.select_related('userprofile').all()
-                if sector:
-                    queryset = queryset.filter(userprofile__sector__icontains=sector)
-                
-                # Apply sorting
-                if sort_by == 'username':
-                    queryset = queryset.order_by('username' if sort_order == 'asc' else '-username')
-                elif sort_by == 'date_joined':
-                    queryset = queryset.order_by('date_joined' if sort_order == 'asc' else '-date_joined')
-                else:
-                    queryset = queryset.order_by('id' if sort_order == 'asc' else '-id')
-                
+            page_size = paginator.get_page_size(request)
+            
+            if count_mode == 'none':
+                total_count = None
+            elif count_mode == 'estimate':
+                total_count = estimate_count(queryset, getattr(settings, 'ADMIN_DATA_COUNT_ESTIMATE_LIMIT', 10000))
+            else:
+                count_mode = 'exact'
                 total_count = queryset.count()
-                data = []
-                for user in queryset[offset:offset + page_size]:
-                    data.append({
-                        'id': user.id,
-                        'username': user.username,
-                        'email': user.email,
-                        'role': user.userprofile.role if hasattr(user, 'userprofile') else 'Unknown',
-                        'sector': user.userprofile.sector if hasattr(user, 'userprofile') else '',
-                        'school_name': user.userprofile.school_name if hasattr(user, 'userprofile') else '',
-                        'date_joined': user.date_joined,
-                        'last_login': user.last_login,
-                        'is_active': user.is_active,
-                        'is_staff': user.is_staff,
-                        'is_superuser': user.is_superuser,
-                    })
-                
+            
+            rows = AdminDataService.get_rows(data_type, queryset)
+            if request.GET.get('pagination') == 'cursor' or any(p in request.GET for p in ('cursor', 'after', 'before')):
+                try:
+                    page = paginator.paginate(rows, request)
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                data = AdminDataService.rename(data_type, page['results'])
+                pagination = {
+                    'page_size': page_size,
+                    'has_more': page['has_more'],
+                    'next_cursor': page['after_cursor'],
+                    'previous_cursor': page['before_cursor'],
+                }
             else:
-                return Response({'error': 'Invalid data type'}, status=status.HTTP_400_BAD_REQUEST)
+                page_number = max(1, int(request.GET.get('page', 1)))
+                offset = (page_number - 1) * page_size
+                data = AdminDataService.rename(data_type, paginator.order(rows)[offset:offset + page_size])
+                pagination = {
+                    'page': page_number,
+                    'page_size': page_size,
+                    'total_pages': (total_count + page_size - 1) // page_size if total_count is not None else None,
+                }
+            pagination.update({'total_count': total_count, 'count_mode': count_mode})
             
             return Response({
                 'data': data,
-                'pagination': {
-                    'page': page,
-                    'page_size': page_size,
-                    'total_count': total_count,
-                    'total_pages': (total_count + page_size - 1) // page_size,
-                },
+                'pagination': pagination,
                 'filters': {
                     'sector': sector,
                     'school': school,
                     'sort_by': sort_by,
                     'sort_order': sort_order,
+                    'match': match,
                 }
             }, status=status.HTTP_200_OK)
             
@@ -1998,53 +1649,21 @@ class AdminDetailedDataView(APIView):
 
 # Admin Messaging
 class LessonPlanUsageDistributionView(APIView):
-    """Get lesson plan usage distribution by sector"""
+    """Get lesson plan usage distribution by sector, school (?group_by=school) or period (?group_by=period)"""
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        try:
-            # Calculate lesson plan usage distribution by sector
-            sector_distribution = {}
-            total_usage = 0
-            
-            # Get all sectors
-            sectors = SchoolData.objects.values_list('sector', flat=True).distinct()
-            
-            for sector in sectors:
-                # Get all schools in this sector
-                sector_schools = SchoolData.objects.filter(sector=sector)
-                
-                # Calculate total lesson plan usage for this sector
-                sector_usage = 0
-                for school in sector_schools:
-                    # Multiply avg_lp_ratio by teacher_count to get weighted usage
-                    school_usage = (school.avg_lp_ratio or 0) * (school.teacher_count or 0)
-                    sector_usage += school_usage
-                
-                sector_distribution[sector] = sector_usage
-                total_usage += sector_usage
-            
-            # Convert to percentages
-            if total_usage > 0:
-                for sector in sector_distribution:
-                    sector_distribution[sector] = (sector_distribution[sector] / total_usage) * 100
-            
-            # Format the response
-            distribution_data = []
-            for sector, percentage in sector_distribution.items():
-                distribution_data.append({
-                    'sector': sector,
-                    'percentage': round(percentage, 1),
-                    'usage': sector_distribution[sector]
-                })
-            
-            # Sort by percentage descending
-            distribution_data.sort(key=lambda x: x['percentage'], reverse=True)
-            
+        group_by = request.query_params.get('group_by', 'sector')
+        period_type = request.query_params.get('period_type', 'weekly')
+        if group_by not in SummaryStatsService.USAGE_GROUPS:
             return Response({
-                'distribution': distribution_data,
-                'total_usage': total_usage
-            }, status=status.HTTP_200_OK)
+                'error': f"group_by must be one of: {', '.join(SummaryStatsService.USAGE_GROUPS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            # Weighted usage (avg_lp_ratio * teacher_count) in one grouped query, cached per data snapshot
+            data = BigQueryCache.get_usage_distribution(SnapshotService.get_version(), group_by, period_type)
+            return Response(data, status=status.HTTP_200_OK)
             
         except Exception as e:
             return Response({'error': f'Error calculating distribution: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -2087,9 +1706,6 @@ class AdminMessageCreateView(APIView):
                 
                 # Try to get AEO info from BigQuery or create a virtual user
                 try:
-                    # Initialize BigQuery client
-                    client = bigquery.Client()
-                    
                     # Query to get all AEOs and find the one with matching ID
                     query = """
                     SELECT DISTINCT
@@ -2101,8 +1717,7 @@ class AdminMessageCreateView(APIView):
                     ORDER BY e.Sector
                     """
                     
-                    query_job = client.query(query)
-                    results = list(query_job.result())
+                    results = bigquery_gateway.query(query)
                     
                     # Find AEO with matching hash ID
                     for row in results:
@@ -2169,32 +1784,36 @@ class AdminMessageCreateView(APIView):
             if created:
                 print(f"Created admin conversation: {conversation.id}")
             
-            # Create the message
-            if receiver:
-                # User exists in local database
-                message = Message.objects.create(
-                    id=str(uuid4()),
-                    conversation=conversation,
-                    sender=sender,
-                    receiver=receiver,
-                    school_name=receiver_school,
-                    message_text=message_text
-                )
-            else:
-                # User doesn't exist in local database - create message with sender as receiver
-                # This is a workaround to store the message
-                message = Message.objects.create(
-                    id=str(uuid4()),
-                    conversation=conversation,
-                    sender=sender,
-                    receiver=sender,  # Workaround: use sender as receiver
-                    school_name=receiver_school,
-                    message_text=message_text
-                )
-            
-            # Update the conversation's last_message_at
-            conversation.last_message_at = timezone.now()
-            conversation.save()
+            with transaction.atomic():
+                # Create the message
+                if receiver:
+                    # User exists in local database
+                    message = Message.objects.create(
+                        id=str(uuid4()),
+                        conversation=conversation,
+                        sender=sender,
+                        receiver=receiver,
+                        school_name=receiver_school,
+                        message_text=message_text
+                    )
+                else:
+                    # User doesn't exist in local database - create message with sender as receiver
+                    # This is a workaround to store the message
+                    message = Message.objects.create(
+                        id=str(uuid4()),
+                        conversation=conversation,
+                        sender=sender,
+                        receiver=sender,  # Workaround: use sender as receiver
+                        school_name=receiver_school,
+                        message_text=message_text
+                    )
+                UnreadCounterService.record_new_message(message)
+                NotificationService.message_created(message)
+                transaction.on_commit(AdminSnapshotService.messages_changed)
+                
+                # Update the conversation's last_message_at
+                conversation.last_message_at = timezone.now()
+                conversation.save()
             
             serializer = MessageSerializer(message)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -2208,63 +1827,32 @@ class SchoolsWithInfrastructureDataView(APIView):
     
     def get(self, request):
         try:
-            user = request.user
-            user_profile = user.userprofile
-            
             # Get filter parameters
             sector_filter = request.query_params.get('sector', '')
             
-            # Build query for school data
-            queryset = SchoolData.objects.all()
-            
-            # Apply filters based on user role
-            if user_profile.role == 'AEO' and user_profile.sector:
-                queryset = queryset.filter(sector=user_profile.sector)
-            elif user_profile.role == 'Principal' and user_profile.school_name:
-                queryset = queryset.filter(school_name=user_profile.school_name)
+            # Build query for school data, scoped to the user's role
+            queryset = get_scope(request).school_data()
             
             # Apply additional filters
             if sector_filter:
                 queryset = queryset.filter(sector=sector_filter)
             
             # Order by school name
-            queryset = queryset.order_by('school_name')
+            queryset = queryset.order_by('school_name').values('emis', 'school_name', 'sector', 'teacher_count', 'avg_lp_ratio')
             
-            # Load JSON data for internet and student-teacher ratio
-            json_data = {}
-            try:
-                json_file_path = os.path.join(settings.BASE_DIR, '..', 'frontend', 'src', 'components', 'school_profile_data.json')
-                with open(json_file_path, 'r', encoding='utf-8') as f:
-                    json_data = json.load(f)
-            except Exception as e:
-                print(f"Error loading JSON data: {e}")
-                json_data = {"Main Sheet": []}
-            
-            # Create a lookup dictionary for JSON data
-            json_lookup = {}
-            for item in json_data.get("Main Sheet", []):
-                emis = item.get("School's EMIS")
-                if emis:
-                    json_lookup[emis] = {
-                        'internet_availability': item.get("Internet", "N/A"),
-                        'student_teacher_ratio': item.get("Student Teacher Ratio", "N/A")
-                    }
+            # Internet and student-teacher ratio from the shared profile registry
+            profiles = school_profiles.profiles()
             
             # Convert to list of dictionaries with additional data
             data = []
             for item in queryset:
-                # Get JSON data for this school
-                json_info = json_lookup.get(item.emis, {})
+                profile = profiles.get(item['emis'])
                 
                 data.append({
-                    'emis': item.emis,
-                    'school_name': item.school_name,
-                    'sector': item.sector,
-                    'teacher_count': item.teacher_count,
-                    'avg_lp_ratio': item.avg_lp_ratio,
-                    'internet_availability': json_info.get('internet_availability', 'N/A'),
-                    'student_teacher_ratio': json_info.get('student_teacher_ratio', 'N/A'),
-                    'activity_status': 'Active' if (item.avg_lp_ratio or 0) >= 10.0 and (item.teacher_count or 0) > 0 else 'Inactive'
+                    **item,
+                    'internet_availability': profile.internet_availability if profile else 'N/A',
+                    'student_teacher_ratio': profile.student_teacher_ratio if profile else 'N/A',
+                    'activity_status': 'Active' if (item['avg_lp_ratio'] or 0) >= 10.0 and (item['teacher_count'] or 0) > 0 else 'Inactive'
                 })
             
             return Response(data)
@@ -2350,65 +1938,11 @@ class PasswordResetRequestView(APIView):
                 # For principals, try to find by EMIS number
                 if username.isdigit() and role == 'Principal':
                     try:
-                        # Initialize BigQuery client
-                        client = bigquery.Client()
-                        
-                        # Query to find principal by EMIS
-                        query = """
-                        SELECT DISTINCT
-                            e.Institute as school_name,
-                            e.EMIS,
-                            e.Sector,
-                            'Principal' as role,
-                            CONCAT('principal_', LOWER(REPLACE(REPLACE(e.Institute, ' ', '_'), '-', '_'))) as username
-                        FROM `tbproddb.FDE_Schools` e
-                        WHERE e.EMIS = @emis
-                        LIMIT 1
-                        """
-                        
-                        # Execute query with parameter
-                        query_job = client.query(query, job_config=bigquery.QueryJobConfig(
-                            query_parameters=[
-                                bigquery.ScalarQueryParameter("emis", "INT64", int(username)),
-                            ]
-                        ))
-                        
-                        results = query_job.result()
-                        
-                        # Check if we got any results
-                        principal_data = None
-                        for row in results:
-                            principal_data = {
-                                'username': row.username,
-                                'school_name': row.school_name,
-                                'role': row.role,
-                                'emis': row.EMIS,
-                                'sector': row.Sector
-                            }
-                            break
+                        # Resolve the EMIS from the synced school directory
+                        entry = PrincipalDirectoryService.resolve(username)
                         
-                        if principal_data:
-                            # Create or get the principal user
-                            try:
-                                user = User.objects.get(username=principal_data['username'])
-                            except User.DoesNotExist:
-                                # Create a new user for this principal
-                                user = User.objects.create_user(
-                                    username=principal_data['username'],
-                                    password='pass123',  # Set default password
-                                    email=f"{principal_data['username']}@school.edu.pk"
-                                )
-                                
-                                # Create user profile
-                                UserProfile.objects.create(
-                                    user=user,
-                                    role='Principal',
-                                    school_name=principal_data['school_name']
-                                )
-                            else:
-                                return Response({
-                                    'error': 'User not found'
-                                }, status=status.HTTP_404_NOT_FOUND)
+                        if entry:
+                            user = PrincipalDirectoryService.get_or_create_principal(entry)
                         else:
                             return Response({
                                 'error': 'User not found'
@@ -2651,7 +2185,9 @@ class UserLoginTimestampView(APIView):
             date_from = request.GET.get('date_from', '')
             date_to = request.GET.get('date_to', '')
             user_id = request.GET.get('user_id', '')
-            export_csv = request.GET.get('export_csv', 'false').lower() == 'true'
+            export_format = request.GET.get('export') or (
+                'csv' if request.GET.get('export_csv', 'false').lower() == 'true' else None
+            )
             
             # Base queryset
             queryset = UserLoginTimestamp.objects.all()
@@ -2672,6 +2208,20 @@ class UserLoginTimestampView(APIView):
             # Order by most recent first
             queryset = queryset.order_by('-created_at')
             
+            # Stream exports straight from the database, skipping the page
+            if export_format:
+                try:
+                    return stream_export(
+                        queryset,
+                        [('user_id', 'user_id'), ('username', 'username'), ('date', 'date'),
+                         ('time', 'time'), ('created_at', 'created_at')],
+                        export_format=export_format,
+                        filename='login_timestamps',
+                        headers=['User ID', 'Username', 'Date', 'Time', 'Created At'],
+                    )
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            
             # Get pagination parameters
             page = int(request.GET.get('page', 1))
             page_size = int(request.GET.get('page_size', 50))
@@ -2707,31 +2257,6 @@ class UserLoginTimestampView(APIView):
                 }
             }
             
-            # Handle CSV export
-            if export_csv:
-                import csv
-                from django.http import HttpResponse
-                from io import StringIO
-                
-                # Create CSV response
-                response = HttpResponse(content_type='text/csv')
-                response['Content-Disposition'] = f'attachment; filename="login_timestamps_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-                
-                # Write CSV data
-                writer = csv.writer(response)
-                writer.writerow(['User ID', 'Username', 'Date', 'Time', 'Created At'])
-                
-                for record in queryset:
-                    writer.writerow([
-                        record.user_id,
-                        record.username,
-                        record.date,
-                        record.time,
-                        record.created_at
-                    ])
-                
-                return response
-            
             return Response(response_data, status=status.HTTP_200_OK)
             
         except Exception as e:
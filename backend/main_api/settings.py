@@ -89,16 +89,104 @@ TEMPLATES = [
 WSGI_APPLICATION = 'main_api.wsgi.application'
 ASGI_APPLICATION = 'main_api.asgi.application'
 
+# Redis server shared by the channel layer and the cache
+REDIS_HOST = os.getenv('REDIS_HOST', '127.0.0.1')
+REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
+
 # Channel Layers for WebSocket
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels_redis.core.RedisChannelLayer',
         'CONFIG': {
-            "hosts": [('127.0.0.1', 6379)],
+            "hosts": [(REDIS_HOST, REDIS_PORT)],
         },
     },
 }
 
+# Cache: Redis (shared by every worker) unless CACHE_BACKEND=locmem; development
+# defaults to the per-process LocMem cache so it runs without Redis
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem' if DEBUG else 'redis')
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': f"redis://{REDIS_HOST}:{REDIS_PORT}/{os.getenv('REDIS_CACHE_DB', '1')}",
+            'KEY_PREFIX': 'main_dashboard',
+            'TIMEOUT': 300,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'main-dashboard',
+        },
+    }
+# Stampede protection: how long a recompute holds its lock, and how long other
+# requests wait for its result before computing themselves (seconds)
+CACHE_LOCK_TIMEOUT = int(os.getenv('CACHE_LOCK_TIMEOUT', '30'))
+CACHE_LOCK_WAIT = int(os.getenv('CACHE_LOCK_WAIT', '5'))
+
+# Message history pagination (cursor pages for conversation message lists)
+MESSAGE_HISTORY_PAGE_SIZE = int(os.getenv('MESSAGE_HISTORY_PAGE_SIZE', '50'))
+MESSAGE_HISTORY_MAX_PAGE_SIZE = int(os.getenv('MESSAGE_HISTORY_MAX_PAGE_SIZE', '200'))
+
+# School infrastructure survey export (internet availability, student-teacher ratio)
+SCHOOL_PROFILE_DATA_PATH = os.getenv(
+    'SCHOOL_PROFILE_DATA_PATH',
+    os.path.join(BASE_DIR, '..', 'frontend', 'src', 'components', 'school_profile_data.json')
+)
+
+# TEACH tool observation scores export, loaded by import_teacher_observations
+TEACH_TOOL_SCORES_PATH = os.getenv(
+    'TEACH_TOOL_SCORES_PATH',
+    os.path.join(BASE_DIR, '..', 'frontend', 'teach_tool_scores.csv')
+)
+
+# Health checks: background metrics sampling interval and probe timeout (seconds)
+HEALTH_SAMPLE_INTERVAL = int(os.getenv('HEALTH_SAMPLE_INTERVAL', '15'))
+HEALTH_CHECK_TIMEOUT = int(os.getenv('HEALTH_CHECK_TIMEOUT', '2'))
+
+# BigQuery sync: jobs allowed in flight at once (1 runs them one after another)
+BIGQUERY_SYNC_MAX_CONCURRENCY = int(os.getenv('BIGQUERY_SYNC_MAX_CONCURRENCY', '4'))
+# Rows paged from BigQuery and written per batch; bounds sync memory use
+BIGQUERY_SYNC_CHUNK_SIZE = int(os.getenv('BIGQUERY_SYNC_CHUNK_SIZE', '1000'))
+
+# Live BigQuery queries from views: result cache lifetime (seconds, 0 disables) and
+# backend ('google', or 'fake' to answer every query with no rows, e.g. without credentials)
+BIGQUERY_RESULT_CACHE_TTL = int(os.getenv('BIGQUERY_RESULT_CACHE_TTL', '300'))
+BIGQUERY_BACKEND = os.getenv('BIGQUERY_BACKEND', 'google')
+
+# Admin dashboard snapshots: cache lifetime and rebuild lock timeout (seconds);
+# stale snapshots are served while a background thread rebuilds them
+ADMIN_SNAPSHOT_TTL = int(os.getenv('ADMIN_SNAPSHOT_TTL', '86400'))
+ADMIN_SNAPSHOT_LOCK_TIMEOUT = int(os.getenv('ADMIN_SNAPSHOT_LOCK_TIMEOUT', '120'))
+ADMIN_SNAPSHOT_ASYNC_REFRESH = os.getenv('ADMIN_SNAPSHOT_ASYNC_REFRESH', 'True').lower() == 'true'
+
+# Admin detailed data tables: largest page a client may request, and the row
+# cap for count=estimate on databases without planner estimates
+ADMIN_DATA_MAX_PAGE_SIZE = int(os.getenv('ADMIN_DATA_MAX_PAGE_SIZE', '200'))
+ADMIN_DATA_COUNT_ESTIMATE_LIMIT = int(os.getenv('ADMIN_DATA_COUNT_ESTIMATE_LIMIT', '10000'))
+
+# Enhanced schools list: default and largest page for page/page_size requests
+ENHANCED_SCHOOLS_PAGE_SIZE = int(os.getenv('ENHANCED_SCHOOLS_PAGE_SIZE', '50'))
+ENHANCED_SCHOOLS_MAX_PAGE_SIZE = int(os.getenv('ENHANCED_SCHOOLS_MAX_PAGE_SIZE', '500'))
+
+# Streaming CSV/NDJSON exports: rows fetched from the database per chunk
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+
+# Per-scope response cache for the /bigquery/* local endpoints (seconds); entries
+# are keyed by data snapshot version, so syncs invalidate them
+SCOPED_RESPONSE_CACHE_TTL = int(os.getenv('SCOPED_RESPONSE_CACHE_TTL', '3600'))
+
+# LP ratio performance bands as (name, lower bound) from best to worst; the
+# last band takes every lower value
+LP_PERFORMANCE_BANDS = [
+    ('excellent', float(os.getenv('LP_BAND_EXCELLENT_MIN', '80'))),
+    ('good', float(os.getenv('LP_BAND_GOOD_MIN', '60'))),
+    ('needs_improvement', None),
+]
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
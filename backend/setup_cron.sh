@@ -12,6 +12,8 @@ CRON_FILE="/tmp/bigquery_sync_cron"
 # Create the cron job entry
 echo "# BigQuery data sync every 2 hours" > $CRON_FILE
 echo "0 */2 * * * cd $PROJECT_DIR && python $MANAGE_PY sync_bigquery_data --data-type=all >> $PROJECT_DIR/logs/cron.log 2>&1" >> $CRON_FILE
+echo "# Prune notification events outside the websocket resume window" >> $CRON_FILE
+echo "30 3 * * * cd $PROJECT_DIR && python $MANAGE_PY prune_notification_events >> $PROJECT_DIR/logs/cron.log 2>&1" >> $CRON_FILE
 
 # Install the cron job
 crontab $CRON_FILE
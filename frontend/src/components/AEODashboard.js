@@ -13,6 +13,7 @@ import { Bar } from 'react-chartjs-2';
 import { apiService } from '../services/api';
 import MessagingModal from './MessagingModal';
 import MessagingSidebar from './MessagingSidebar';
+import getWebSocketService from '../services/websocket';
 import PasswordChangeModal from './PasswordChangeModal';
 import styles from './AEODashboard.module.css';
 import { 
@@ -88,13 +89,27 @@ const AEODashboard = ({ onLogout }) => {
     loadUnreadMessageCount();
   }, []);
 
-  // Periodically update unread count to ensure real-time updates
+  // Unread count is pushed over the notification WebSocket; poll only while it is down
   useEffect(() => {
-    const unreadCountInterval = setInterval(() => {
+    const websocketService = getWebSocketService();
+    const unsubscribeUnreadCount = websocketService.onEvent('unread_count_changed', (data) => {
+      setUnreadMessageCount(data.unread_count || 0);
+    });
+    const unsubscribeResync = websocketService.onEvent('resync_required', () => {
       loadUnreadMessageCount();
-    }, 2000); // Update every 2 seconds for instant message indicators
+    });
+
+    const fallbackInterval = setInterval(() => {
+      if (!websocketService.isConnected('notification')) {
+        loadUnreadMessageCount();
+      }
+    }, 30000);
 
-    return () => clearInterval(unreadCountInterval);
+    return () => {
+      unsubscribeUnreadCount();
+      unsubscribeResync();
+      clearInterval(fallbackInterval);
+    };
   }, [loadUnreadMessageCount]);
 
   const loadData = async () => {
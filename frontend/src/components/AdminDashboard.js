@@ -6,6 +6,7 @@ import { apiService } from '../services/api';
 import styles from './AdminDashboard.module.css';
 import AdminMessagingModal from './AdminMessagingModal';
 import MessagingSidebar from './MessagingSidebar';
+import getWebSocketService from '../services/websocket';
 import PasswordChangeModal from './PasswordChangeModal';
 import { 
   IoBarChartOutline,
@@ -156,13 +157,27 @@ const AdminDashboard = ({ onLogout }) => {
     }
   };
 
-  // Periodically update unread count to ensure real-time updates
+  // Unread count is pushed over the notification WebSocket; poll only while it is down
   useEffect(() => {
-    const unreadCountInterval = setInterval(() => {
+    const websocketService = getWebSocketService();
+    const unsubscribeUnreadCount = websocketService.onEvent('unread_count_changed', (data) => {
+      setUnreadMessageCount(data.unread_count || 0);
+    });
+    const unsubscribeResync = websocketService.onEvent('resync_required', () => {
       loadUnreadMessageCount();
-    }, 2000); // Update every 2 seconds for instant message indicators
+    });
 
-    return () => clearInterval(unreadCountInterval);
+    const fallbackInterval = setInterval(() => {
+      if (!websocketService.isConnected('notification')) {
+        loadUnreadMessageCount();
+      }
+    }, 30000);
+
+    return () => {
+      unsubscribeUnreadCount();
+      unsubscribeResync();
+      clearInterval(fallbackInterval);
+    };
   }, [loadUnreadMessageCount]);
 
 
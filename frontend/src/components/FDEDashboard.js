@@ -5,6 +5,7 @@ import {
 import { apiService } from '../services/api';
 import MessagingModal from './MessagingModal';
 import MessagingSidebar from './MessagingSidebar';
+import getWebSocketService from '../services/websocket';
 import PasswordChangeModal from './PasswordChangeModal';
 import styles from './FDEDashboard.module.css';
 import { 
@@ -188,13 +189,27 @@ const FDEDashboard = ({ onLogout }) => {
     setUser(currentUser);
   }, [loadData, loadAEOData, loadUnreadMessageCount]);
 
-  // Periodically update unread count to ensure real-time updates
+  // Unread count is pushed over the notification WebSocket; poll only while it is down
   useEffect(() => {
-    const unreadCountInterval = setInterval(() => {
+    const websocketService = getWebSocketService();
+    const unsubscribeUnreadCount = websocketService.onEvent('unread_count_changed', (data) => {
+      setUnreadMessageCount(data.unread_count || 0);
+    });
+    const unsubscribeResync = websocketService.onEvent('resync_required', () => {
       loadUnreadMessageCount();
-    }, 2000); // Update every 2 seconds for instant message indicators
+    });
 
-    return () => clearInterval(unreadCountInterval);
+    const fallbackInterval = setInterval(() => {
+      if (!websocketService.isConnected('notification')) {
+        loadUnreadMessageCount();
+      }
+    }, 30000);
+
+    return () => {
+      unsubscribeUnreadCount();
+      unsubscribeResync();
+      clearInterval(fallbackInterval);
+    };
   }, [loadUnreadMessageCount]);
 
   // Prepare sector distribution for PieChart - use lesson plan usage distribution
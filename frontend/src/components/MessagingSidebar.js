@@ -15,6 +15,9 @@ import {
   IoMailOutline,
 } from 'react-icons/io5';
 
+// Latest messages fetched when a conversation is opened
+const MESSAGE_PAGE_SIZE = 50;
+
 const MessagingSidebar = ({ isOpen, onClose, theme = 'light', onMessagesRead }) => {
   const [conversations, setConversations] = useState([]);
   const [selectedConversation, setSelectedConversation] = useState(null);
@@ -30,6 +33,13 @@ const MessagingSidebar = ({ isOpen, onClose, theme = 'light', onMessagesRead })
   const [headerLoading, setHeaderLoading] = useState(false);
   const user = getCurrentUser();
   const messageListRef = useRef(null);
+  // Newest-message cursor per conversation, so refreshes only fetch what is new
+  const messageCursorsRef = useRef({});
+  // Oldest-message cursor per conversation while older history remains on the server
+  const [olderCursors, setOlderCursors] = useState({});
+  const [loadingOlder, setLoadingOlder] = useState(false);
+  // Scroll position to restore after prepending older messages instead of jumping to the bottom
+  const scrollAnchorRef = useRef(null);
   const [firstConversationsLoad, setFirstConversationsLoad] = useState(true);
   const [firstMessagesLoad, setFirstMessagesLoad] = useState(true);
   
@@ -57,6 +67,13 @@ const MessagingSidebar = ({ isOpen, onClose, theme = 'light', onMessagesRead })
   useEffect(() => {
     if (messageListRef.current && selectedConversation) {
       const messageList = messageListRef.current;
+      if (scrollAnchorRef.current) {
+        // Older messages were prepended: keep the previously visible message in place
+        const { scrollHeight, scrollTop } = scrollAnchorRef.current;
+        messageList.scrollTop = messageList.scrollHeight - scrollHeight + scrollTop;
+        scrollAnchorRef.current = null;
+        return;
+      }
       // Use setTimeout to ensure DOM has updated
       setTimeout(() => {
         messageList.scrollTo({
@@ -282,11 +299,14 @@ const MessagingSidebar = ({ isOpen, onClose, theme = 'light', onMessagesRead })
     }
   }, [isOpen, user, authenticated, conversationsLoaded, loading, loadConversations]);
 
-  // Poll for new conversations every 5 seconds when sidebar is open
+  // Poll for new conversations when sidebar is open and pushed updates are unavailable
   useEffect(() => {
     if (!isOpen || !user || !authenticated) return;
 
+    const websocketService = getWebSocketService();
     const pollInterval = setInterval(() => {
+      // conversation_updated events keep the list current while the socket is up
+      if (websocketService.isConnected('notification')) return;
       if (conversationsLoaded && !loading) {
         loadConversations(true); // Force reload to get latest data
         // Also update unread count during polling
@@ -312,20 +332,35 @@ const MessagingSidebar = ({ isOpen, onClose, theme = 'light', onMessagesRead })
       if (conversation) {
 
         console.log('Loading messages for conversation:', conversationId);
-        const messagesData = await apiService.getMessages(conversationId);
-        console.log('Messages loaded:', messagesData?.length || 0, 'messages');
-        if (messagesData && messagesData.length > 0) {
-          console.log('Sample message structure:', messagesData[0]);
+        const afterCursor = messageCursorsRef.current[conversationId];
+        const incremental = forceRefresh && afterCursor && messages[conversationId];
+        const page = await apiService.getMessages(
+          conversationId,
+          incremental ? { after: afterCursor } : { pageSize: MESSAGE_PAGE_SIZE }
+        );
+        const messagesData = page?.results || [];
+        if (page?.after_cursor) {
+          messageCursorsRef.current[conversationId] = page.after_cursor;
+        }
+        if (!incremental) {
+          setOlderCursors(prev => ({
+            ...prev,
+            [conversationId]: page?.has_more ? page.before_cursor : null
+          }));
         }
+        console.log('Messages loaded:', messagesData.length, 'messages');
 
         
         setMessages(prev => {
-          const newMessages = {
-        ...prev,
-        [conversationId]: messagesData
+          if (!incremental) {
+            return { ...prev, [conversationId]: messagesData };
+          }
+          const existing = prev[conversationId] || [];
+          const seen = new Set(existing.map(m => m.id));
+          return {
+            ...prev,
+            [conversationId]: [...existing, ...messagesData.filter(m => !seen.has(m.id))]
           };
-
-          return newMessages;
         });
         
               // Mark messages as read
@@ -355,6 +390,39 @@ const MessagingSidebar = ({ isOpen, onClose, theme = 'light', onMessagesRead })
     }
   };
 
+  // Fetch the page before the oldest loaded message and prepend it
+  const loadOlderMessages = async (conversationId) => {
+    const beforeCursor = olderCursors[conversationId];
+    if (!beforeCursor || loadingOlder) return;
+
+    try {
+      setLoadingOlder(true);
+      const page = await apiService.getMessages(conversationId, { pageSize: MESSAGE_PAGE_SIZE, before: beforeCursor });
+      const olderMessages = page?.results || [];
+
+      if (messageListRef.current) {
+        const { scrollHeight, scrollTop } = messageListRef.current;
+        scrollAnchorRef.current = { scrollHeight, scrollTop };
+      }
+      setMessages(prev => {
+        const existing = prev[conversationId] || [];
+        const seen = new Set(existing.map(m => m.id));
+        return {
+          ...prev,
+          [conversationId]: [...olderMessages.filter(m => !seen.has(m.id)), ...existing]
+        };
+      });
+      setOlderCursors(prev => ({
+        ...prev,
+        [conversationId]: page?.has_more ? page.before_cursor : null
+      }));
+    } catch (error) {
+      console.error('Error loading older messages:', error);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   // Handle incoming WebSocket messages
   const handleWebSocketMessage = useCallback((data) => {
     try {
@@ -469,11 +537,50 @@ const MessagingSidebar = ({ isOpen, onClose, theme = 'light', onMessagesRead })
     }
   }, [selectedConversation, user, onMessagesRead, loadConversations, loadMessagesForConversation]);
 
-  // Poll for messages in current conversation every 500ms for instant updates
+  // Apply pushed conversation_updated deltas instead of refetching the inbox
+  useEffect(() => {
+    if (!authenticated || !user?.id) return;
+
+    const websocketService = getWebSocketService();
+    const unsubscribeConversation = websocketService.onEvent('conversation_updated', (data) => {
+      const known = conversations.some(conv => conv.conversation_id === data.conversation_id);
+      setConversations(prev => prev.map(conv => {
+        if (conv.conversation_id !== data.conversation_id) return conv;
+        return {
+          ...conv,
+          latest_message: data.latest_message || conv.latest_message,
+          unread_count: data.unread_count ?? conv.unread_count,
+          last_message_at: data.last_message_at || conv.last_message_at,
+        };
+      }));
+
+      if (!known && data.latest_message) {
+        // New conversation: fetch the inbox once to get its counterpart details
+        loadConversations(true);
+      }
+
+      if (data.latest_message && !data.latest_message.is_own &&
+          selectedConversation?.conversation_id === data.conversation_id) {
+        loadMessagesForConversation(data.conversation_id, true);
+      }
+    });
+    const unsubscribeResync = websocketService.onEvent('resync_required', () => {
+      loadConversations(true);
+    });
+
+    return () => {
+      unsubscribeConversation();
+      unsubscribeResync();
+    };
+  }, [authenticated, user?.id, conversations, selectedConversation?.conversation_id, loadConversations, loadMessagesForConversation]);
+
+  // Poll for messages in current conversation while pushed updates are unavailable
   useEffect(() => {
     if (!selectedConversation || !authenticated || !user?.id) return;
 
+    const websocketService = getWebSocketService();
     const messagePollInterval = setInterval(() => {
+      if (websocketService.isConnected('notification')) return;
       if (selectedConversation) {
         loadMessagesForConversation(selectedConversation.conversation_id, true);
       }
@@ -663,6 +770,15 @@ const MessagingSidebar = ({ isOpen, onClose, theme = 'light', onMessagesRead })
                 <IoChevronDownOutline style={{ marginRight: '4px' }} /> New Messages
               </button>
             )}
+            {olderCursors[selectedConversation.conversation_id] && messages[selectedConversation.conversation_id]?.length > 0 && (
+              <button
+                onClick={() => loadOlderMessages(selectedConversation.conversation_id)}
+                className={`${styles.loadOlderButton} ${styles[theme]}`}
+                disabled={loadingOlder}
+              >
+                {loadingOlder ? 'Loading...' : 'Load older messages'}
+              </button>
+            )}
             {firstMessagesLoad && loadingMessages ? (
               <div className={`${styles.emptyState} ${styles[theme]}`}>
                 <div className={styles.loadingSpinner}></div>
@@ -3,6 +3,7 @@ import { Bar, Doughnut } from 'react-chartjs-2';
 import { apiService, getCurrentUser } from '../services/api';
 import styles from './PrincipalDashboard.module.css';
 import MessagingSidebar from './MessagingSidebar';
+import getWebSocketService from '../services/websocket';
 import PasswordChangeModal from './PasswordChangeModal';
 import {
   IoBarChartOutline,
@@ -60,13 +61,27 @@ const PrincipalDashboard = ({ onLogout }) => {
     loadUnreadMessageCount();
   }, []);
 
-  // Periodically update unread count to ensure real-time updates
+  // Unread count is pushed over the notification WebSocket; poll only while it is down
   useEffect(() => {
-    const unreadCountInterval = setInterval(() => {
+    const websocketService = getWebSocketService();
+    const unsubscribeUnreadCount = websocketService.onEvent('unread_count_changed', (data) => {
+      setUnreadMessageCount(data.unread_count || 0);
+    });
+    const unsubscribeResync = websocketService.onEvent('resync_required', () => {
       loadUnreadMessageCount();
-    }, 2000); // Update every 2 seconds for instant message indicators
+    });
+
+    const fallbackInterval = setInterval(() => {
+      if (!websocketService.isConnected('notification')) {
+        loadUnreadMessageCount();
+      }
+    }, 30000);
 
-    return () => clearInterval(unreadCountInterval);
+    return () => {
+      unsubscribeUnreadCount();
+      unsubscribeResync();
+      clearInterval(fallbackInterval);
+    };
   }, [loadUnreadMessageCount]);
 
   const toggleTheme = () => {
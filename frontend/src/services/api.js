@@ -1,3 +1,5 @@
+import getWebSocketService from './websocket';
+
 const API_BASE_URL = process.env.REACT_APP_API_BASE_URL || 'http://localhost:8000/api';
 
 // API configuration
@@ -163,12 +165,24 @@ export const apiService = {
     );
   },
 
-  getMessages: async (conversationId) => {
-    return retryRequest(() => makeRequest(`${API_BASE_URL}/conversations/${conversationId}/messages/`));
+  // Without params the full history is returned as an array; with page_size/before/after
+  // the response is a cursor page: { results, has_more, before_cursor, after_cursor }
+  getMessages: async (conversationId, { pageSize, before, after } = {}) => {
+    const params = new URLSearchParams();
+    if (pageSize) params.append('page_size', pageSize);
+    if (before) params.append('before', before);
+    if (after) params.append('after', after);
+    const query = params.toString() ? `?${params.toString()}` : '';
+    return retryRequest(() => makeRequest(`${API_BASE_URL}/conversations/${conversationId}/messages/${query}`));
   },
 
-  getUserMessages: async (userId) => {
-    return retryRequest(() => makeRequest(`${API_BASE_URL}/users/${userId}/messages/`));
+  getUserMessages: async (userId, { pageSize, before, after } = {}) => {
+    const params = new URLSearchParams();
+    if (pageSize) params.append('page_size', pageSize);
+    if (before) params.append('before', before);
+    if (after) params.append('after', after);
+    const query = params.toString() ? `?${params.toString()}` : '';
+    return retryRequest(() => makeRequest(`${API_BASE_URL}/users/${userId}/messages/${query}`));
   },
 
   getUserConversations: async () => {
@@ -399,6 +413,8 @@ export const isAuthenticated = () => {
 };
 
 export const logout = () => {
+  // Close sockets and drop the notification resume position along with the session
+  getWebSocketService().disconnect();
   localStorage.removeItem('token');
   localStorage.removeItem('refreshToken');
   localStorage.removeItem('user');
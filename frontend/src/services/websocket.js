@@ -11,6 +11,13 @@ class WebSocketService {
     this.backendUrl = process.env.REACT_APP_API_BASE_URL || 'http://localhost:8000';
     this.reconnectDelay = 1000;
     this.healthChecked = false;
+    this.userId = null;
+    this.token = null;
+    this.manualClose = false;
+    // Server-pushed events (unread_count_changed, conversation_updated, resync_required)
+    this.eventHandlers = {};
+    // Last notification event sequence number seen, sent back on reconnect to resume
+    this.lastEventSeq = parseInt(sessionStorage.getItem('notificationLastSeq') || '0', 10) || 0;
   }
 
   // Initialize WebSocket connections
@@ -39,6 +46,10 @@ class WebSocketService {
       return Promise.resolve(); // Return resolved promise to prevent unhandled rejections
     }
 
+    this.userId = userId;
+    this.token = token;
+    this.manualClose = false;
+
     // Get the correct protocol and host for WebSocket
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
     const host = this.backendUrl.replace(/^https?:\/\//, ''); // Remove http:// or https://
@@ -51,6 +62,7 @@ class WebSocketService {
         this.notificationSocket.onopen = () => {
           console.log('Notification WebSocket connected');
           this.reconnectAttempts = 0;
+          this.sendResume();
           this.notifyConnectionHandlers('notification', true);
           resolve();
         };
@@ -69,7 +81,9 @@ class WebSocketService {
           try {
             console.log('Notification WebSocket disconnected:', event.code, event.reason);
             this.notifyConnectionHandlers('notification', false);
-            this.handleReconnect('notification');
+            if (!this.manualClose) {
+              this.handleReconnect('notification');
+            }
           } catch (error) {
             console.error('Error handling WebSocket close:', error);
           }
@@ -219,8 +233,57 @@ class WebSocketService {
     }
   }
 
+  // Ask the server to replay events missed while disconnected
+  sendResume() {
+    if (!this.lastEventSeq || !this.notificationSocket || this.notificationSocket.readyState !== WebSocket.OPEN) {
+      return;
+    }
+
+    try {
+      this.notificationSocket.send(JSON.stringify({
+        type: 'resume',
+        last_seq: this.lastEventSeq
+      }));
+    } catch (error) {
+      console.error('Error sending resume request:', error);
+    }
+  }
+
+  // Remember the latest event sequence number across reconnects
+  setLastEventSeq(seq) {
+    this.lastEventSeq = seq;
+    try {
+      sessionStorage.setItem('notificationLastSeq', String(seq));
+    } catch (error) {
+      console.error('Error storing notification sequence:', error);
+    }
+  }
+
+  // Forget the resume position so the next user doesn't resume from this one's events
+  clearLastEventSeq() {
+    this.lastEventSeq = 0;
+    try {
+      sessionStorage.removeItem('notificationLastSeq');
+    } catch (error) {
+      console.error('Error clearing notification sequence:', error);
+    }
+  }
+
   // Handle incoming notification messages
   handleNotificationMessage(data) {
+    if (data && typeof data.seq === 'number') {
+      if (data.type === 'resync_required' || data.type === 'resume_complete') {
+        this.setLastEventSeq(data.seq);
+      } else if (data.seq <= this.lastEventSeq) {
+        // Already applied (replayed and pushed live around a reconnect)
+        return;
+      } else {
+        this.setLastEventSeq(data.seq);
+      }
+    }
+
+    this.notifyEventHandlers(data);
+
     try {
       this.messageHandlers.notification.forEach(handler => {
         try {
@@ -234,6 +297,21 @@ class WebSocketService {
     }
   }
 
+  // Dispatch server-pushed events to handlers registered with onEvent
+  notifyEventHandlers(data) {
+    if (!data || !data.type || !this.eventHandlers[data.type]) {
+      return;
+    }
+
+    this.eventHandlers[data.type].forEach(handler => {
+      try {
+        handler(data.data || {}, data);
+      } catch (error) {
+        console.error('Error in event handler:', error);
+      }
+    });
+  }
+
   // Handle reconnection
   handleReconnect(socketType) {
     if (this.reconnectAttempts < this.maxReconnectAttempts) {
@@ -243,8 +321,11 @@ class WebSocketService {
       console.log(`Attempting to reconnect ${socketType} WebSocket in ${delay}ms (attempt ${this.reconnectAttempts}/${this.maxReconnectAttempts})`);
       
       setTimeout(() => {
-        // Reconnection logic would go here
         console.log(`Reconnection attempt ${this.reconnectAttempts} for ${socketType} WebSocket`);
+        if (socketType === 'notification' && !this.manualClose && !this.isConnected('notification')) {
+          // The resume request on open catches up on anything missed meanwhile
+          this.initializeNotificationSocket(this.userId, this.token);
+        }
       }, delay);
     } else {
       console.error(`Max reconnection attempts reached for ${socketType} WebSocket`);
@@ -259,6 +340,18 @@ class WebSocketService {
     this.messageHandlers[socketType].push(handler);
   }
 
+  // Register a handler for a server-pushed event type; returns an unsubscribe function
+  onEvent(eventType, handler) {
+    if (!this.eventHandlers[eventType]) {
+      this.eventHandlers[eventType] = [];
+    }
+    this.eventHandlers[eventType].push(handler);
+
+    return () => {
+      this.eventHandlers[eventType] = this.eventHandlers[eventType].filter(h => h !== handler);
+    };
+  }
+
   // Register connection handlers
   onConnection(socketType, handler) {
     if (!this.connectionHandlers[socketType]) {
@@ -299,6 +392,7 @@ class WebSocketService {
   // Disconnect all WebSocket connections
   disconnect() {
     try {
+      this.manualClose = true;
       if (this.notificationSocket) {
         this.notificationSocket.close();
         this.notificationSocket = null;
@@ -308,6 +402,8 @@ class WebSocketService {
         this.chatSocket.close();
         this.chatSocket = null;
       }
+
+      this.clearLastEventSeq();
       
       console.log('All WebSocket connections closed');
     } catch (error) {
@@ -342,6 +438,7 @@ const getWebSocketService = () => {
         initializeChatSocket: () => Promise.resolve(),
         sendChatMessage: () => false,
         onMessage: () => {},
+        onEvent: () => () => {},
         onConnection: () => {},
         disconnect: () => {},
         isConnected: () => false